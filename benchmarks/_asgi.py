@@ -0,0 +1,81 @@
+"""Minimal in-process ASGI driver so benchmarks measure the application and not the
+network or an HTTP client."""
+
+import asyncio
+import time
+from typing import Optional
+
+from starlette.types import ASGIApp, Message
+
+
+def make_scope(
+    path: str, headers: Optional[list[tuple[bytes, bytes]]] = None
+) -> dict[str, object]:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers or [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+
+
+async def request(
+    app: ASGIApp, path: str, headers: Optional[list[tuple[bytes, bytes]]] = None
+) -> list[Message]:
+    messages: list[Message] = []
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a server, block until the client disconnects
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    try:
+        await app(make_scope(path, headers), receive, send)
+    finally:
+        disconnected.set()
+    return messages
+
+
+async def _latency(app: ASGIApp, path: str, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await request(app, path)
+    return (time.perf_counter() - start) / number
+
+
+async def _throughput(app: ASGIApp, path: str, number: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number // concurrency):
+        await asyncio.gather(*(request(app, path) for _ in range(concurrency)))
+    return number / (time.perf_counter() - start)
+
+
+def measure(
+    app: ASGIApp, path: str, number: int = 5_000, concurrency: int = 50
+) -> tuple[float, float]:
+    """Returns the mean latency in seconds and the throughput in requests/sec."""
+    asyncio.run(_latency(app, path, number // 10))  # Warm up
+    latency = asyncio.run(_latency(app, path, number))
+    throughput = asyncio.run(_throughput(app, path, number, concurrency))
+    return latency, throughput
+
+
+def report(label: str, latency: float, throughput: float) -> None:
+    print(f"{label:<40} {latency * 1e6:10.1f} us/request {throughput:12,.0f} req/s")
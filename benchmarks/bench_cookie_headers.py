@@ -0,0 +1,81 @@
+"""Compare the per-response cost of signing a session cookie and adding its Set-Cookie
+header. The legacy version creates a signer for every cookie and builds the header with
+str.format and MutableHeaders. Cookies are now signed with a shared signer holding the
+derived keys and the header is appended as bytes with precomputed attributes.
+
+Run with: python -m benchmarks.bench_cookie_headers
+"""
+
+import timeit
+
+import itsdangerous
+from starlette.datastructures import MutableHeaders
+from starlette.types import Message
+
+from mojito.signing import get_signer
+
+PAYLOAD = b"eyJpc19hdXRoZW50aWNhdGVkIjp0cnVlLCJ1c2VyX2lkIjoxMjM0fQ=="
+COOKIE_NAME = "mo_user_session"
+PATH = "/"
+MAX_AGE = 60 * 60 * 24 * 7
+SECURITY_FLAGS = "httponly; samesite=strict"
+
+
+def make_message() -> Message:
+    return {
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/html; charset=utf-8"),
+            (b"content-length", b"1024"),
+        ],
+    }
+
+
+def legacy(message: Message) -> None:
+    data = itsdangerous.TimestampSigner("secret").sign(PAYLOAD)
+    headers = MutableHeaders(scope=message)
+    header_value = (
+        "{cookie_name}={data}; path={path}; {max_age}{security_flags}".format(
+            cookie_name=COOKIE_NAME,
+            data=data.decode("utf-8"),
+            path=PATH,
+            max_age=f"Max-Age={MAX_AGE}; ",
+            security_flags=SECURITY_FLAGS,
+        )
+    )
+    headers.append("Set-Cookie", header_value)
+
+
+signer = get_signer("secret", ["old secret"])
+cookie_prefix = f"{COOKIE_NAME}=".encode("latin-1")
+cookie_suffix = f"; path={PATH}; Max-Age={MAX_AGE}; {SECURITY_FLAGS}".encode("latin-1")
+
+
+def current(message: Message) -> None:
+    data = signer.sign(PAYLOAD)
+    message["headers"] = [
+        *message.get("headers", ()),
+        (b"set-cookie", cookie_prefix + data + cookie_suffix),
+    ]
+
+
+def main(number: int = 100_000) -> None:
+    for label, set_cookie in (("legacy", legacy), ("shared signer", current)):
+        seconds = timeit.timeit(lambda: set_cookie(make_message()), number=number)
+        print(f"{label:<20} {seconds / number * 1e6:6.2f} us/response")
+    unsign_number = number // 10
+    cookie = signer.sign(PAYLOAD)
+    seconds = timeit.timeit(
+        lambda: itsdangerous.TimestampSigner("secret").unsign(cookie, max_age=MAX_AGE),
+        number=unsign_number,
+    )
+    print(f"{'legacy unsign':<20} {seconds / unsign_number * 1e6:6.2f} us/request")
+    seconds = timeit.timeit(
+        lambda: signer.unsign(cookie, max_age=MAX_AGE), number=unsign_number
+    )
+    print(f"{'shared unsign':<20} {seconds / unsign_number * 1e6:6.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
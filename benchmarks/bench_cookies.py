@@ -0,0 +1,60 @@
+"""Compare the size of the signed session and flash cookies and the time to encode and
+decode them in the legacy and compact payload formats.
+
+Run with: python -m benchmarks.bench_cookies
+"""
+
+import timeit
+from typing import Any
+
+import itsdangerous
+
+from mojito.serializers import decode_cookie_payload, encode_cookie_payload
+
+PAYLOADS: dict[str, Any] = {
+    "anonymous session": {"is_authenticated": False},
+    "session": {
+        "is_authenticated": True,
+        "auth_handler": "PasswordAuth",
+        "user_id": 1234,
+        "persist_session": True,
+        "permissions": ["admin", "editor", "viewer"],
+        "data": {"name": "Jane Doe", "email": "jane@example.com", "theme": "dark"},
+    },
+    "large session": {
+        "is_authenticated": True,
+        "auth_handler": "PasswordAuth",
+        "user_id": "0b0e6f5c-3f44-4c9e-a7d9-2f1b1a6c9e11",
+        "permissions": [f"project:{i}:read" for i in range(40)],
+        "data": {"name": "Jane Doe", "recent": [f"/projects/{i}" for i in range(20)]},
+    },
+    "flash messages": [
+        {"message": "Your changes were saved.", "category": "success"},
+        {"message": "Your subscription ends in 3 days.", "category": "warning"},
+    ],
+}
+
+
+def main(number: int = 20_000) -> None:
+    signer = itsdangerous.TimestampSigner("secret")
+    for name, payload in PAYLOADS.items():
+        for compact in (False, True):
+            cookie = signer.sign(encode_cookie_payload(payload, compact))
+            assert decode_cookie_payload(signer.unsign(cookie)) == payload
+            encode = timeit.timeit(
+                lambda: signer.sign(encode_cookie_payload(payload, compact)),
+                number=number,
+            )
+            decode = timeit.timeit(
+                lambda: decode_cookie_payload(signer.unsign(cookie)), number=number
+            )
+            label = f"{name} ({'compact' if compact else 'legacy'})"
+            print(
+                f"{label:<30} {len(cookie):>5} bytes",
+                f" encode {encode / number * 1e6:6.2f} us",
+                f" decode {decode / number * 1e6:6.2f} us",
+            )
+
+
+if __name__ == "__main__":
+    main()
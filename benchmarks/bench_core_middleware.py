@@ -0,0 +1,59 @@
+"""Compare requests/sec for a hello world route with the globals, session and message
+flash middleware stacked as separate layers and fused into the CoreMiddleware, and with
+sessions and message flashing disabled.
+
+Requests are sent one at a time. The time per request and the requests/sec are both
+derived from the same run, the fastest of several.
+
+Run with: python -m benchmarks.bench_core_middleware
+"""
+
+import asyncio
+import time
+from typing import Any
+
+from starlette.types import ASGIApp
+
+from mojito import Mojito
+
+from ._asgi import report, request
+
+
+def make_app(**kwargs: Any) -> Mojito:
+    app = Mojito(**kwargs)
+
+    @app.route("/")
+    def hello():
+        return "Hello World"
+
+    return app
+
+
+async def _elapsed(app: ASGIApp, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await request(app, "/")
+    return time.perf_counter() - start
+
+
+def main(number: int = 5_000, repeat: int = 5) -> None:
+    for label, kwargs in (
+        ("separate middleware", {}),
+        ("fused middleware", {"fuse_middleware": True}),
+        (
+            "separate, no sessions or flashes",
+            {"sessions": False, "flash_messages": False},
+        ),
+        (
+            "fused, no sessions or flashes",
+            {"fuse_middleware": True, "sessions": False, "flash_messages": False},
+        ),
+    ):
+        app = make_app(**kwargs)
+        asyncio.run(_elapsed(app, number // 10))  # Warm up
+        elapsed = min(asyncio.run(_elapsed(app, number)) for _ in range(repeat))
+        report(label, elapsed / number, number / elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare the per-request cost of injecting endpoint arguments.
+
+The legacy implementation inspected the endpoint function on every request. The router
+now compiles an argument binding plan when the route is registered.
+
+Run with: python -m benchmarks.bench_endpoint_args
+"""
+
+import inspect
+import timeit
+from typing import Any, Callable, Optional
+
+from starlette.routing import PARAM_REGEX
+
+from mojito import AppRouter, Request
+from mojito.routing import _EndpointArgs
+
+PATH = "/users/{user_id:int}/posts/{post_id}"
+
+
+def endpoint(request: Request, user_id: int, post_id: str, page: str, sort: str) -> str:
+    return ""
+
+
+def legacy_process_endpoint_args(
+    request: Request, path: str, endpoint_function: Callable[..., Any]
+) -> dict[str, Any]:
+    path_params_tuple = PARAM_REGEX.findall(path)
+    arg_specs = inspect.getfullargspec(endpoint_function)
+    path_params = [p[0] for p in path_params_tuple]
+    kwargs: dict[str, Any] = {}
+    for arg_name, arg_type in arg_specs.annotations.items():
+        arg_value: Optional[Any] = None
+        if arg_name in path_params:
+            arg_value = request.path_params.get(arg_name)
+        elif arg_name == "return":
+            continue
+        elif arg_type == Request:
+            arg_value = request
+        else:
+            arg_value = request.query_params.get(arg_name)
+        kwargs[arg_name] = arg_value
+    return kwargs
+
+
+def make_request() -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/users/1/posts/abc",
+            "query_string": b"page=2&sort=desc",
+            "headers": [],
+            "path_params": {"user_id": 1, "post_id": "abc"},
+        }
+    )
+
+
+def main(number: int = 100_000) -> None:
+    router = AppRouter()
+    request = make_request()
+    endpoint_args = _EndpointArgs.compile(PATH, endpoint)
+    assert router._process_endpoint_args(
+        request, endpoint_args
+    ) == legacy_process_endpoint_args(request, PATH, endpoint)
+
+    legacy = timeit.timeit(
+        lambda: legacy_process_endpoint_args(request, PATH, endpoint), number=number
+    )
+    compiled = timeit.timeit(
+        lambda: router._process_endpoint_args(request, endpoint_args), number=number
+    )
+    print(f"legacy:   {legacy / number * 1e6:8.2f} us/request")
+    print(f"compiled: {compiled / number * 1e6:8.2f} us/request")
+    print(f"speedup:  {legacy / compiled:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare the per-request cost of preprocessing form data for models of growing width.
+
+The legacy implementation looked up the model fields and their annotations for every
+submitted item. Forms now use a preprocessing plan compiled once per model.
+
+Run with: python -m benchmarks.bench_forms
+"""
+
+import timeit
+from typing import Any, Optional, get_origin
+
+from pydantic import BaseModel, create_model
+from starlette.datastructures import FormData
+
+from mojito.forms import _process_form
+
+
+def legacy_process_form(form: FormData, model: type[BaseModel]) -> dict[str, Any]:
+    items = form.multi_items()
+    fields = model.model_fields
+    processed_items: dict[str, Any] = {}
+    for item_name, item_value in items:
+        pydantic_field = fields.get(item_name)
+        if isinstance(item_value, str) and not len(item_value) > 0:
+            continue
+        if processed_items.get(item_name):
+            current_value = processed_items[item_name]
+            if isinstance(current_value, list):
+                processed_items[item_name].append(item_value)
+            else:
+                processed_items[item_name] = [current_value, item_value]
+            continue
+        elif pydantic_field and get_origin(pydantic_field.annotation) is list:
+            processed_items[item_name] = [item_value]
+            continue
+        processed_items[item_name] = item_value
+    return processed_items
+
+
+def make_model(width: int) -> type[BaseModel]:
+    fields: dict[str, Any] = {}
+    for i in range(width):
+        if i % 4 == 0:
+            fields[f"field_{i}"] = (list[str], [])
+        else:
+            fields[f"field_{i}"] = (Optional[str], None)
+    return create_model(f"Form{width}", **fields)
+
+
+def make_form(width: int) -> FormData:
+    items: list[tuple[str, str]] = []
+    for i in range(width):
+        items.append((f"field_{i}", f"value {i}"))
+        if i % 4 == 0:
+            items.append((f"field_{i}", f"second value {i}"))
+        if i % 10 == 0:
+            items.append((f"field_{i}", ""))
+    return FormData(items)
+
+
+def main(number: int = 2_000) -> None:
+    for width in (10, 100, 300):
+        model = make_model(width)
+        form = make_form(width)
+        assert _process_form(form, model) == legacy_process_form(form, model)
+        items = len(form.multi_items())
+        legacy = timeit.timeit(lambda: legacy_process_form(form, model), number=number)
+        compiled = timeit.timeit(lambda: _process_form(form, model), number=number)
+        print(
+            f"{width:>4} fields  legacy {legacy / number / items * 1e9:7.1f} ns/item",
+            f" compiled {compiled / number / items * 1e9:7.1f} ns/item",
+            f" speedup {legacy / compiled:5.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
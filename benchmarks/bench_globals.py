@@ -0,0 +1,53 @@
+"""Compare get/set of g attributes stored in a ContextVar per name against the per-request
+GlobalsNamespace set up by the GlobalsMiddleware.
+
+Run with: python -m benchmarks.bench_globals
+"""
+
+import timeit
+from contextvars import Context, copy_context
+
+from mojito.globals import g
+
+
+def hot_path() -> None:
+    # Roughly what Mojito does with g on every request
+    g.flash_messages = []
+    g.request = None
+    g.next_flash_messages
+    g.request
+    g.flash_messages
+
+
+def per_variable_request() -> None:
+    copy_context().run(hot_path)
+
+
+def namespace_request() -> None:
+    ctx = copy_context()
+    ctx.run(g.new_namespace)
+    ctx.run(hot_path)
+
+
+def best(func: object, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number  # type: ignore
+
+
+def main(number: int = 100_000) -> None:
+    per_variable_ctx = copy_context()
+    namespace_ctx: Context = copy_context()
+    namespace_ctx.run(g.new_namespace)
+    for label, request, ctx in (
+        ("ContextVar per name", per_variable_request, per_variable_ctx),
+        ("namespace", namespace_request, namespace_ctx),
+    ):
+        per_request = best(request, number)
+        steady = best(lambda: ctx.run(hot_path), number)  # noqa: B023
+        print(
+            f"{label:<20} {per_request * 1e9:8.0f} ns/request"
+            f" {steady * 1e9:8.0f} ns/hot path in existing context"
+        )
+
+
+if __name__ == "__main__":
+    main()
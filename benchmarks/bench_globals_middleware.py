@@ -0,0 +1,70 @@
+"""Compare the BaseHTTPMiddleware based GlobalsMiddleware against the pure ASGI version
+for plain HTML and streaming responses.
+
+Run with: python -m benchmarks.bench_globals_middleware
+"""
+
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextvars import copy_context
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp
+
+from mojito.globals import GlobalsMiddleware, g
+
+from ._asgi import measure, report
+
+
+async def legacy_dispatch(
+    request: Request, call_next: Callable[..., Awaitable[Response]]
+) -> Response:
+    ctx = copy_context()
+
+    def _call_next() -> Awaitable[Response]:
+        return call_next(request)
+
+    return await ctx.run(_call_next)
+
+
+class LegacyGlobalsMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app: ASGIApp) -> None:
+        super().__init__(app, legacy_dispatch)
+
+
+async def html(request: Request) -> Response:
+    g.request = request
+    return HTMLResponse("<h1>Hello, World!</h1>")
+
+
+async def stream(request: Request) -> Response:
+    async def content() -> AsyncIterator[str]:
+        for i in range(10):
+            yield f"<p>{i}</p>"
+
+    return StreamingResponse(content(), media_type="text/html")
+
+
+def make_app(middleware_class: type) -> Starlette:
+    return Starlette(
+        routes=[Route("/", html), Route("/stream", stream)],
+        middleware=[Middleware(middleware_class)],
+    )
+
+
+def main() -> None:
+    for label, middleware_class in (
+        ("BaseHTTPMiddleware", LegacyGlobalsMiddleware),
+        ("pure ASGI", GlobalsMiddleware),
+    ):
+        app = make_app(middleware_class)
+        report(f"{label} html", *measure(app, "/"))
+        report(f"{label} streaming", *measure(app, "/stream"))
+
+
+if __name__ == "__main__":
+    main()
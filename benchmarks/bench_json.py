@@ -0,0 +1,77 @@
+"""Compare the JSON codecs on a session cookie payload, flash messages and an API response,
+and the Mojito JSONResponse against Starlette's.
+
+Run with: python -m benchmarks.bench_json
+"""
+
+import timeit
+from typing import Any
+
+from starlette.responses import JSONResponse as StarletteJSONResponse
+
+from mojito import JSONResponse, config
+from mojito.serializers import get_json_codec
+
+SESSION = {
+    "is_authenticated": True,
+    "user_id": 1234,
+    "persist_session": True,
+    "permissions": ["admin", "editor", "viewer"],
+    "data": {"name": "Jane Doe", "email": "jane@example.com", "theme": "dark"},
+}
+FLASH_MESSAGES = [
+    {"message": "Your changes were saved.", "category": "success"},
+    {"message": "Your subscription ends in 3 days.", "category": "warning"},
+]
+API_RESPONSE = {
+    "count": 200,
+    "results": [
+        {
+            "id": i,
+            "name": f"Product {i}",
+            "price": i * 1.25,
+            "tags": ["new", "sale"] if i % 3 else [],
+            "in_stock": i % 2 == 0,
+            "description": "A fine product for everyday use. " * 3,
+        }
+        for i in range(200)
+    ],
+}
+PAYLOADS: dict[str, Any] = {
+    "session": SESSION,
+    "flash messages": FLASH_MESSAGES,
+    "api response": API_RESPONSE,
+}
+
+
+def main(number: int = 20_000) -> None:
+    for codec_name in ("json", "orjson", "msgspec"):
+        config.Config.JSON_CODEC = codec_name
+        try:
+            codec = get_json_codec()
+        except ImportError:
+            print(f"{codec_name} not installed")
+            continue
+        for payload_name, payload in PAYLOADS.items():
+            n = number // 100 if payload_name == "api response" else number
+            encoded = codec.dumps(payload)
+            dumps = timeit.timeit(lambda: codec.dumps(payload), number=n) / n
+            loads = timeit.timeit(lambda: codec.loads(encoded), number=n) / n
+            print(
+                f"{codec_name:<8} {payload_name:<16} {len(encoded):>7} bytes",
+                f" dumps {dumps * 1e6:9.2f} us",
+                f" loads {loads * 1e6:9.2f} us",
+            )
+
+    config.Config.JSON_CODEC = "auto"
+    n = number // 100
+    for label, response_class in (
+        ("starlette JSONResponse", StarletteJSONResponse),
+        (f"mojito JSONResponse ({get_json_codec().name})", JSONResponse),
+    ):
+        seconds = timeit.timeit(lambda: response_class(API_RESPONSE), number=n) / n
+        print(f"{label:<40} api response {seconds * 1e6:9.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare requests carrying session and flash cookies that never use the session, like
+static assets or health checks, with requests that read it.
+
+The session and flash cookies are only parsed, verified and decoded on first use, so
+requests that don't read them skip that work.
+
+Run with: python -m benchmarks.bench_lazy_sessions
+"""
+
+import asyncio
+import time
+
+from starlette.types import ASGIApp
+
+from mojito import Mojito, Request, flash_message, get_flashed_messages
+
+from ._asgi import report, request
+
+
+def make_app() -> Mojito:
+    app = Mojito()
+
+    @app.route("/login")
+    def login(request: Request):
+        request.user.update(
+            {
+                "is_authenticated": True,
+                "user_id": 1234,
+                "permissions": ["admin", "editor"],
+                "data": {"name": "Jane Doe", "email": "jane@example.com"},
+            }
+        )
+        flash_message("Welcome back!", "success")
+        return "logged in"
+
+    @app.route("/health")
+    def health():
+        return "ok"
+
+    @app.route("/profile")
+    def profile(request: Request):
+        messages = get_flashed_messages() or []
+        return f"{request.user['data']['name']} {len(messages)}"
+
+    return app
+
+
+async def _latency(
+    app: ASGIApp, path: str, headers: list[tuple[bytes, bytes]], number: int
+) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await request(app, path, headers)
+    return (time.perf_counter() - start) / number
+
+
+def main(number: int = 5_000) -> None:
+    app = make_app()
+    messages = asyncio.run(request(app, "/login"))
+    cookies = [
+        value.split(b";", 1)[0]
+        for name, value in messages[0]["headers"]
+        if name == b"set-cookie"
+    ]
+    headers = [
+        (b"cookie", b"; ".join([b"_ga=GA1.1.123456789.1700000000", *cookies])),
+        (b"accept", b"text/html"),
+    ]
+    for label, path in (
+        ("session not used (/health)", "/health"),
+        ("session used (/profile)", "/profile"),
+    ):
+        asyncio.run(_latency(app, path, headers, number // 10))  # Warm up
+        latency = asyncio.run(_latency(app, path, headers, number))
+        report(label, latency, 1 / latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compare matching routes one by one against the compiled route trie as the number of
+routes grows. Requests go to the last added route, the worst case for the linear scan.
+Static routes are looked up in a dict either way.
+
+Run with: python -m benchmarks.bench_route_matching
+"""
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+from mojito import AppRouter
+
+from ._asgi import measure, report
+
+
+def make_router(size: int, compile_routes: bool) -> AppRouter:
+    router = AppRouter(compile_routes=compile_routes)
+
+    def endpoint(request: Request) -> Response:
+        return PlainTextResponse("ok")
+
+    for i in range(size):
+        router.add_route(f"/resource{i}/{{item_id:int}}", endpoint)
+        router.add_route(f"/resource{i}/{{item_id:int}}/detail", endpoint)
+        router.add_route(f"/page{i}", endpoint)
+    return router
+
+
+def main() -> None:
+    for size in (10, 100, 1000):
+        for label, compile_routes in (("linear", False), ("compiled", True)):
+            router = make_router(size, compile_routes)
+            for kind, path in (
+                ("dynamic", f"/resource{size - 1}/42/detail"),
+                ("static", f"/page{size - 1}"),
+            ):
+                report(
+                    f"{label} {kind} {size * 3} routes",
+                    *measure(router, path, number=2_000),
+                )
+
+
+if __name__ == "__main__":
+    main()
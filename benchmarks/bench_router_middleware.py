@@ -0,0 +1,69 @@
+"""Compare the startup time and memory of wrapping every route with the router middleware
+against sharing one middleware stack between all the routes of the router.
+
+Run with: python -m benchmarks.bench_router_middleware
+"""
+
+import time
+import tracemalloc
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from mojito import AppRouter, Mojito
+
+from ._asgi import measure, report
+
+
+class PassthroughMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.app(scope, receive, send)
+
+
+def endpoint(request: Request) -> Response:
+    return PlainTextResponse("ok")
+
+
+def make_app(size: int, share_middleware: bool) -> Mojito:
+    app = Mojito()
+    router = AppRouter(prefix="/protected", share_middleware=share_middleware)
+    for _ in range(3):
+        router.add_middleware(PassthroughMiddleware)
+    for i in range(size):
+        router.add_route(f"/page{i}", endpoint)
+    app.include_router(router)
+    return app
+
+
+def main() -> None:
+    for size in (100, 1000, 10_000):
+        for label, share_middleware in (("per-route", False), ("shared", True)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            app = make_app(size, share_middleware)
+            # Routes are built lazily, on first use, so include building them
+            app.router.routes
+            elapsed = time.perf_counter() - start
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print(
+                f"{label} {size} routes".ljust(40),
+                f"startup {elapsed * 1e3:8.1f} ms",
+                f"memory {memory / 1024:10,.0f} KiB",
+            )
+        report(
+            f"per-route {size} routes",
+            *measure(make_app(size, False), f"/protected/page{size - 1}", number=2_000),
+        )
+        report(
+            f"shared {size} routes",
+            *measure(make_app(size, True), f"/protected/page{size - 1}", number=2_000),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare Starlette's StaticFiles against the indexed Mojito StaticFiles for full,
+conditional and precompressed responses.
+
+Run with: python -m benchmarks.bench_staticfiles
+"""
+
+import asyncio
+import gzip
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from starlette.staticfiles import StaticFiles as StarletteStaticFiles
+from starlette.types import ASGIApp
+
+from mojito import StaticFiles
+
+from ._asgi import report, request
+
+
+async def _latency(
+    app: ASGIApp, path: str, headers: list[tuple[bytes, bytes]], number: int
+) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await request(app, path, headers)
+    return (time.perf_counter() - start) / number
+
+
+def measure(
+    app: ASGIApp,
+    path: str,
+    headers: Optional[list[tuple[bytes, bytes]]] = None,
+    number: int = 2_000,
+) -> float:
+    asyncio.run(_latency(app, path, headers or [], number // 10))  # Warm up
+    return asyncio.run(_latency(app, path, headers or [], number))
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        content = b"console.log('hello world');\n" * 2_000
+        (Path(directory) / "app.js").write_bytes(content)
+        (Path(directory) / "app.js.gz").write_bytes(gzip.compress(content))
+        apps = {
+            "starlette": StarletteStaticFiles(directory=directory),
+            "mojito": StaticFiles(directory=directory, index=True),
+        }
+        etags = {
+            name: dict(asyncio.run(request(app, "/app.js"))[0]["headers"])[b"etag"]
+            for name, app in apps.items()
+        }
+        for name, app in apps.items():
+            cases: dict[str, list[tuple[bytes, bytes]]] = {
+                "200": [],
+                "304 if-none-match": [(b"if-none-match", etags[name])],
+                "200 accept-encoding gzip": [(b"accept-encoding", b"gzip")],
+            }
+            for case, headers in cases.items():
+                latency = measure(app, "/app.js", headers)
+                report(f"{name} {case}", latency, 1 / latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare time to first byte, total time and peak memory of rendering a large report page
+with TemplateResponse against StreamingTemplateResponse.
+
+Run with: python -m benchmarks.bench_template_streaming
+"""
+
+import asyncio
+import time
+import tracemalloc
+from typing import Callable
+
+import jinja2
+from starlette.responses import Response
+from starlette.types import Message
+
+from mojito import Jinja2Templates, Request
+
+from ._asgi import make_scope
+
+TEMPLATE = """<!doctype html>
+<html><head><title>{{ title }}</title></head>
+<body><h1>{{ title }}</h1>
+<table>
+{% for row in rows %}<tr><td>{{ row.id }}</td><td>{{ row.name }}</td><td>{{ row.total }}</td></tr>
+{% endfor %}</table></body></html>"""
+
+
+async def run(make_response: Callable[[], Response]) -> tuple[float, float, int]:
+    """Returns the time to first byte and total time in seconds and the peak memory."""
+    disconnected = asyncio.Event()
+    first_byte: list[float] = []
+
+    async def receive() -> Message:
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body" and message["body"]:
+            if not first_byte:
+                first_byte.append(time.perf_counter())
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    await make_response()(make_scope("/report"), receive, send)
+    end = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    disconnected.set()
+    return first_byte[0] - start, end - start, peak
+
+
+def main() -> None:
+    templates = Jinja2Templates(
+        env=jinja2.Environment(
+            loader=jinja2.DictLoader({"report.html": TEMPLATE}), autoescape=True
+        )
+    )
+    request = Request(make_scope("/report"))
+    for size in (1_000, 10_000, 100_000):
+        rows = [
+            {"id": i, "name": f"Customer {i}", "total": i * 3.5} for i in range(size)
+        ]
+        context = {"title": "Report", "rows": rows}
+        for label, make_response in (
+            (
+                "TemplateResponse",
+                lambda: templates.TemplateResponse(
+                    request, "report.html", dict(context)
+                ),
+            ),
+            (
+                "StreamingTemplateResponse",
+                lambda: templates.StreamingTemplateResponse(
+                    request, "report.html", dict(context), chunk_size=16_384
+                ),
+            ),
+        ):
+            asyncio.run(run(make_response))  # Warm up
+            ttfb, total, peak = asyncio.run(run(make_response))
+            print(
+                f"{label} {size} rows".ljust(40),
+                f"ttfb {ttfb * 1e3:8.2f} ms",
+                f"total {total * 1e3:8.1f} ms",
+                f"peak memory {peak / 1024:10,.0f} KiB",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,8 @@ from starlette.websockets import WebSocket
 
 from .globals import GlobalsMiddleware
 from .message_flash import MessageFlashMiddleware
+from .middleware.core import CoreMiddleware
+from .middleware.session_stores import SessionStore
 from .middleware.user_sessions import UserSessionMiddleware
 from .routing import AppRouter
 
@@ -47,7 +49,30 @@ class Mojito(Starlette):
                 Callable[[AppType], AbstractAsyncContextManager[Mapping[str, Any]]],
             ]
         ] = None,
+        session_store: Optional[SessionStore] = None,
+        compile_routes: bool = False,
+        sessions: bool = True,
+        flash_messages: bool = True,
+        fuse_middleware: bool = False,
     ) -> None:
+        """
+        Args:
+            session_store (Optional[SessionStore]): Store user session data server-side
+                rather than in the session cookie. See mojito.middleware.session_stores.
+                Defaults to None.
+            compile_routes (bool): Match requests using a trie of the route paths rather
+                than trying every route in order. Useful for apps with many routes.
+                Defaults to False.
+            sessions (bool): Provide the user session on `Request.user`. Apps that don't
+                use sessions or authentication can disable it so requests skip the session
+                middleware. Defaults to True.
+            flash_messages (bool): Provide message flashing. When disabled flashed
+                messages are dropped and get_flashed_messages() returns None. Defaults to
+                True.
+            fuse_middleware (bool): Set up the globals, sessions and flashed messages with
+                the single CoreMiddleware rather than a middleware for each. Defaults to
+                False.
+        """
         super().__init__(
             debug,
             routes,
@@ -57,18 +82,42 @@ class Mojito(Starlette):
             on_shutdown,
             lifespan,
         )
-        self.router = AppRouter(lifespan=lifespan)
+        self.router = AppRouter(
+            routes=routes, lifespan=lifespan, compile_routes=compile_routes
+        )
+        if fuse_middleware:
+            self.add_middleware(
+                CoreMiddleware,
+                sessions=sessions,
+                flash_messages=flash_messages,
+                session_store=session_store,
+            )
+            return
+        # Middleware added last is processed first. GlobalsMiddleware must wrap the others
+        # so the globals they set are stored in the request's context.
+        if flash_messages:
+            self.add_middleware(MessageFlashMiddleware)
+        if sessions:
+            self.add_middleware(UserSessionMiddleware, store=session_store)
         self.add_middleware(GlobalsMiddleware)
-        self.add_middleware(UserSessionMiddleware)
-        self.add_middleware(MessageFlashMiddleware)
 
-    def include_router(self, router: AppRouter) -> None:
+    def include_router(
+        self,
+        router: AppRouter,
+        prefix: Optional[str] = None,
+        middleware: Optional[Sequence[Middleware]] = None,
+    ) -> None:
         """Mounts all the routers routes under the application with the prefix.
 
         Args:
             router (AppRouter): Instance of the AppRouter
+            prefix (Optional[str]): Added before the prefix of the router. Defaults to None.
+            middleware (Optional[Sequence[Middleware]]): Middleware applied only to the
+                routes of the router. Defaults to None.
         """
-        self.router.include_router(router)  # type:ignore [attr-defined]
+        self.router.include_router(  # type:ignore [attr-defined]
+            router, prefix=prefix, middleware=middleware
+        )
 
     def route(
         self,
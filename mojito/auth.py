@@ -1,19 +1,27 @@
 """Authentication and authorization utilities to reduce the boilerplate required to implement basic session
 based authentication."""
 
+import copy
 import functools
 import hashlib
+import hmac
+import secrets
 import sys
+import time
 import typing as t
+from base64 import b64decode, b64encode
+from collections import OrderedDict
 
 if sys.version_info >= (3, 10):  # pragma: no cover
     from typing import ParamSpec
 else:  # pragma: no cover
     from typing_extensions import ParamSpec
 
+import anyio
+import anyio.to_thread
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
-from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from .config import Config
 
@@ -95,34 +103,207 @@ def include_auth_handler(auth_handler: type[BaseAuth], primary: bool = False) ->
         _AuthConfig.default_handler = handler_name
 
 
-async def _check_session_auth(request: Request, allowed_permissions: list[str]) -> bool:
-    if not request.user:
-        return False
-    auth_session_data = AuthSessionData(
-        is_authenticated=request.user.get("is_authenticated", False),
-        auth_handler=request.user.get("auth_handler", _AuthConfig.default_handler),
-        user_id=request.user.get("user_id"),
-        data=request.user.get("user", {}),
-        permissions=request.user.get("permissions", []),
+class _PendingLookup:
+    __slots__ = ("done", "completed", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = anyio.Event()
+        self.completed = False
+        self.result: t.Optional[AuthSessionData] = None
+        self.error: t.Optional[Exception] = None
+
+
+def _shared_error(error: Exception) -> Exception:
+    """Returns a copy of the error raised by a coalesced lookup, so each waiting request
+    raises its own exception instance."""
+    try:
+        shared = copy.copy(error)
+    except Exception:
+        shared = RuntimeError("Looking up the user failed")
+    return shared
+
+
+class _UserCache:
+    """Caches the results of BaseAuth.get_user() by (auth_handler, user_id) and coalesces
+    concurrent lookups of the same user into a single call."""
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[tuple[str, t.Any], tuple[float, AuthSessionData]] = (
+            OrderedDict()
+        )
+        self._pending: dict[tuple[str, t.Any], _PendingLookup] = {}
+
+    async def get_user(self, auth_handler: str, user_id: t.Any) -> AuthSessionData:
+        key = (auth_handler, user_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, data = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                return copy.deepcopy(data)
+            del self._entries[key]
+
+        pending = self._pending.get(key)
+        while pending is not None:
+            # Wait on the lookup already running for this user
+            await pending.done.wait()
+            if pending.completed:
+                if pending.error is not None:
+                    raise _shared_error(pending.error) from pending.error
+                return copy.deepcopy(pending.result)  # type: ignore [return-value]
+            # The request running the lookup was cancelled, look the user up again
+            pending = self._pending.get(key)
+
+        pending = self._pending[key] = _PendingLookup()
+        try:
+            handler = _AuthConfig.auth_handlers[auth_handler]
+            data = await handler().get_user(user_id)
+            pending.result = data
+            pending.completed = True
+        except Exception as e:
+            pending.error = e
+            pending.completed = True
+            raise
+        finally:
+            del self._pending[key]
+            pending.done.set()
+        if Config.USER_REVALIDATION_CACHE_TTL > 0:
+            self._entries[key] = (
+                time.monotonic() + Config.USER_REVALIDATION_CACHE_TTL,
+                copy.deepcopy(data),
+            )
+            while len(self._entries) > Config.USER_REVALIDATION_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return data
+
+    def invalidate(self, user_id: t.Any, auth_handler: t.Optional[str] = None) -> None:
+        if auth_handler is not None:
+            self._entries.pop((auth_handler, user_id), None)
+            return
+        for key in [key for key in self._entries if key[1] == user_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_user_cache = _UserCache()
+
+
+def invalidate_user(
+    user_id: t.Any, auth_handler: t.Optional[type[BaseAuth]] = None
+) -> None:
+    """Remove a user from the revalidation cache so the next request revalidating the user
+    calls `get_user` again. Call after changing the users permissions or deactivating them.
+
+    Args:
+        user_id (Any): Unique ID of the user.
+        auth_handler (type[BaseAuth], optional): Only remove the user cached for this auth
+            handler. Defaults to removing the user cached for all auth handlers.
+    """
+    _user_cache.invalidate(
+        user_id, auth_handler.__name__ if auth_handler is not None else None
     )
-    if not auth_session_data["is_authenticated"]:
+
+
+def clear_user_cache() -> None:
+    """Remove all users from the revalidation cache."""
+    _user_cache.clear()
+
+
+class Requirement:
+    """Permissions required to access a resource. Created with `all_of()` and `any_of()`
+    and compiled into sets once so checking the users permissions is a single set operation.
+
+    Requirements can be nested, e.g. `any_of("admin", all_of("editor", "publisher"))`.
+    """
+
+    __slots__ = ("match_any", "scopes", "nested")
+
+    def __init__(
+        self, scopes: t.Iterable[t.Union[str, "Requirement"]], match_any: bool = False
+    ) -> None:
+        self.match_any = match_any
+        scopes = list(scopes)
+        self.scopes: frozenset[str] = frozenset(s for s in scopes if isinstance(s, str))
+        self.nested: tuple[Requirement, ...] = tuple(
+            s for s in scopes if isinstance(s, Requirement)
+        )
+
+    def is_satisfied(self, permissions: t.AbstractSet[str]) -> bool:
+        """Check if the permissions satisfy the requirement. A requirement without any
+        scopes is always satisfied."""
+        if self.match_any:
+            if not self.scopes and not self.nested:
+                return True
+            return not self.scopes.isdisjoint(permissions) or any(
+                nested.is_satisfied(permissions) for nested in self.nested
+            )
+        return self.scopes <= permissions and all(
+            nested.is_satisfied(permissions) for nested in self.nested
+        )
+
+    def __repr__(self) -> str:
+        name = "any_of" if self.match_any else "all_of"
+        args = [repr(s) for s in sorted(self.scopes)] + [repr(n) for n in self.nested]
+        return f"{name}({', '.join(args)})"
+
+
+def all_of(*scopes: t.Union[str, Requirement]) -> Requirement:
+    """Require the user to have all of the permissions."""
+    return Requirement(scopes)
+
+
+def any_of(*scopes: t.Union[str, Requirement]) -> Requirement:
+    """Require the user to have at least one of the permissions."""
+    return Requirement(scopes, match_any=True)
+
+
+def _compile_requirement(
+    scopes: t.Union[str, t.Sequence[str], Requirement],
+) -> Requirement:
+    # A single scope or a list of scopes requires all of them
+    if isinstance(scopes, Requirement):
+        return scopes
+    if isinstance(scopes, str):
+        return all_of(scopes)
+    return all_of(*scopes)
+
+
+def _permission_set(request: Request) -> frozenset[str]:
+    """The users permissions as a set. Cached on the request until the permissions are
+    replaced, e.g. by revalidation."""
+    permissions = request.user.get("permissions") or ()
+    cached = request.scope.get("mojito.permissions")
+    if cached is not None and cached[0] is permissions:
+        return cached[1]  # type: ignore [no-any-return]
+    permission_set = frozenset(permissions)
+    request.scope["mojito.permissions"] = (permissions, permission_set)
+    return permission_set
+
+
+async def _check_session_auth(request: Request, requirement: Requirement) -> bool:
+    user = request.user
+    if not user:
+        return False
+    if not user.get("is_authenticated", False):
         # Revalidate on session exists but is not authenticated
         if not _AuthConfig.default_handler:
             raise NotImplementedError(
                 "an auth handler must be set using set_auth_handler"
             )
-        handler = _AuthConfig.auth_handlers[auth_session_data["auth_handler"]]  # type:ignore
-        data = await handler().get_user(auth_session_data["user_id"])
-        request.user.update(data)
+        data = await _user_cache.get_user(
+            user.get("auth_handler", _AuthConfig.default_handler),
+            user.get("user_id"),
+        )
+        user.update(data)
+    permissions = _permission_set(request)
     if (
         Config.SUPERUSER_PERMISSION_NAME
-        and Config.SUPERUSER_PERMISSION_NAME in auth_session_data["permissions"]
+        and Config.SUPERUSER_PERMISSION_NAME in permissions
     ):
         return True
-    for allowed_permission in allowed_permissions:
-        if not allowed_permission in auth_session_data["permissions"]:
-            return False
-    return True
+    return requirement.is_satisfied(permissions)
 
 
 class AuthMiddleware:
@@ -130,52 +311,60 @@ class AuthMiddleware:
     Redirect to login_url if session is not authenticated or if user does not have the required auth scopes.
     Can be applied at the app level or on individual routers.
 
+    Authorization is checked once before the route is called, so unauthorized requests
+    never reach the route function.
+
     Will ignore the Config.LOGIN_URL path to prevent infinite redirects.
 
     Args:
         ignore_routes (Optional[list[str]]): defaults to None. paths of routes to ignore validation on like '/login'. Path should be relative
-            and match the Request.url.path value when the route is called.
-        allow_permissions (Optional[list[str]]): defaults to None. List of scopes the user must have in order to be authorized
-            to access the requested resource.
+            and match the Request.url.path value when the route is called. Paths ending with `*` ignore every path
+            starting with the prefix, like '/public/*'.
+        allow_permissions (Optional[list[str] | Requirement]): defaults to None. List of scopes the user must have in order to be authorized
+            to access the requested resource, or a requirement created with `all_of()` or `any_of()`.
     """
 
     def __init__(
         self,
         app: ASGIApp,
         ignore_routes: list[str] = [],
-        allow_permissions: list[str] = [],
+        allow_permissions: t.Union[list[str], Requirement] = [],
     ) -> None:
         self.app = app
         self.ignore_routes = ignore_routes
         self.allow_permissions = allow_permissions
+        self.requirement = _compile_requirement(allow_permissions)
+        self._ignored_paths = frozenset(
+            route for route in ignore_routes if not route.endswith("*")
+        )
+        self._ignored_prefixes = tuple(
+            route[:-1] for route in ignore_routes if route.endswith("*")
+        )
+
+    def _is_ignored(self, path: str) -> bool:
+        return (
+            path in self._ignored_paths
+            or path == Config.LOGIN_URL
+            or (
+                bool(self._ignored_prefixes) and path.startswith(self._ignored_prefixes)
+            )
+        )
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
-        if scope["type"] != "http":
+        if scope["type"] != "http" or self._is_ignored(scope["path"]):
             return await self.app(scope, receive, send)
-        request = Request(scope, receive)
-
-        async def send_wrapper(message: Message) -> None:
-            # ... Do something
-            if (
-                request.url.path in self.ignore_routes
-                or request.url.path == Config.LOGIN_URL
-            ):
-                # Skip for routes registered as login_not_required
-                return await send(message)
-            allowed = await _check_session_auth(request, self.allow_permissions)
-            if not allowed:
-                response = RedirectResponse(Config.LOGIN_URL, 302)
-                return await response(scope, receive, send)
-            await send(message)
-
-        await self.app(scope, receive, send_wrapper)
+        if not await _check_session_auth(Request(scope, receive), self.requirement):
+            response = RedirectResponse(Config.LOGIN_URL, 302)
+            return await response(scope, receive, send)
+        await self.app(scope, receive, send)
 
 
 _P = ParamSpec("_P")
+_T = t.TypeVar("_T")
 
 
 def requires(
-    scopes: t.Union[str, t.Sequence[str]] = [],
+    scopes: t.Union[str, t.Sequence[str], Requirement] = [],
     redirect_url: t.Optional[str] = None,
 ) -> t.Callable[[t.Callable[_P, t.Any]], t.Callable[_P, t.Any]]:
     """Decorator to require that the user is authenticated and optionally check that the user has
@@ -183,11 +372,12 @@ def requires(
     login_url if one is set, or to redirect_url if one is given.
 
     Args:
-        scopes (str | Sequence[str]): Auth scopes to verify the user has. Defaults to [].
+        scopes (str | Sequence[str] | Requirement): Auth scopes to verify the user has. Defaults to [].
+            A list requires all of the scopes. Use `any_of()` to require at least one of them.
         redirect_url (Optional[str]): Redirect to this url rather than the configured
             login_url.
     """
-    scopes_list = [scopes] if isinstance(scopes, str) else list(scopes)
+    requirement = _compile_requirement(scopes)
 
     def decorator(
         func: t.Callable[_P, t.Any],
@@ -201,7 +391,7 @@ def requires(
                 raise Exception(
                     "The Request must be the first argument to the function when using the `@requires` decorator"
                 )
-            if not await _check_session_auth(request, scopes_list):
+            if not await _check_session_auth(request, requirement):
                 REDIRECT_URL = redirect_url if redirect_url else Config.LOGIN_URL
                 return RedirectResponse(REDIRECT_URL, 302)
             if isinstance(func, t.Awaitable):  # type: ignore [unused-ignore]
@@ -217,6 +407,9 @@ def requires(
 def hash_password(password: str) -> str:
     """Helper to hash a password before storing it or to compare a plain text password to the one stored.
 
+    This is a plain SHA-256 hash. Prefer `hash_password_async()` and `verify_password()`,
+    which use a slow key derivation function and can upgrade hashes created by this function.
+
     Args:
         password (str): The plain text password to hash.
 
@@ -226,6 +419,144 @@ def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 
+_password_hash_limiter: t.Optional[anyio.CapacityLimiter] = None
+
+
+async def _run_password_hash(func: t.Callable[[], _T]) -> _T:
+    global _password_hash_limiter
+    if _password_hash_limiter is None:
+        _password_hash_limiter = anyio.CapacityLimiter(Config.PASSWORD_HASH_THREADS)
+    return await anyio.to_thread.run_sync(func, limiter=_password_hash_limiter)
+
+
+def _current_password_params() -> tuple[str, tuple[int, ...]]:
+    algorithm = Config.PASSWORD_HASH_ALGORITHM
+    if algorithm == "scrypt":
+        return algorithm, (
+            Config.PASSWORD_SCRYPT_N,
+            Config.PASSWORD_SCRYPT_R,
+            Config.PASSWORD_SCRYPT_P,
+        )
+    if algorithm == "pbkdf2_sha256":
+        return algorithm, (Config.PASSWORD_PBKDF2_ITERATIONS,)
+    raise ValueError(f"unsupported password hash algorithm: {algorithm}")
+
+
+def _derive_password_key(
+    password: str, salt: bytes, algorithm: str, params: tuple[int, ...]
+) -> bytes:
+    if algorithm == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(
+            password.encode(),
+            salt=salt,
+            n=n,
+            r=r,
+            p=p,
+            maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+        )
+    if algorithm == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params[0])
+    raise ValueError(f"unsupported password hash algorithm: {algorithm}")
+
+
+def _parse_password_hash(
+    password_hash: str,
+) -> t.Optional[tuple[str, tuple[int, ...], bytes, bytes]]:
+    # Format: algorithm$param$...$salt$key with base64 encoded salt and key
+    parts = password_hash.split("$")
+    if len(parts) < 4:
+        return None
+    try:
+        params = tuple(int(param) for param in parts[1:-2])
+        return parts[0], params, b64decode(parts[-2]), b64decode(parts[-1])
+    except ValueError:
+        return None
+
+
+def _hash_password_kdf(password: str) -> str:
+    algorithm, params = _current_password_params()
+    salt = secrets.token_bytes(16)
+    key = _derive_password_key(password, salt, algorithm, params)
+    return "$".join(
+        [
+            algorithm,
+            *map(str, params),
+            b64encode(salt).decode(),
+            b64encode(key).decode(),
+        ]
+    )
+
+
+def _verify_password_kdf(password: str, password_hash: str) -> bool:
+    parsed = _parse_password_hash(password_hash)
+    if parsed is None:
+        # Hash created by hash_password(). Compared as bytes, compare_digest only
+        # accepts ASCII strings.
+        return hmac.compare_digest(
+            hash_password(password).encode(), password_hash.encode()
+        )
+    algorithm, params, salt, key = parsed
+    try:
+        derived_key = _derive_password_key(password, salt, algorithm, params)
+    except (ValueError, TypeError, OverflowError, MemoryError):
+        return False  # Unknown algorithm or malformed parameters
+    return hmac.compare_digest(derived_key, key)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password for storage using the key derivation function configured with
+    `Config.PASSWORD_HASH_ALGORITHM`. Hashing is run in a thread so it doesn't block the
+    event loop.
+
+    Args:
+        password (str): The plain text password to hash.
+
+    Returns:
+        str: The hashed password including the algorithm, cost parameters and salt.
+    """
+    return await _run_password_hash(lambda: _hash_password_kdf(password))
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """Check if the hash was created with a different algorithm or cost parameters than
+    currently configured.
+
+    Args:
+        password_hash (str): The stored password hash.
+    """
+    parsed = _parse_password_hash(password_hash)
+    if parsed is None:
+        return True
+    return (parsed[0], parsed[1]) != _current_password_params()
+
+
+async def verify_password(
+    password: str,
+    password_hash: str,
+    rehash: t.Optional[t.Callable[[str], t.Awaitable[t.Any]]] = None,
+) -> bool:
+    """Verify a plain text password against the stored hash in constant time. Hashes
+    created with `hash_password()` are also supported.
+
+    Args:
+        password (str): The plain text password.
+        password_hash (str): The stored password hash.
+        rehash (Optional[Callable[[str], Awaitable[Any]]]): Called with a new hash of the
+            password when it's valid but the stored hash uses outdated settings. Use it to
+            save the new hash. Defaults to None.
+
+    Returns:
+        bool: True if the password is valid.
+    """
+    valid = await _run_password_hash(
+        lambda: _verify_password_kdf(password, password_hash)
+    )
+    if valid and rehash is not None and password_needs_rehash(password_hash):
+        await rehash(await hash_password_async(password))
+    return valid
+
+
 async def login(
     request: Request,
     auth_handler: t.Optional[type[BaseAuth]] = None,
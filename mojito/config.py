@@ -8,6 +8,15 @@ class Config:
     
     Defaults to empty string.
     """
+    SECRET_KEY_FALLBACKS: list[str] = [
+        key for key in os.getenv("SECRET_KEY_FALLBACKS", "").split(",") if key
+    ]
+    """Previous secret keys, comma separated in the environment variable. Cookies signed
+    with them are still accepted so the secret key can be rotated without logging out
+    users. New cookies are always signed with SECRET_KEY.
+
+    Defaults to no fallback keys.
+    """
     MESSAGE_FLASH_COOKIE: str = os.getenv("MESSAGE_FLASH_COOKIE", "mo_flash_messages")
     """Name of the cookie message flash data will be stored to.
     
@@ -34,6 +43,88 @@ class Config:
 
     Defaults to 0, revalidate on every request.
     """
+    USER_REVALIDATION_CACHE_TTL: int = int(os.getenv("USER_REVALIDATION_CACHE_TTL", 0))
+    """In seconds. How long the user returned by the auth handlers `get_user` is cached when
+    revalidating sessions. Concurrent revalidations of the same user always share a single
+    `get_user` call. Use `auth.invalidate_user()` to drop a cached user after changing it.
+
+    Defaults to 0, not cached.
+    """
+    USER_REVALIDATION_CACHE_SIZE: int = int(
+        os.getenv("USER_REVALIDATION_CACHE_SIZE", 10_000)
+    )
+    """Maximum number of users kept in the revalidation cache.
+
+    Defaults to 10,000.
+    """
+    PASSWORD_HASH_ALGORITHM: str = os.getenv("PASSWORD_HASH_ALGORITHM", "scrypt")
+    """Key derivation function used by `auth.hash_password_async()`. One of `scrypt` or
+    `pbkdf2_sha256`. Passwords hashed with other settings are still verified and can be
+    rehashed on login.
+
+    Defaults to `scrypt`.
+    """
+    PASSWORD_SCRYPT_N: int = int(os.getenv("PASSWORD_SCRYPT_N", 2**14))
+    "scrypt CPU/memory cost. Must be a power of 2. Defaults to 16384."
+    PASSWORD_SCRYPT_R: int = int(os.getenv("PASSWORD_SCRYPT_R", 8))
+    "scrypt block size. Defaults to 8."
+    PASSWORD_SCRYPT_P: int = int(os.getenv("PASSWORD_SCRYPT_P", 1))
+    "scrypt parallelization. Defaults to 1."
+    PASSWORD_PBKDF2_ITERATIONS: int = int(
+        os.getenv("PASSWORD_PBKDF2_ITERATIONS", 600_000)
+    )
+    "pbkdf2_sha256 iterations. Defaults to 600,000."
+    PASSWORD_HASH_THREADS: int = int(os.getenv("PASSWORD_HASH_THREADS", 4))
+    """Maximum number of threads hashing passwords at the same time. Hashing runs in
+    threads so it doesn't block the event loop.
+
+    Defaults to 4.
+    """
+    TEMPLATES_BYTECODE_CACHE_DIR: Optional[str] = os.getenv(
+        "TEMPLATES_BYTECODE_CACHE_DIR"
+    )
+    """Directory Jinja2Templates caches the compiled templates in. The cache is shared by all
+    worker processes and survives restarts.
+
+    Defaults to None, no bytecode cache.
+    """
+    TEMPLATES_AUTO_RELOAD: bool = os.getenv(
+        "TEMPLATES_AUTO_RELOAD", "true"
+    ).lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    """Check if a template changed on disk each time it's rendered. Disable in production to
+    skip the filesystem checks.
+
+    Defaults to True.
+    """
+    JSON_CODEC: str = os.getenv("JSON_CODEC", "auto")
+    """JSON library used for the session and message flash cookies, session stores and
+    JSONResponse. One of `orjson`, `msgspec`, `json` (the standard library) or `auto` to
+    use orjson or msgspec when installed and the standard library otherwise.
+
+    Defaults to `auto`.
+    """
+    COMPACT_COOKIES: bool = os.getenv("COMPACT_COOKIES", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    """Store the session and message flash cookies in the compact format. Large payloads are
+    compressed and the cookie only uses characters that don't need quoting. Cookies in
+    the previous format are still read, but older versions of Mojito can't read compact
+    cookies.
+
+    Defaults to False.
+    """
+    COOKIE_COMPRESS_THRESHOLD: int = int(os.getenv("COOKIE_COMPRESS_THRESHOLD", 32))
+    """In bytes. Compact cookie data at least this large is compressed with zlib. Set to 0
+    to never compress.
+
+    Defaults to 32.
+    """
     SUPERUSER_PERMISSION_NAME: Optional[str] = os.getenv("SUPERUSER_PERMISSION_NAME")
     """The name of the superuser permission.
 
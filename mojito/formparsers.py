@@ -0,0 +1,432 @@
+"""Streaming form parser. Form fields are checked as they're received and file uploads are
+passed to a FileSink chunk by chunk instead of being buffered in memory or a temp file."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import typing
+from collections.abc import AsyncGenerator, Awaitable, Callable, Container, Mapping
+from pathlib import Path
+from urllib.parse import unquote_plus
+
+import anyio
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import CoreSchema, core_schema
+from starlette.datastructures import FormData, Headers
+from starlette.exceptions import HTTPException
+
+try:
+    import python_multipart as multipart
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # pragma: no cover
+    import multipart  # type: ignore [no-redef, import-untyped, unused-ignore]
+    from multipart.exceptions import FormParserError  # type: ignore [no-redef, import-untyped, unused-ignore]
+    from multipart.multipart import parse_options_header  # type: ignore [no-redef, import-untyped, unused-ignore]
+
+
+class FileSink(typing.Protocol):
+    """Base class for the destinations of streamed file uploads."""
+
+    async def write(self, data: bytes) -> None:
+        """Write the next chunk of the file.
+
+        Args:
+            data (bytes): The chunk received from the request.
+        """
+        raise NotImplementedError()
+
+    async def close(self) -> typing.Any:
+        """Called after the last chunk was written.
+
+        Returns:
+            Any: Stored as the result of the StreamedFile passed to the form model.
+        """
+        raise NotImplementedError()
+
+    async def abort(self) -> None:
+        """Called when the form is rejected. Should discard anything written so far."""
+        raise NotImplementedError()
+
+
+class StreamedFile:
+    """An uploaded file that was streamed to a FileSink.
+
+    Can be used as a field type in a Pydantic model. Pydantic will pass it through as-is
+    without validation.
+
+    Args:
+        filename (str): The filename sent by the client.
+        headers (Headers): The headers of the file part.
+    """
+
+    __slots__ = ("filename", "headers", "size", "result")
+
+    def __init__(self, filename: str, headers: Headers) -> None:
+        self.filename = filename
+        self.headers = headers
+        self.size = 0
+        self.result: typing.Any = None
+
+    @property
+    def content_type(self) -> str | None:
+        return self.headers.get("content-type")
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(filename={self.filename!r}, "
+            f"size={self.size!r}, result={self.result!r})"
+        )
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source_type: typing.Any, handler: GetCoreSchemaHandler
+    ) -> CoreSchema:
+        # Allow this file type to pass through pydantic without schema validation
+        return core_schema.any_schema()
+
+
+SinkFactory = Callable[[StreamedFile], FileSink]
+
+
+class DiskSink(FileSink):
+    """Writes the file to a path. The result is the Path of the file.
+
+    Args:
+        path (str | os.PathLike[str]): Where to write the file. Overwritten if it exists.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = Path(path)
+        self._file: anyio.AsyncFile[bytes] | None = None
+
+    async def write(self, data: bytes) -> None:
+        if self._file is None:
+            self._file = await anyio.open_file(self.path, "wb")
+        await self._file.write(data)
+
+    async def close(self) -> Path:
+        if self._file is None:
+            self._file = await anyio.open_file(self.path, "wb")
+        await self._file.aclose()
+        return self.path
+
+    async def abort(self) -> None:
+        if self._file is not None:
+            await self._file.aclose()
+        await anyio.Path(self.path).unlink(missing_ok=True)
+
+
+class HashSink(FileSink):
+    """Hashes the file without storing it. The result is the hex digest.
+
+    Args:
+        algorithm (str): Any algorithm supported by hashlib.new(). Defaults to sha256.
+    """
+
+    def __init__(self, algorithm: str = "sha256") -> None:
+        self._hash = hashlib.new(algorithm)
+
+    async def write(self, data: bytes) -> None:
+        self._hash.update(data)
+
+    async def close(self) -> str:
+        return self._hash.hexdigest()
+
+    async def abort(self) -> None:
+        pass
+
+
+class CallbackSink(FileSink):
+    """Calls an async function with each chunk of the file. The result is None.
+
+    Args:
+        callback (Callable[[bytes], Awaitable[None]]): Called with each chunk.
+    """
+
+    def __init__(self, callback: Callable[[bytes], Awaitable[None]]) -> None:
+        self.callback = callback
+
+    async def write(self, data: bytes) -> None:
+        await self.callback(data)
+
+    async def close(self) -> None:
+        return None
+
+    async def abort(self) -> None:
+        pass
+
+
+def _user_safe_decode(src: bytes | bytearray, charset: str) -> str:
+    try:
+        return src.decode(charset)
+    except (UnicodeDecodeError, LookupError):
+        return src.decode("latin-1")
+
+
+class _Part:
+    __slots__ = ("name", "data", "is_file", "file", "sink", "skip", "max_size")
+
+    def __init__(self) -> None:
+        self.name = ""
+        self.data = bytearray()
+        self.is_file = False
+        self.file: StreamedFile | None = None
+        self.sink: FileSink | None = None
+        self.skip = False
+        self.max_size: int | None = None
+
+
+class StreamingFormParser:
+    """Parses multipart and urlencoded forms while the request body is received.
+
+    Limits are checked as the data arrives and the parser stops reading the request as
+    soon as one is exceeded.
+
+    Args:
+        headers (Headers): The request headers.
+        stream (AsyncGenerator[bytes, None]): The request body stream.
+        sinks (Mapping[str, SinkFactory]): For each file field, a function returning the
+            FileSink to write the file to. Files of other fields are skipped.
+        fields (Optional[Container[str]]): Only these fields are kept. Defaults to None
+            to keep all the fields.
+        on_field (Optional[Callable[[str, str], None]]): Called with the name and value of
+            each kept field as soon as it's received. Raise to reject the form.
+        max_files (int): Maximum number of files. Defaults to 1000.
+        max_fields (int): Maximum number of fields. Defaults to 1000.
+        max_field_size (int): In bytes. Maximum size of a field. Defaults to 1MB.
+        max_file_size (Optional[int]): In bytes. Maximum size of each file. Defaults to None.
+        max_file_sizes (Optional[Mapping[str, int]]): In bytes. Maximum size of the files
+            of a field by field name, checked in addition to max_file_size. Defaults to None.
+        max_body_size (Optional[int]): In bytes. Maximum size of the request body.
+            Defaults to None.
+
+    Raises:
+        HTTPException: 413 error when a limit is exceeded or 400 for a malformed form.
+    """
+
+    def __init__(
+        self,
+        headers: Headers,
+        stream: AsyncGenerator[bytes, None],
+        sinks: Mapping[str, SinkFactory],
+        fields: Container[str] | None = None,
+        on_field: Callable[[str, str], None] | None = None,
+        max_files: int = 1000,
+        max_fields: int = 1000,
+        max_field_size: int = 1024 * 1024,
+        max_file_size: int | None = None,
+        max_body_size: int | None = None,
+        max_file_sizes: Mapping[str, int] | None = None,
+    ) -> None:
+        self.headers = headers
+        self.stream = stream
+        self.sinks = sinks
+        self.fields = fields
+        self.on_field = on_field
+        self.max_files = max_files
+        self.max_fields = max_fields
+        self.max_field_size = max_field_size
+        self.max_file_size = max_file_size
+        self.max_body_size = max_body_size
+        self.max_file_sizes = max_file_sizes or {}
+        self.items: list[tuple[str, str | StreamedFile]] = []
+        self._charset = "utf-8"
+        self._part = _Part()
+        self._header_name = b""
+        self._header_value = b""
+        self._part_headers: list[tuple[bytes, bytes]] = []
+        self._file_count = 0
+        self._field_count = 0
+        self._open_sinks: list[FileSink] = []
+        # File data and finished files waiting to be handled by the async parse loop
+        self._file_writes: list[tuple[_Part, bytes]] = []
+        self._file_ends: list[_Part] = []
+
+    def _add_field(self, name: str, value: str) -> None:
+        self._field_count += 1
+        if self._field_count > self.max_fields:
+            raise HTTPException(
+                413, f"Too many fields. Maximum number of fields is {self.max_fields}."
+            )
+        if self.fields is not None and name not in self.fields:
+            return
+        if self.on_field is not None:
+            self.on_field(name, value)
+        self.items.append((name, value))
+
+    def _check_field_size(self, size: int) -> None:
+        if size > self.max_field_size:
+            raise HTTPException(
+                413, f"Field exceeded maximum size of {self.max_field_size} bytes."
+            )
+
+    # Multipart callbacks
+
+    def on_part_begin(self) -> None:
+        self._part = _Part()
+        self._part_headers = []
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._part_headers.append((self._header_name.lower(), self._header_value))
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        part = self._part
+        headers = Headers(raw=self._part_headers)
+        _, options = parse_options_header(headers.get("content-disposition"))
+        if b"name" not in options:
+            raise HTTPException(
+                400, 'The Content-Disposition header field "name" must be provided.'
+            )
+        part.name = _user_safe_decode(options[b"name"], self._charset)
+        if b"filename" not in options:
+            return
+        part.is_file = True
+        self._file_count += 1
+        if self._file_count > self.max_files:
+            raise HTTPException(
+                413, f"Too many files. Maximum number of files is {self.max_files}."
+            )
+        filename = _user_safe_decode(options[b"filename"], self._charset)
+        sink_factory = self.sinks.get(part.name)
+        if sink_factory is None or not filename:
+            # No sink for the field or no file was selected in the file input
+            part.skip = True
+            return
+        part.max_size = self.max_file_size
+        field_max_size = self.max_file_sizes.get(part.name)
+        if field_max_size is not None and (
+            part.max_size is None or field_max_size < part.max_size
+        ):
+            part.max_size = field_max_size
+        part.file = StreamedFile(filename, headers)
+        part.sink = sink_factory(part.file)
+        self._open_sinks.append(part.sink)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        part = self._part
+        if part.skip:
+            return
+        if part.file is not None:
+            part.file.size += end - start
+            if part.max_size is not None and part.file.size > part.max_size:
+                raise HTTPException(
+                    413, f"File exceeded maximum size of {part.max_size} bytes."
+                )
+            self._file_writes.append((part, data[start:end]))
+            return
+        if self.fields is not None and part.name not in self.fields:
+            part.skip = True  # Don't buffer fields that are ignored
+            return
+        self._check_field_size(len(part.data) + end - start)
+        part.data += data[start:end]
+
+    def on_part_end(self) -> None:
+        part = self._part
+        if part.is_file:
+            if part.file is not None:
+                self._file_ends.append(part)
+                self.items.append((part.name, part.file))
+        elif part.skip:
+            self._add_field(part.name, "")  # Ignored but counted against max_fields
+        else:
+            self._add_field(part.name, _user_safe_decode(part.data, self._charset))
+
+    # Urlencoded callbacks
+
+    def on_field_start(self) -> None:
+        self._part = _Part()
+
+    def on_field_name(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_field_data(self, data: bytes, start: int, end: int) -> None:
+        self._check_field_size(len(self._part.data) + end - start)
+        self._part.data += data[start:end]
+
+    def on_field_end(self) -> None:
+        name = unquote_plus(self._header_name.decode("latin-1"))
+        self._header_name = b""
+        self._add_field(name, unquote_plus(self._part.data.decode("latin-1")))
+
+    async def _handle_file_events(self) -> None:
+        for part, data in self._file_writes:
+            await part.sink.write(data)  # type: ignore [union-attr]
+        self._file_writes.clear()
+        for part in self._file_ends:
+            part.file.result = await part.sink.close()  # type: ignore [union-attr]
+        self._file_ends.clear()
+
+    async def parse(self) -> FormData:
+        """Read the request body and return the kept fields and streamed files.
+
+        Returns:
+            FormData: Fields and StreamedFile objects in the order they were received.
+        """
+        content_type, params = parse_options_header(self.headers.get("content-type"))
+        charset = params.get(b"charset", b"utf-8")
+        self._charset = charset.decode("latin-1")
+        parser: multipart.MultipartParser | multipart.QuerystringParser
+        if content_type == b"multipart/form-data":
+            if b"boundary" not in params:
+                raise HTTPException(400, "Missing boundary in multipart.")
+            parser = multipart.MultipartParser(
+                params[b"boundary"],
+                {
+                    "on_part_begin": self.on_part_begin,
+                    "on_part_data": self.on_part_data,
+                    "on_part_end": self.on_part_end,
+                    "on_header_field": self.on_header_field,
+                    "on_header_value": self.on_header_value,
+                    "on_header_end": self.on_header_end,
+                    "on_headers_finished": self.on_headers_finished,
+                },
+            )
+        elif content_type == b"application/x-www-form-urlencoded":
+            parser = multipart.QuerystringParser(
+                {
+                    "on_field_start": self.on_field_start,
+                    "on_field_name": self.on_field_name,
+                    "on_field_data": self.on_field_data,
+                    "on_field_end": self.on_field_end,
+                }
+            )
+        else:
+            return FormData()
+
+        body_size = 0
+        try:
+            async for chunk in self.stream:
+                body_size += len(chunk)
+                if self.max_body_size is not None and body_size > self.max_body_size:
+                    raise HTTPException(
+                        413,
+                        f"Request body exceeded maximum size of {self.max_body_size} bytes.",
+                    )
+                parser.write(chunk)
+                await self._handle_file_events()
+            parser.finalize()
+            await self._handle_file_events()
+        except FormParserError as exc:
+            await self.abort()
+            raise HTTPException(400, "Malformed form data.") from exc
+        except BaseException:
+            await self.abort()
+            raise
+        return FormData(self.items)  # type: ignore [arg-type]
+
+    async def abort(self) -> None:
+        """Abort every file sink, including those of files that were fully received."""
+        with anyio.CancelScope(shield=True):
+            for sink in self._open_sinks:
+                await sink.abort()
+        self._open_sinks.clear()
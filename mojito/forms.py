@@ -1,12 +1,25 @@
-from collections.abc import AsyncGenerator
+import functools
+import io
+import os
+import shutil
+import typing
+from collections.abc import AsyncGenerator, AsyncIterator, Mapping, Sequence
 from contextlib import asynccontextmanager
-from typing import Any, TypeVar, get_origin
+from typing import Annotated, Any, Callable, Optional, TypeVar, Union, get_origin
 
-from pydantic import GetCoreSchemaHandler
-from pydantic_core import CoreSchema, core_schema
+from pydantic import GetCoreSchemaHandler, TypeAdapter, ValidationError
+from pydantic_core import CoreSchema, InitErrorDetails, PydanticCustomError, core_schema
+from starlette.concurrency import run_in_threadpool
 from starlette.datastructures import FormData
 from starlette.datastructures import UploadFile as StarletteUploadFile
 
+from .formparsers import CallbackSink as CallbackSink
+from .formparsers import DiskSink as DiskSink
+from .formparsers import FileSink as FileSink
+from .formparsers import HashSink as HashSink
+from .formparsers import SinkFactory as SinkFactory
+from .formparsers import StreamedFile as StreamedFile
+from .formparsers import StreamingFormParser
 from .requests import Request
 
 try:
@@ -20,34 +33,98 @@ except ModuleNotFoundError:
 PydanticModel = TypeVar("PydanticModel", bound=BaseModel)
 
 
-def _process_form(form: FormData, model: type[PydanticModel]) -> dict[str, Any]:
-    # Preprocesses the form data before pydantic does any validation.
-    # 1. Empty form inputs are sent as "" empty strings. Check and delete them from the
-    #   form response before pydantic validates it
-    # 2. Combine fields with the same name into a list of the fields values
-    items = form.multi_items()
-    fields = model.model_fields
-    processed_items: dict[str, Any] = {}
-    for item_name, item_value in items:
-        # Build dict to return
-        pydantic_field = fields.get(item_name)
-        if isinstance(item_value, str) and not len(item_value) > 0:
-            continue  # Skip this value if it is an empty string
-        if processed_items.get(item_name):
-            current_value = processed_items[item_name]
-            # Item with that name already exists. Make or append to list.
-            if isinstance(current_value, list):
-                processed_items[item_name].append(item_value)
+class _FormPlan:
+    """Preprocessing plan for the form data of a Pydantic model. Built once per model.
+
+    Args:
+        model (type[BaseModel]): The model the form is validated against.
+    """
+
+    __slots__ = (
+        "fields",
+        "list_fields",
+        "file_size_limits",
+        "drop_unknown",
+        "_validators",
+        "model",
+    )
+
+    def __init__(self, model: type[BaseModel]) -> None:
+        self.model = model
+        fields: set[str] = set()
+        list_fields: set[str] = set()
+        # FileConstraints.max_size of file fields, enforced while streaming the form
+        file_size_limits: dict[str, int] = {}
+        # Unknown fields are ignored by Pydantic unless the model allows or forbids extras
+        drop_unknown = model.model_config.get("extra", "ignore") == "ignore"
+        for name, field in model.model_fields.items():
+            names = {name}
+            for alias in (field.alias, field.validation_alias):
+                if isinstance(alias, str):
+                    names.add(alias)
+                elif alias is not None:
+                    drop_unknown = False  # AliasPath or AliasChoices
+            fields |= names
+            if get_origin(field.annotation) is list:
+                list_fields |= names
+            for constraint in field.metadata:
+                if isinstance(constraint, FileConstraints) and constraint.max_size:
+                    file_size_limits.update(dict.fromkeys(names, constraint.max_size))
+        self.fields = frozenset(fields)
+        self.list_fields = frozenset(list_fields)
+        self.file_size_limits = file_size_limits
+        self.drop_unknown = drop_unknown
+        self._validators: Optional[dict[str, TypeAdapter[Any]]] = None
+
+    @property
+    def validators(self) -> dict[str, TypeAdapter[Any]]:
+        """Validators for the single value fields of the model. Used to reject a streamed
+        form as soon as an invalid field is received."""
+        if self._validators is None:
+            validators: dict[str, TypeAdapter[Any]] = {}
+            for name, field in self.model.model_fields.items():
+                if field.annotation is None or get_origin(field.annotation) is list:
+                    continue
+                validators[name] = TypeAdapter(Annotated[field.annotation, field])  # type: ignore [arg-type]
+            self._validators = validators
+        return self._validators
+
+    def process(self, items: list[tuple[str, Any]]) -> dict[str, Any]:
+        # Preprocesses the form data before pydantic does any validation.
+        # 1. Empty form inputs are sent as "" empty strings. Check and delete them from the
+        #   form response before pydantic validates it
+        # 2. Combine fields with the same name into a list of the fields values
+        fields = self.fields
+        list_fields = self.list_fields
+        drop_unknown = self.drop_unknown
+        processed_items: dict[str, Any] = {}
+        for item_name, item_value in items:
+            if isinstance(item_value, str) and not item_value:
+                continue  # Skip this value if it is an empty string
+            if drop_unknown and item_name not in fields:
+                continue  # Ignored by pydantic
+            if item_name in processed_items:
+                current_value = processed_items[item_name]
+                # Item with that name already exists. Make or append to list.
+                if isinstance(current_value, list):
+                    current_value.append(item_value)
+                else:
+                    processed_items[item_name] = [current_value, item_value]
+            elif item_name in list_fields:
+                # Field is defined as a list in the Pydantic model
+                processed_items[item_name] = [item_value]
             else:
-                processed_items[item_name] = [current_value, item_value]
-            continue
-        elif pydantic_field and get_origin(pydantic_field.annotation) is list:
-            # Field doesn't exist yet and is defined as a list in the Pydantic model
-            processed_items[item_name] = [item_value]
-            continue
-        processed_items[item_name] = item_value
+                processed_items[item_name] = item_value
+        return processed_items
+
+
+@functools.lru_cache(maxsize=256)
+def _form_plan(model: type[BaseModel]) -> _FormPlan:
+    return _FormPlan(model)
+
 
-    return processed_items
+def _process_form(form: FormData, model: type[PydanticModel]) -> dict[str, Any]:
+    return _form_plan(model).process(form.multi_items())
 
 
 @asynccontextmanager
@@ -93,16 +170,259 @@ async def Form(
         return valid_model
 
 
+def _validate_field(model: type[BaseModel], name: str, value: str) -> None:
+    validator = _form_plan(model).validators.get(name)
+    if validator is None or not value:
+        return  # Empty values are treated as missing when the model is validated
+    try:
+        validator.validate_python(value)
+    except ValidationError as e:
+        # Report the error under the field name like model_validate() would
+        line_errors: list[InitErrorDetails] = [
+            {
+                "type": error["type"],
+                "loc": (name, *error["loc"]),
+                "input": error["input"],
+                "ctx": error.get("ctx", {}),
+            }
+            for error in e.errors()
+        ]
+        try:
+            error = ValidationError.from_exception_data(model.__name__, line_errors)
+        except (KeyError, TypeError):
+            raise e from None  # Custom error types can't be rebuilt
+        raise error from None
+
+
+async def StreamingForm(
+    request: Request,
+    model: type[PydanticModel],
+    files: Optional[Mapping[str, SinkFactory]] = None,
+    max_files: int = 1000,
+    max_fields: int = 1000,
+    max_field_size: int = 1024 * 1024,
+    max_file_size: Optional[int] = None,
+    max_body_size: Optional[int] = None,
+) -> PydanticModel:
+    """Validates the form fields against the model while the form is received. Uploaded
+    files are passed to a FileSink as they arrive instead of being buffered, so a handler
+    can save, hash or forward large uploads without holding them in memory or a temp file.
+
+    Fields that aren't part of the model are not read into memory. Reading the request
+    stops as soon as a field is invalid or a limit is exceeded and the sinks of the files
+    received so far are aborted.
+
+    Use StreamedFile as the type of file fields in the model. The file's `result` is the
+    value returned by its sink, like the file path for a DiskSink. The `max_size` of a
+    field's FileConstraints is enforced like max_file_size, while the file is received.
+
+    Args:
+        request (Request): Mojito Request object
+        model (PydanticModel): The Pydantic model to validate against
+        files (Optional[Mapping[str, SinkFactory]]): Maps file field names to a function
+            called with the StreamedFile that returns the FileSink to write it to. Files of
+            other fields are skipped. Defaults to None.
+        max_files (int): The maximum number of files. Defaults to 1000.
+        max_fields (int): The maximum number of fields. Defaults to 1000.
+        max_field_size (int): In bytes. The maximum size of each field. Defaults to 1MB.
+        max_file_size (Optional[int]): In bytes. The maximum size of each file. Defaults to
+            None for no limit.
+        max_body_size (Optional[int]): In bytes. The maximum size of the whole request body.
+            Defaults to None for no limit.
+
+    Returns:
+        PydanticModel: The validated Pydantic model
+
+    Raises:
+        ValidationError: Pydantic validation error
+        HTTPException: 413 error when a limit is exceeded or 400 for a malformed form
+    """
+    plan = _form_plan(model)
+    on_field: Callable[[str, str], None] = functools.partial(_validate_field, model)
+    parser = StreamingFormParser(
+        request.headers,
+        request.stream(),
+        sinks=files or {},
+        fields=plan.fields if plan.drop_unknown else None,
+        on_field=on_field,
+        max_file_sizes=plan.file_size_limits,
+        max_files=max_files,
+        max_fields=max_fields,
+        max_field_size=max_field_size,
+        max_file_size=max_file_size,
+        max_body_size=max_body_size,
+    )
+    form = await parser.parse()
+    try:
+        return model.model_validate(_process_form(form, model))
+    except BaseException:
+        await parser.abort()
+        raise
+
+
+def _read_into_buffer(
+    file: io.BufferedIOBase, buffer: Union[bytearray, memoryview]
+) -> int:
+    data = file.read(len(buffer))
+    buffer[: len(data)] = data
+    return len(data)
+
+
 class UploadFile(StarletteUploadFile):
     """An uploaded file included as part of the request data.
 
     This is a subclass of starlette.datastructures.UploadFile that can be used in a Pydantic
-    BaseModel class. Pydantic will pass the model through as-is without validation.
+    BaseModel class. Pydantic converts the uploaded file to this class without copying its
+    content so it can be read in chunks or saved without loading it into memory.
     """
 
+    async def iter_chunks(self, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        """Read the file from the current position in chunks.
+
+        Args:
+            chunk_size (int): In bytes. Maximum size of each chunk. Defaults to 64KB.
+
+        Yields:
+            bytes: The next chunk of the file
+        """
+        while chunk := await self.read(chunk_size):
+            yield chunk
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self.iter_chunks()
+
+    async def readinto(self, buffer: Union[bytearray, memoryview]) -> int:
+        """Read from the current position into a buffer provided by the caller.
+
+        Args:
+            buffer (bytearray | memoryview): Filled with up to len(buffer) bytes.
+
+        Returns:
+            int: The number of bytes read. 0 at the end of the file.
+        """
+        file = typing.cast(io.BufferedIOBase, self.file)
+        readinto = getattr(file, "readinto", None)
+        if readinto is None:  # SpooledTemporaryFile before Python 3.11
+            readinto = functools.partial(_read_into_buffer, file)
+        if self._in_memory:
+            return readinto(buffer)
+        return await run_in_threadpool(readinto, buffer)
+
+    def _save(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        file = self.file
+        file.seek(0)
+        with open(path, "wb") as destination:
+            if not self._in_memory and hasattr(os, "sendfile"):
+                file.flush()
+                try:
+                    # Copy between the files in the kernel without reading into Python
+                    offset = 0
+                    while sent := os.sendfile(
+                        destination.fileno(), file.fileno(), offset, 1 << 30
+                    ):
+                        offset += sent
+                    return
+                except OSError:
+                    destination.seek(0)
+                    destination.truncate()
+                    file.seek(0)
+            shutil.copyfileobj(file, destination)
+
+    async def save(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        """Copy the whole file to a path. Overwrites the path if it exists.
+
+        Args:
+            path (str | os.PathLike[str]): Where to copy the file to.
+        """
+        await run_in_threadpool(self._save, path)
+
+    @classmethod
+    def _validate(cls, value: Any) -> "UploadFile":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, StarletteUploadFile):
+            return cls(
+                value.file,
+                size=value.size,
+                filename=value.filename,
+                headers=value.headers,
+            )
+        raise PydanticCustomError("upload_file", "Expected an uploaded file")
+
     @classmethod
     def __get_pydantic_core_schema__(
         cls, source_type: Any, handler: GetCoreSchemaHandler
     ) -> CoreSchema:
-        # Allow this file type to pass through pydantic without schema validation
-        return core_schema.any_schema()
+        return core_schema.no_info_plain_validator_function(cls._validate)
+
+
+class FileConstraints:
+    """Constraints for an uploaded file field of a Pydantic model. Works with UploadFile
+    and StreamedFile fields.
+
+    ```py
+    class ProfileForm(BaseModel):
+        avatar: Annotated[UploadFile, FileConstraints(max_size=1_000_000, content_types=["image/*"])]
+    ```
+
+    Args:
+        max_size (Optional[int]): In bytes. The maximum size of the file. Defaults to None.
+        content_types (Optional[Sequence[str]]): Allowed content types. A type ending
+            with `/*` allows all its subtypes. Defaults to None to allow any type.
+    """
+
+    __slots__ = ("max_size", "content_types")
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        content_types: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.max_size = max_size
+        self.content_types = (
+            None
+            if content_types is None
+            else frozenset(content_type.lower() for content_type in content_types)
+        )
+
+    def _content_type_allowed(self, content_type: Optional[str]) -> bool:
+        assert self.content_types is not None
+        if not content_type:
+            return False
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        return (
+            media_type in self.content_types
+            or media_type.split("/", 1)[0] + "/*" in self.content_types
+        )
+
+    def validate(self, value: Any) -> Any:
+        if value is None:
+            return value
+        if self.max_size is not None and (value.size or 0) > self.max_size:
+            raise PydanticCustomError(
+                "file_too_large",
+                "File exceeds the maximum size of {max_size} bytes",
+                {"max_size": self.max_size},
+            )
+        if self.content_types is not None and not self._content_type_allowed(
+            value.content_type
+        ):
+            raise PydanticCustomError(
+                "file_content_type",
+                "File content type must be one of {content_types}",
+                {"content_types": ", ".join(sorted(self.content_types))},
+            )
+        return value
+
+    def __get_pydantic_core_schema__(
+        self, source_type: Any, handler: GetCoreSchemaHandler
+    ) -> CoreSchema:
+        return core_schema.no_info_after_validator_function(
+            self.validate, handler(source_type)
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(max_size={self.max_size!r}, "
+            f"content_types={self.content_types!r})"
+        )
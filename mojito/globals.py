@@ -1,23 +1,58 @@
 # Credit to https://gist.github.com/ddanier/ead419826ac6c3d75c96f9d89bea9bd0
-from collections.abc import Awaitable, Callable
-from contextvars import ContextVar, copy_context
-from typing import Any
+from collections.abc import Awaitable, Generator
+from contextvars import Context, ContextVar, Token, copy_context
+from typing import Any, Optional
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class GlobalsNamespace:
+    """Per-request storage for globals. Attributes Mojito uses on every request are slots,
+    any other attribute set on g is stored in the instance __dict__."""
+
+    __slots__ = ("request", "flash_messages", "next_flash_messages", "__dict__")
+
+    def __init__(self) -> None:
+        # Fill the slots up front so reading them doesn't fall back to the defaults
+        self.request: Any = None
+        self.flash_messages: Any = None
+        self.next_flash_messages: Any = None
+
+
+_NAMESPACE_SLOTS = GlobalsNamespace.__slots__[:-1]
 
 
 class GlobalContextVar:
-    __slots__ = ("_vars", "_defaults")
+    """Globals stored in context variables.
+
+    Within a request the GlobalsMiddleware sets a single GlobalsNamespace for the request
+    and variables are stored as attributes on it. Outside of a request each variable is
+    stored in its own ContextVar.
+    """
+
+    __slots__ = ("_vars", "_defaults", "_namespace")
 
     _vars: dict[str, ContextVar[Any]]
     _defaults: dict[str, Any]
+    _namespace: ContextVar[Optional[GlobalsNamespace]]
 
     def __init__(self) -> None:
         object.__setattr__(self, "_vars", {})
         object.__setattr__(self, "_defaults", {})
+        object.__setattr__(
+            self, "_namespace", ContextVar("globals:namespace", default=None)
+        )
+
+    def new_namespace(self) -> Token[Optional[GlobalsNamespace]]:
+        """Start a new GlobalsNamespace in the current context. Variables set after this
+        are stored on the namespace until the returned token is reset."""
+
+        namespace = GlobalsNamespace()
+        if self._defaults:
+            for name in _NAMESPACE_SLOTS:
+                if name in self._defaults:
+                    setattr(namespace, name, self._get_default_value(name))
+        return self._namespace.set(namespace)
 
     def set_default(self, name: str, default: Any) -> None:
         """Set a default value for a variable."""
@@ -53,28 +88,66 @@ class GlobalContextVar:
     def __getattr__(self, name: str) -> Any:
         """Get the value of a variable."""
 
+        namespace = self._namespace.get()
+        if namespace is not None:
+            try:
+                return getattr(namespace, name)
+            except AttributeError:
+                if name in self._vars:
+                    # Set outside of a request, e.g. at import time
+                    return self._vars[name].get()
+                value = self._get_default_value(name)
+                setattr(namespace, name, value)
+                return value
         self._ensure_var(name)
         return self._vars[name].get()
 
     def __setattr__(self, name: str, value: Any) -> None:
         """Set the value of a variable."""
 
+        namespace = self._namespace.get()
+        if namespace is not None:
+            setattr(namespace, name, value)
+            return
         self._ensure_var(name)
         self._vars[name].set(value)
 
 
-async def globals_middleware_dispatch(
-    request: Request,
-    call_next: Callable[..., Awaitable[Response]],
-) -> Response:
-    """Dispatch the request in a new context to allow globals to be used."""
-
-    ctx = copy_context()
-
-    def _call_next() -> Awaitable[Response]:
-        return call_next(request)
-
-    return await ctx.run(_call_next)
+class _RunInContext:
+    """Awaitable that steps another awaitable inside of a contextvars.Context.
+
+    Equivalent to running the awaitable as a new task created with the context, but
+    without the overhead of creating and scheduling a task.
+    """
+
+    __slots__ = ("_ctx", "_coro")
+
+    def __init__(self, ctx: Context, awaitable: Awaitable[Any]) -> None:
+        self._ctx = ctx
+        self._coro = awaitable.__await__()
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        ctx = self._ctx
+        coro = self._coro
+        value: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            try:
+                if error is None:
+                    yielded = ctx.run(coro.send, value)
+                else:
+                    yielded = ctx.run(coro.throw, error)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                value = yield yielded
+                error = None
+            except GeneratorExit:
+                ctx.run(coro.close)
+                raise
+            except BaseException as e:
+                value = None
+                error = e
 
 
 g = GlobalContextVar()
@@ -88,11 +161,22 @@ Usage:
 """
 
 
-class GlobalsMiddleware(BaseHTTPMiddleware):  # noqa
-    """Middleware to setup the globals context using globals_middleware_dispatch().
+class GlobalsMiddleware:
+    """Middleware to setup the globals context. Runs the rest of the application in a new
+    copy of the current context with a new GlobalsNamespace so globals set during a request
+    are isolated to that request.
 
     Should be the first middleware processed in the application. Sets g.request to the
     current request."""
 
     def __init__(self, app: ASGIApp) -> None:
-        super().__init__(app, globals_middleware_dispatch)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):  # pragma: no cover
+            await self.app(scope, receive, send)
+            return
+
+        ctx = copy_context()
+        ctx.run(g.new_namespace)
+        await _RunInContext(ctx, self.app(scope, receive, send))
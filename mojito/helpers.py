@@ -1,11 +1,10 @@
-import json
 import typing as t
-from base64 import b64encode
-
-import itsdangerous
 
 from .config import Config
 from .globals import g
+from .requests import resolve_lazy
+from .serializers import encode_cookie_payload
+from .signing import get_signer
 
 
 class MessageFlash(t.TypedDict):
@@ -14,9 +13,9 @@ class MessageFlash(t.TypedDict):
 
 
 def encode_message_cookie(message: list[MessageFlash]) -> bytes:
-    data = b64encode(json.dumps(g.next_flash_messages).encode("utf-8"))
-    cookie = itsdangerous.TimestampSigner(str(Config.SECRET_KEY)).sign(data)
-    return cookie
+    data = encode_cookie_payload(message)
+    signer = get_signer(Config.SECRET_KEY, Config.SECRET_KEY_FALLBACKS)
+    return signer.sign(data)
 
 
 def flash_message(message: str, category: t.Optional[str] = None) -> None:
@@ -27,4 +26,4 @@ def flash_message(message: str, category: t.Optional[str] = None) -> None:
 
 
 def get_flashed_messages() -> t.Optional[list[MessageFlash]]:
-    return g.flash_messages  # type: ignore [no-any-return]
+    return resolve_lazy(g.flash_messages)  # type: ignore [no-any-return]
@@ -1,31 +1,53 @@
 from __future__ import annotations
 
-import json
 import typing
-from base64 import b64decode
+from collections.abc import Sequence
 
-import itsdangerous
 from itsdangerous.exc import BadSignature
 from starlette.datastructures import Secret
-from starlette.requests import HTTPConnection
-from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from . import config
 from .globals import g
+from .requests import LazyProxy, request_cookies
+from .serializers import decode_cookie_payload, encode_cookie_payload
+from .signing import get_signer
 
 
 class MessageFlashMiddleware:
+    """Provides the messages flashed by the previous request as `g.flash_messages` and
+    stores the messages flashed during this request in the message flash cookie.
+
+    The cookie is only read and verified when the messages are first used.
+
+    Args:
+        secret_key (str | Secret | None): Key the cookie is signed with. Defaults to
+            Config.SECRET_KEY.
+        fallback_secret_keys (Sequence[str | Secret] | None): Previous secret keys cookies
+            are still accepted from. Defaults to Config.SECRET_KEY_FALLBACKS.
+        compact_cookies (bool | None): Store the messages in the compact format. Defaults
+            to Config.COMPACT_COOKIES.
+    """
+
     def __init__(
         self,
         app: ASGIApp,
-        secret_key: str | Secret = config.Config.SECRET_KEY,
+        secret_key: str | Secret | None = None,
         path: str = "/",
         same_site: typing.Literal["lax", "strict", "none"] = "lax",
         https_only: bool = False,
         domain: str | None = None,
+        fallback_secret_keys: Sequence[str | Secret] | None = None,
+        compact_cookies: bool | None = None,
     ) -> None:
         self.app = app
-        self.signer = itsdangerous.TimestampSigner(str(secret_key))
+        self.signer = get_signer(
+            config.Config.SECRET_KEY if secret_key is None else secret_key,
+            config.Config.SECRET_KEY_FALLBACKS
+            if fallback_secret_keys is None
+            else fallback_secret_keys,
+        )
+        self.compact_cookies = compact_cookies
         self.message_flash_cookie = config.Config.MESSAGE_FLASH_COOKIE
         self.max_age = 60 * 60  # 1 hr
         self.path = path
@@ -34,24 +56,65 @@ class MessageFlashMiddleware:
             self.security_flags += "; secure"
         if domain is not None:
             self.security_flags += f"; domain={domain}"
+        # Set-Cookie header parts that are the same for every response
+        self._cookie_prefix = f"{self.message_flash_cookie}=".encode("latin-1")
+        self._cookie_suffix = f"; path={self.path}; {self.security_flags}".encode(
+            "latin-1"
+        )
+
+    def load_messages(self, scope: Scope) -> None:
+        """Set `g.flash_messages` to the messages flashed by the previous request. They're
+        read from the cookie when first used.
+
+        Args:
+            scope (Scope): The ASGI scope of the request.
+        """
+
+        def load_flash_messages() -> list[typing.Any]:
+            # Read the flash messages when g.flash_messages is first used
+            messages: list[typing.Any] = []
+            cookie = request_cookies(scope).get(self.message_flash_cookie)
+            if cookie is not None:
+                try:
+                    data = self.signer.unsign(
+                        cookie.encode("utf-8"), max_age=self.max_age
+                    )
+                    messages = decode_cookie_payload(data)
+                except (BadSignature, ValueError):
+                    pass
+            g.flash_messages = messages
+            return messages
+
+        g.flash_messages = LazyProxy(load_flash_messages)
+
+    def save_messages(self, message: Message) -> None:
+        """Add the cookie storing the messages flashed for the next request to the
+        http.response.start message.
+
+        Args:
+            message (Message): The http.response.start message.
+        """
+        if g.next_flash_messages:
+            data = self.signer.sign(
+                encode_cookie_payload(g.next_flash_messages, self.compact_cookies)
+            )
+            # The headers of the message may be shared with the response
+            message["headers"] = [
+                *message.get("headers", ()),
+                (b"set-cookie", self._cookie_prefix + data + self._cookie_suffix),
+            ]
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] not in ("http", "websocket"):  # pragma: no cover
             await self.app(scope, receive, send)
             return
 
-        connection = HTTPConnection(scope)
-
-        # Read flash messages if the cookie exists and set g.flash_messages
-        if self.message_flash_cookie in connection.cookies:
-            data = connection.cookies[self.message_flash_cookie].encode("utf-8")
+        self.load_messages(scope)
 
-            try:
-                data = self.signer.unsign(data, max_age=self.max_age)
-                g.flash_messages = json.loads(b64decode(data))
-            except BadSignature:
-                g.flash_messages = []
-        else:
-            g.flash_messages = []
+        async def send_wrapper(message: Message) -> None:
+            # Store the messages flashed for the next request
+            if message["type"] == "http.response.start":
+                self.save_messages(message)
+            await send(message)
 
-        await self.app(scope, receive, send)
+        await self.app(scope, receive, send_wrapper)
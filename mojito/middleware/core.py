@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import typing
+from contextvars import copy_context
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..globals import _RunInContext, g
+from ..message_flash import MessageFlashMiddleware
+from .session_stores import SessionStore
+from .user_sessions import UserSessionMiddleware
+
+
+class CoreMiddleware:
+    """Does the work of the GlobalsMiddleware, UserSessionMiddleware and
+    MessageFlashMiddleware in a single middleware.
+
+    The globals context is set up, the session and flashed messages are loaded and a single
+    send wrapper saves both cookies when the response starts. Requests pass through one
+    middleware instead of three.
+
+    Args:
+        sessions (bool): Provide the user session on `Request.user`. Defaults to True.
+        flash_messages (bool): Provide message flashing. Defaults to True.
+        session_store (SessionStore | None): Server-side session store. Defaults to None.
+        session_options (dict[str, Any] | None): Keyword arguments for the
+            UserSessionMiddleware. Defaults to None.
+        flash_options (dict[str, Any] | None): Keyword arguments for the
+            MessageFlashMiddleware. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sessions: bool = True,
+        flash_messages: bool = True,
+        session_store: SessionStore | None = None,
+        session_options: dict[str, typing.Any] | None = None,
+        flash_options: dict[str, typing.Any] | None = None,
+    ) -> None:
+        self.app = app
+        self.sessions: UserSessionMiddleware | None = None
+        if sessions:
+            self.sessions = UserSessionMiddleware(
+                app, store=session_store, **(session_options or {})
+            )
+        self.flash_messages: MessageFlashMiddleware | None = None
+        if flash_messages:
+            self.flash_messages = MessageFlashMiddleware(app, **(flash_options or {}))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):  # pragma: no cover
+            await self.app(scope, receive, send)
+            return
+
+        ctx = copy_context()
+        ctx.run(g.new_namespace)
+        if self.sessions is None and self.flash_messages is None:
+            await _RunInContext(ctx, self.app(scope, receive, send))
+        else:
+            await _RunInContext(ctx, self._handle(scope, receive, send))
+
+    async def _handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        sessions = self.sessions
+        flash_messages = self.flash_messages
+        if flash_messages is not None:
+            flash_messages.load_messages(scope)
+        request_session = None
+        if sessions is not None:
+            request_session = await sessions.open_session(scope)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                if flash_messages is not None:
+                    flash_messages.save_messages(message)
+                if request_session is not None:
+                    await request_session.save(message)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,204 @@
+"""Server-side storage for user sessions.
+
+When a store is given to the UserSessionMiddleware the session data is kept in the store
+and the cookie only carries the signed session id."""
+
+from __future__ import annotations
+
+import copy
+import sqlite3
+import threading
+import time
+import typing
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+
+from ..serializers import json_dumps, json_loads
+
+
+class SessionStore(typing.Protocol):
+    """Base class that all session store backends should implement."""
+
+    async def load(self, session_id: str) -> dict[str, typing.Any] | None:
+        """Load the session data.
+
+        Args:
+            session_id (str): The session id from the session cookie.
+
+        Returns:
+            dict[str, Any] | None: The session data or None if the session doesn't exist or expired.
+        """
+        raise NotImplementedError()
+
+    async def save(
+        self, session_id: str, data: dict[str, typing.Any], max_age: int
+    ) -> None:
+        """Create or replace the session data.
+
+        Args:
+            session_id (str): The session id.
+            data (dict[str, Any]): The session data. Must be JSON serializable.
+            max_age (int): In seconds. How long the session should be kept.
+        """
+        raise NotImplementedError()
+
+    async def delete(self, session_id: str) -> None:
+        """Delete the session if it exists.
+
+        Args:
+            session_id (str): The session id.
+        """
+        raise NotImplementedError()
+
+
+class MemorySessionStore(SessionStore):
+    """Keeps sessions in the memory of the current process. Least recently used sessions
+    are evicted once max_size is reached.
+
+    Sessions are not shared between worker processes and are lost on restart. Use it for
+    single process deployments or as the cache of a CachedSessionStore. Sessions are copied
+    when saved and loaded so changes made during a request are only stored when the
+    session is saved, like with the other stores.
+
+    Args:
+        max_size (int): Maximum number of sessions to keep. Defaults to 10,000.
+        ttl (Optional[int]): In seconds. Overrides the max_age given when a session is saved.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: int | None = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sessions: OrderedDict[str, tuple[float, dict[str, typing.Any]]] = (
+            OrderedDict()
+        )
+
+    async def load(self, session_id: str) -> dict[str, typing.Any] | None:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires, data = entry
+        if expires < time.monotonic():
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return copy.deepcopy(data)
+
+    async def save(
+        self, session_id: str, data: dict[str, typing.Any], max_age: int
+    ) -> None:
+        ttl = self.ttl if self.ttl is not None else max_age
+        self._sessions[session_id] = (time.monotonic() + ttl, copy.deepcopy(data))
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_size:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Keeps sessions in a SQLite database. Queries are run in the threadpool so they don't
+    block the event loop.
+
+    Args:
+        path (str): Path to the database file. The sessions table is created if it doesn't exist.
+        table (str): Name of the sessions table. Defaults to `mojito_sessions`.
+    """
+
+    def __init__(self, path: str, table: str = "mojito_sessions") -> None:
+        if not table.isidentifier():
+            raise ValueError(f"invalid table name: {table}")
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(id TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _load(self, session_id: str) -> dict[str, typing.Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT data FROM {self.table} WHERE id = ? AND expires > ?",
+                (session_id, time.time()),
+            ).fetchone()
+        return json_loads(row[0]) if row else None
+
+    def _save(self, session_id: str, data: str, max_age: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (id, data, expires) VALUES (?, ?, ?)",
+                (session_id, data, time.time() + max_age),
+            )
+
+    def _delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (session_id,))
+
+    def _purge_expired(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires <= ?", (time.time(),)
+            )
+
+    async def load(self, session_id: str) -> dict[str, typing.Any] | None:
+        return await run_in_threadpool(self._load, session_id)
+
+    async def save(
+        self, session_id: str, data: dict[str, typing.Any], max_age: int
+    ) -> None:
+        await run_in_threadpool(
+            self._save, session_id, json_dumps(data).decode("utf-8"), max_age
+        )
+
+    async def delete(self, session_id: str) -> None:
+        await run_in_threadpool(self._delete, session_id)
+
+    async def purge_expired(self) -> None:
+        """Delete all expired sessions from the database."""
+        await run_in_threadpool(self._purge_expired)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+
+class CachedSessionStore(SessionStore):
+    """Write-through cache in front of another session store. Sessions are read from an
+    in-memory cache and only loaded from the store on a cache miss. Saves and deletes are
+    applied to both.
+
+    With multiple worker processes a change made by another worker is seen once the cached
+    copy expires.
+
+    Args:
+        store (SessionStore): The backing session store.
+        max_size (int): Maximum number of sessions to cache. Defaults to 1,000.
+        ttl (int): In seconds. How long a session is cached. Defaults to 5 minutes.
+    """
+
+    def __init__(
+        self, store: SessionStore, max_size: int = 1_000, ttl: int = 60 * 5
+    ) -> None:
+        self.store = store
+        self.cache = MemorySessionStore(max_size=max_size, ttl=ttl)
+
+    async def load(self, session_id: str) -> dict[str, typing.Any] | None:
+        data = await self.cache.load(session_id)
+        if data is None:
+            data = await self.store.load(session_id)
+            if data is not None:
+                await self.cache.save(session_id, data, 0)  # Cache uses its own ttl
+        return data
+
+    async def save(
+        self, session_id: str, data: dict[str, typing.Any], max_age: int
+    ) -> None:
+        await self.store.save(session_id, data, max_age)
+        await self.cache.save(session_id, data, max_age)
+
+    async def delete(self, session_id: str) -> None:
+        await self.store.delete(session_id)
+        await self.cache.delete(session_id)
@@ -1,26 +1,98 @@
 from __future__ import annotations
 
+import copy
 import datetime
-import json
+import secrets
 import typing
-from base64 import b64decode, b64encode
 
-import itsdangerous
 from itsdangerous.exc import BadSignature
-from starlette.datastructures import MutableHeaders
-from starlette.requests import HTTPConnection
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .. import config
+from ..requests import LazyProxy, request_cookies
+from ..serializers import decode_cookie_payload, encode_cookie_payload
+from ..signing import get_signer
+from .session_stores import SessionStore
 
 if typing.TYPE_CHECKING:
     from ..auth import AuthSessionData
 
 
+class UserSession(dict[str, typing.Any]):
+    """The user session data stored on `Request.user`.
+
+    Changes to the top level keys are tracked so the session cookie is only sent again
+    when the session was modified. After changing a nested value, such as
+    `request.user["data"]["name"]`, set `modified = True` to have it saved.
+    """
+
+    __slots__ = ("modified", "original")
+
+    modified: bool
+    "True once the session has been changed during the request."
+    original: dict[str, typing.Any] | None
+    "Copy of the session data taken before it was first changed."
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.modified = False
+        self.original = None
+
+    def _on_change(self) -> None:
+        if not self.modified:
+            self.original = copy.deepcopy(dict(self))
+            self.modified = True
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        self._on_change()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self._on_change()
+        super().__delitem__(key)
+
+    def __ior__(self, other: typing.Any) -> UserSession:  # type: ignore [override,misc]
+        self._on_change()
+        super().__ior__(other)
+        return self
+
+    def clear(self) -> None:
+        self._on_change()
+        super().clear()
+
+    def pop(self, key: str, *args: typing.Any) -> typing.Any:
+        self._on_change()
+        return super().pop(key, *args)
+
+    def popitem(self) -> tuple[str, typing.Any]:
+        self._on_change()
+        return super().popitem()
+
+    def setdefault(self, key: str, default: typing.Any = None) -> typing.Any:
+        self._on_change()
+        return super().setdefault(key, default)
+
+    def update(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        self._on_change()
+        super().update(*args, **kwargs)
+
+
+def _append_set_cookie(message: Message, cookie: bytes) -> None:
+    # The headers of the message may be shared with the response, don't modify them
+    message["headers"] = [*message.get("headers", ()), (b"set-cookie", cookie)]
+
+
 class UserSessionMiddleware:
     """Adds `user` data to the Request object.
 
-    Used for authentication and session management.
+    Used for authentication and session management. By default the session data is
+    stored in the signed session cookie. When a session store is given the data is kept
+    in the store and the cookie only carries the signed session id.
+
+    Args:
+        store (Optional[SessionStore]): Server-side session store. Defaults to None.
+        compact_cookies (Optional[bool]): Store the session data in the cookie in the
+            compact format. Defaults to Config.COMPACT_COOKIES.
     """
 
     # Works nearly the same as Starlettes SessionMiddleware but without some of the configuration options
@@ -30,9 +102,15 @@ class UserSessionMiddleware:
         same_site: typing.Literal["lax", "strict", "none"] = "strict",
         https_only: bool = False,
         domain: str | None = None,
+        store: SessionStore | None = None,
+        compact_cookies: bool | None = None,
     ) -> None:
         self.app = app
-        self.signer = itsdangerous.TimestampSigner(config.Config.SECRET_KEY)
+        self.store = store
+        self.compact_cookies = compact_cookies
+        self.signer = get_signer(
+            config.Config.SECRET_KEY, config.Config.SECRET_KEY_FALLBACKS
+        )
         self.cookie_name = config.Config.USER_SESSION_COOKIE
         self.max_age = config.Config.USER_SESSION_EXPIRES
         self.path = "/"
@@ -41,67 +119,197 @@ class UserSessionMiddleware:
             self.security_flags += "; secure"
         if domain is not None:
             self.security_flags += f"; domain={domain}"
+        # Set-Cookie header parts that are the same for every response
+        self._cookie_prefix = f"{self.cookie_name}=".encode("latin-1")
+        self._cookie_suffix = f"; path={self.path}; {self.security_flags}".encode(
+            "latin-1"
+        )
+        self._persistent_cookie_suffix = (
+            f"; path={self.path}; Max-Age={self.max_age}; {self.security_flags}"
+        ).encode("latin-1")
+        self._expired_cookie = (
+            f"{self.cookie_name}=null; path={self.path}; "
+            f"expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.security_flags}"
+        ).encode("latin-1")
+
+    async def open_session(self, scope: Scope) -> _RequestSession:
+        """Set `scope["user"]` to the session of the request.
+
+        Args:
+            scope (Scope): The ASGI scope of the request.
+
+        Returns:
+            _RequestSession: Saves the session when the response starts.
+        """
+        request_session = _RequestSession(self, scope)
+        if self.store is None:
+            request_session.lazy_session = LazyProxy(request_session.load_session)
+            scope["user"] = request_session.lazy_session
+        else:
+            # Loading from the store is async so it can't wait for the first use
+            data = request_session.unsign_cookie()
+            stored_data: AuthSessionData | None = None
+            if data is not None:
+                request_session.session_id = data.decode("utf-8")
+                stored_data = await self.store.load(request_session.session_id)  # type: ignore [assignment]
+            scope["user"] = request_session.make_session(stored_data)
+        return request_session
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] not in ("http", "websocket"):  # pragma: no cover
             await self.app(scope, receive, send)
             return
 
-        connection = HTTPConnection(scope)
-        initial_user_was_empty = True
-
-        if self.cookie_name in connection.cookies:
-            # RECEIVE COOKIE
-            data = connection.cookies[self.cookie_name].encode("utf-8")
-            try:
-                data_bytes, timestamp = self.signer.unsign(
-                    data, max_age=self.max_age, return_timestamp=True
-                )
-                data_decoded = b64decode(data_bytes)
-                json_data: AuthSessionData = json.loads(data_decoded)
-                reauthenticate_after = timestamp + datetime.timedelta(
-                    seconds=config.Config.USER_SESSION_REVALIDATE_AFTER
-                )
-                if datetime.datetime.now(datetime.timezone.utc) > reauthenticate_after:
-                    json_data["is_authenticated"] = (
-                        False  # Force reauthentication if session needs revalidated
-                    )
-                scope["user"] = json_data
-                initial_user_was_empty = False
-            except BadSignature:
-                scope["user"] = {}
-        else:
-            scope["user"] = {}
+        request_session = await self.open_session(scope)
 
         async def send_wrapper(message: Message) -> None:
-            # SEND COOKIE
             if message["type"] == "http.response.start":
-                if scope["user"]:
-                    # We have user data to persist.
-                    data = b64encode(json.dumps(scope["user"]).encode("utf-8"))
-                    data = self.signer.sign(data)
-                    headers = MutableHeaders(scope=message)
-                    header_value = "{cookie_name}={data}; path={path}; {max_age}{security_flags}".format(  # noqa E501
-                        cookie_name=self.cookie_name,
-                        data=data.decode("utf-8"),
-                        path=self.path,
-                        max_age=f"Max-Age={self.max_age}; "
-                        if scope["user"].get("persist_session", False)
-                        else "",
-                        security_flags=self.security_flags,
-                    )
-                    headers.append("Set-Cookie", header_value)
-                elif not initial_user_was_empty:
-                    # The user has been cleared.
-                    headers = MutableHeaders(scope=message)
-                    header_value = "{cookie_name}={data}; path={path}; {expires}{security_flags}".format(  # noqa E501
-                        cookie_name=self.cookie_name,
-                        data="null",
-                        path=self.path,
-                        expires="expires=Thu, 01 Jan 1970 00:00:00 GMT; ",
-                        security_flags=self.security_flags,
-                    )
-                    headers.append("Set-Cookie", header_value)
+                await request_session.save(message)
             await send(message)
 
         await self.app(scope, receive, send_wrapper)
+
+
+class _RequestSession:
+    """The session of a single request, loaded from and saved to the session cookie."""
+
+    __slots__ = (
+        "middleware",
+        "scope",
+        "session_id",
+        "timestamp",
+        "revalidation_forced",
+        "authenticated_in_cookie",
+        "lazy_session",
+        "expire_cookie",
+        "authenticated_at_load",
+    )
+
+    def __init__(self, middleware: UserSessionMiddleware, scope: Scope) -> None:
+        self.middleware = middleware
+        self.scope = scope
+        self.session_id: str | None = None
+        self.timestamp: datetime.datetime | None = None
+        self.revalidation_forced = False
+        self.authenticated_in_cookie: typing.Any = None
+        self.lazy_session: LazyProxy | None = None
+        self.expire_cookie = False
+        self.authenticated_at_load = False
+
+    def unsign_cookie(self) -> bytes | None:
+        middleware = self.middleware
+        cookie = request_cookies(self.scope).get(middleware.cookie_name)
+        if cookie is None:
+            return None
+        try:
+            data, self.timestamp = middleware.signer.unsign(
+                cookie.encode("utf-8"),
+                max_age=middleware.max_age,
+                return_timestamp=True,
+            )
+        except BadSignature:
+            return None
+        return data
+
+    def make_session(self, json_data: AuthSessionData | None) -> UserSession:
+        timestamp = self.timestamp
+        if json_data is None or timestamp is None:
+            # No session, or it expired or was removed from the store. A new session
+            # id is created if the session is saved again, otherwise the dead cookie is
+            # expired so it isn't looked up again on every request.
+            self.expire_cookie = timestamp is not None
+            self.session_id = None
+            self.timestamp = None
+            return UserSession()
+        session = UserSession(json_data)
+        self.authenticated_at_load = session.get("is_authenticated") is True
+        reauthenticate_after = timestamp + datetime.timedelta(
+            seconds=config.Config.USER_SESSION_REVALIDATE_AFTER
+        )
+        if datetime.datetime.now(datetime.timezone.utc) > reauthenticate_after:
+            # Force reauthentication if session needs revalidated. Not
+            # tracked as a modification of the session.
+            self.revalidation_forced = True
+            self.authenticated_in_cookie = session.get("is_authenticated")
+            dict.__setitem__(session, "is_authenticated", False)
+        return session
+
+    def load_session(self) -> UserSession:
+        # RECEIVE COOKIE, when Request.user is first used
+        data = self.unsign_cookie()
+        json_data = None
+        if data is not None:
+            try:
+                json_data = decode_cookie_payload(data)
+            except ValueError:
+                pass
+        session = self.make_session(json_data)
+        self.scope["user"] = session
+        return session
+
+    def session_changed(self) -> bool:
+        user = self.scope["user"]
+        if not isinstance(user, UserSession):
+            return True  # Replaced by the application, can't be tracked
+        if not user.modified:
+            return False
+        original = user.original
+        if original is None:
+            return True  # Flagged as modified by the application
+        if self.revalidation_forced and user.get("is_authenticated") is True:
+            # Revalidated, compare against the value stored in the cookie
+            original["is_authenticated"] = self.authenticated_in_cookie
+        return original != user
+
+    def refresh_due(self) -> bool:
+        # Re-sign the cookie for sliding expiration and once revalidation is due
+        refresh_after = self.middleware.max_age // 2
+        if 0 < config.Config.USER_SESSION_REVALIDATE_AFTER < refresh_after:
+            refresh_after = config.Config.USER_SESSION_REVALIDATE_AFTER
+        return self.timestamp is None or datetime.datetime.now(
+            datetime.timezone.utc
+        ) > self.timestamp + datetime.timedelta(seconds=refresh_after)
+
+    async def save(self, message: Message) -> None:
+        """Add the session cookie to the http.response.start message if the session
+        changed or needs to be refreshed."""
+        # SEND COOKIE
+        middleware = self.middleware
+        user = self.scope["user"]
+        if self.lazy_session is not None and user is self.lazy_session:
+            return  # The session wasn't used, it can't have changed
+        if user:
+            if not self.session_changed() and not self.refresh_due():
+                return  # The cookie already holds the current session
+            # We have user data to persist.
+            if middleware.store is not None:
+                if (
+                    self.session_id is not None
+                    and not self.authenticated_at_load
+                    and user.get("is_authenticated") is True
+                ):
+                    # Issue a new session id on login so a session id planted before
+                    # the login can't be used to share the authenticated session
+                    await middleware.store.delete(self.session_id)
+                    self.session_id = None
+                if self.session_id is None:
+                    self.session_id = secrets.token_urlsafe(32)
+                await middleware.store.save(
+                    self.session_id, dict(user), middleware.max_age
+                )
+                data = middleware.signer.sign(self.session_id)
+            else:
+                data = encode_cookie_payload(user, middleware.compact_cookies)
+                data = middleware.signer.sign(data)
+            if user.get("persist_session", False):
+                cookie_suffix = middleware._persistent_cookie_suffix
+            else:
+                cookie_suffix = middleware._cookie_suffix
+            _append_set_cookie(
+                message, middleware._cookie_prefix + data + cookie_suffix
+            )
+        elif self.timestamp is not None or self.expire_cookie:
+            # The user has been cleared, or the session no longer exists in the store
+            if middleware.store is not None and self.session_id is not None:
+                await middleware.store.delete(self.session_id)
+            _append_set_cookie(message, middleware._expired_cookie)
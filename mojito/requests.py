@@ -1,2 +1,120 @@
+import copy
+import typing
+
 from starlette.requests import HTTPConnection as HTTPConnection  # noqa: F401
 from starlette.requests import Request as Request  # noqa: F401
+from starlette.requests import cookie_parser
+from starlette.types import Scope
+
+_UNSET: typing.Any = object()
+
+
+def request_cookies(scope: Scope) -> dict[str, str]:
+    """Returns the cookies of the request. The Cookie headers are parsed once and the
+    result is stored in the scope, so it's shared by all the middleware reading cookies.
+
+    Args:
+        scope (Scope): The ASGI scope of the request.
+
+    Returns:
+        dict[str, str]: The cookie values by name.
+    """
+    cookies: typing.Optional[dict[str, str]] = scope.get("mojito.cookies")
+    if cookies is None:
+        cookies = {}
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                cookies.update(cookie_parser(value.decode("latin-1")))
+        scope["mojito.cookies"] = cookies
+    return cookies
+
+
+class LazyProxy:
+    """Stands in for a value that's only loaded when it's first used, like the session
+    data on `Request.user`. Attribute access, item access, iteration, comparisons and
+    truth testing are forwarded to the loaded value.
+
+    The loader usually also replaces the proxy wherever it was stored, so later lookups
+    return the loaded value itself. The Mojito JSON codecs encode the loaded value.
+
+    Args:
+        loader (Callable[[], Any]): Called once to load the value.
+    """
+
+    __slots__ = ("_loader", "_value")
+
+    def __init__(self, loader: typing.Callable[[], typing.Any]) -> None:
+        object.__setattr__(self, "_loader", loader)
+        object.__setattr__(self, "_value", _UNSET)
+
+    def _resolve(self) -> typing.Any:
+        value = self._value
+        if value is _UNSET:
+            value = self._loader()
+            object.__setattr__(self, "_value", value)
+        return value
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._resolve(), name)
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        return self._resolve()[key]
+
+    def __setitem__(self, key: typing.Any, value: typing.Any) -> None:
+        self._resolve()[key] = value
+
+    def __delitem__(self, key: typing.Any) -> None:
+        del self._resolve()[key]
+
+    def __contains__(self, key: typing.Any) -> bool:
+        return key in self._resolve()
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        return iter(self._resolve())
+
+    def __len__(self) -> int:
+        return len(self._resolve())
+
+    def __bool__(self) -> bool:
+        return bool(self._resolve())
+
+    def __eq__(self, other: object) -> bool:
+        return bool(self._resolve() == other)
+
+    def __ne__(self, other: object) -> bool:
+        return bool(self._resolve() != other)
+
+    __hash__ = None  # type: ignore [assignment]
+
+    def __or__(self, other: typing.Any) -> typing.Any:
+        return self._resolve() | other
+
+    def __ror__(self, other: typing.Any) -> typing.Any:
+        return other | self._resolve()
+
+    def __ior__(self, other: typing.Any) -> typing.Any:
+        value = self._resolve()
+        value |= other
+        return value
+
+    def __copy__(self) -> typing.Any:
+        return copy.copy(self._resolve())
+
+    def __deepcopy__(self, memo: dict[int, typing.Any]) -> typing.Any:
+        return copy.deepcopy(self._resolve(), memo)
+
+    def __repr__(self) -> str:
+        return repr(self._resolve())
+
+
+def resolve_lazy(value: typing.Any) -> typing.Any:
+    """Returns the loaded value if value is a LazyProxy, otherwise the value itself."""
+    if isinstance(value, LazyProxy):
+        return value._resolve()
+    return value
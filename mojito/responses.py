@@ -1,7 +1,18 @@
+import typing
+
 from starlette.responses import FileResponse as FileResponse  # noqa
 from starlette.responses import HTMLResponse as HTMLResponse  # noqa
-from starlette.responses import JSONResponse as JSONResponse  # noqa
+from starlette.responses import JSONResponse as StarletteJSONResponse
 from starlette.responses import PlainTextResponse as PlainTextResponse  # noqa
 from starlette.responses import RedirectResponse as RedirectResponse  # noqa
 from starlette.responses import Response as Response  # noqa
 from starlette.responses import StreamingResponse as StreamingResponse  # noqa
+
+from .serializers import json_dumps
+
+
+class JSONResponse(StarletteJSONResponse):
+    """Starlette's JSONResponse encoded with the codec selected by Config.JSON_CODEC."""
+
+    def render(self, content: typing.Any) -> bytes:
+        return json_dumps(content)
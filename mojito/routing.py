@@ -1,44 +1,777 @@
+import copy
+import datetime
+import enum
 import inspect
+import re
+import sys
+from collections import abc
 from collections.abc import Awaitable, Mapping, Sequence
-from typing import Any, Callable, Optional, Union
+from decimal import Decimal
+from re import Pattern
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    NamedTuple,
+    Optional,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+from uuid import UUID
 
+from starlette._utils import get_route_path
 from starlette.applications import P
 from starlette.background import BackgroundTask
-from starlette.datastructures import URL
+from starlette.convertors import CONVERTOR_TYPES
+from starlette.datastructures import URL, QueryParams
+from starlette.exceptions import HTTPException
 from starlette.middleware import (
     Middleware,
     _MiddlewareClass,  # type: ignore [unused-ignore]
 )
 from starlette.requests import Request
 from starlette.responses import HTMLResponse, RedirectResponse, Response
-from starlette.routing import PARAM_REGEX, BaseRoute, Route, Router
-from starlette.types import AppType, Lifespan
+from starlette.routing import (
+    PARAM_REGEX,
+    BaseRoute,
+    Host,
+    Match,
+    Mount,
+    Route,
+    Router,
+    WebSocketRoute,
+)
+from starlette.types import AppType, ASGIApp, Lifespan, Receive, Scope, Send
+from starlette.websockets import WebSocket
 
-from . import helpers
-from .config import Config
 from .globals import g
 
+if sys.version_info >= (3, 10):  # pragma: no cover
+    from types import UnionType
+
+    _UNION_ORIGINS: tuple[Any, ...] = (Union, UnionType)
+else:  # pragma: no cover
+    _UNION_ORIGINS = (Union,)
+
 RouteFunctionType = Callable[[Request], Union[Awaitable[Response], Response]]
 
 
+class _ArgSource(enum.Enum):
+    """Where the value of an endpoint function argument comes from."""
+
+    PATH = "path"
+    REQUEST = "request"
+    QUERY = "query"
+
+
+_MISSING: Any = object()
+
+_TRUE_VALUES = frozenset(("true", "1", "yes", "on"))
+_FALSE_VALUES = frozenset(("false", "0", "no", "off"))
+
+_SEQUENCE_TYPES: dict[Any, Callable[[list[Any]], Any]] = {
+    list: list,
+    set: set,
+    frozenset: frozenset,
+    tuple: tuple,
+    abc.Sequence: list,
+    abc.Set: frozenset,
+}
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in _TRUE_VALUES:
+        return True
+    if lowered in _FALSE_VALUES:
+        return False
+    raise ValueError(f"{value!r} is not a valid boolean")
+
+
+def _parse_decimal(value: str) -> Decimal:
+    try:
+        return Decimal(value)
+    except ArithmeticError:  # decimal.InvalidOperation isn't a ValueError
+        raise ValueError(f"{value!r} is not a valid decimal") from None
+
+
+def _enum_converter(annotation: type[enum.Enum]) -> Callable[[str], Any]:
+    # Look members up by the string of their value, so IntEnum members match "1"
+    members = {str(member.value): member for member in annotation}
+
+    def convert(value: str) -> Any:
+        try:
+            return members[value]
+        except KeyError:
+            raise ValueError(
+                f"{value!r} is not a valid {annotation.__name__}"
+            ) from None
+
+    return convert
+
+
+def _scalar_converter(annotation: Any) -> Optional[Callable[[str], Any]]:
+    """Get the function used to convert a single query param string to the annotated
+    type. Returns None when the raw string should be passed through unchanged."""
+    if annotation is bool:
+        return _parse_bool
+    if annotation is Decimal:
+        return _parse_decimal
+    if annotation in (int, float, UUID):
+        return annotation  # type: ignore [no-any-return]
+    if annotation in (datetime.datetime, datetime.date, datetime.time):
+        return annotation.fromisoformat  # type: ignore [no-any-return]
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return _enum_converter(annotation)
+    # str, Any and unsupported annotations are passed through as the raw string
+    return None
+
+
+class _QueryParam:
+    """Compiled conversion of a query param to the type annotated on the endpoint function."""
+
+    __slots__ = ("name", "convert", "container", "default", "copy_default", "required")
+
+    def __init__(self, name: str, annotation: Any, default: Any = _MISSING) -> None:
+        self.name = name
+        # Params without a default that don't accept None must be sent
+        self.required = default is _MISSING and not self._optional(annotation)
+        self.default = None if default is _MISSING else default
+        # Mutable defaults, like `tags: list[str] = []`, are copied for every request
+        self.copy_default = isinstance(self.default, (list, dict, set, bytearray))
+        self.container: Optional[Callable[[list[Any]], Any]] = None
+        annotation = self._unwrap(annotation)
+        origin = get_origin(annotation)
+        if annotation in _SEQUENCE_TYPES or origin in _SEQUENCE_TYPES:
+            # Repeated keys are collected into the container, e.g. ?tag=a&tag=b
+            self.container = _SEQUENCE_TYPES[origin or annotation]
+            item_args = [a for a in get_args(annotation) if a is not Ellipsis]
+            annotation = self._unwrap(item_args[0]) if item_args else str
+        self.convert = _scalar_converter(annotation)
+
+    @staticmethod
+    def _unwrap(annotation: Any) -> Any:
+        # Optional[X] and Annotated[X, ...] are converted as X
+        origin = get_origin(annotation)
+        if origin is Annotated:
+            return _QueryParam._unwrap(get_args(annotation)[0])
+        if origin in _UNION_ORIGINS:
+            args = [a for a in get_args(annotation) if a is not type(None)]
+            if len(args) == 1:
+                return _QueryParam._unwrap(args[0])
+        return annotation
+
+    @staticmethod
+    def _optional(annotation: Any) -> bool:
+        # Whether None is a valid value for the annotation
+        if annotation is Any or annotation is None or annotation is type(None):
+            return True
+        origin = get_origin(annotation)
+        if origin is Annotated:
+            return _QueryParam._optional(get_args(annotation)[0])
+        if origin in _UNION_ORIGINS:
+            return any(_QueryParam._optional(a) for a in get_args(annotation))
+        return False
+
+    def _default(self) -> Any:
+        if self.required:
+            raise KeyError(self.name)
+        if self.copy_default:
+            return copy.copy(self.default)
+        return self.default
+
+    def get(self, query_params: QueryParams) -> Any:
+        """Get the converted value of the query param.
+
+        Missing params and empty strings for non string types resolve to the default
+        defined on the endpoint function, or None if there isn't one.
+
+        Raises:
+            KeyError: A required param is missing.
+            ValueError: The value could not be converted to the annotated type.
+        """
+        convert = self.convert
+        if self.container is not None:
+            values = query_params.getlist(self.name)
+            if convert is not None:
+                values = [convert(v) for v in values if v != ""]
+            return self.container(values) if values else self._default()
+        value = query_params.get(self.name)
+        if value is None or (value == "" and convert is not None):
+            return self._default()
+        return value if convert is None else convert(value)
+
+
+class _EndpointArgs:
+    """The argument binding plan for an endpoint function.
+
+    Inspecting the function signature, path params and query param types is done once
+    when the route is registered so that each request only has to look up the values.
+    """
+
+    __slots__ = ("args",)
+
+    args: tuple[tuple[str, _ArgSource, Optional[_QueryParam]], ...]
+
+    def __init__(
+        self, args: Sequence[tuple[str, _ArgSource, Optional[_QueryParam]]]
+    ) -> None:
+        self.args = tuple(args)
+
+    @classmethod
+    def compile(
+        cls, path: str, endpoint_function: Callable[..., Any]
+    ) -> "_EndpointArgs":
+        """Inspect the endpoint function arguments and decide where each value is injected from.
+
+        Args:
+            path (str): route path
+            endpoint_function (Callable[..., Any]): The endpoint function
+
+        Returns:
+            _EndpointArgs: The compiled plan
+        """
+        # Pull the path params from the path with converter split if it exists
+        path_params = {p[0] for p in PARAM_REGEX.findall(path)}
+        arg_specs = inspect.getfullargspec(endpoint_function)
+        try:
+            # Resolve string annotations, i.e. `from __future__ import annotations`
+            type_hints = get_type_hints(endpoint_function, include_extras=True)
+        except Exception:
+            type_hints = {}
+        defaults: dict[str, Any] = dict(arg_specs.kwonlydefaults or {})
+        if arg_specs.defaults:
+            defaults.update(
+                zip(arg_specs.args[-len(arg_specs.defaults) :], arg_specs.defaults)
+            )
+        args: list[tuple[str, _ArgSource, Optional[_QueryParam]]] = []
+        for arg_name, arg_type in arg_specs.annotations.items():
+            arg_type = type_hints.get(arg_name, arg_type)
+            if arg_name in path_params:
+                # Arguments in path params
+                args.append((arg_name, _ArgSource.PATH, None))
+            elif arg_name == "return":
+                # Handle 'return' type if one is included.
+                # https://docs.python.org/3/library/inspect.html#inspect.getfullargspec
+                # Skip processing 'return' type annotation
+                continue
+            elif arg_type == Request:
+                # Add request to this argument
+                args.append((arg_name, _ArgSource.REQUEST, None))
+            else:
+                # Remaining arguments are treated as query params
+                query_param = _QueryParam(
+                    arg_name, arg_type, defaults.get(arg_name, _MISSING)
+                )
+                args.append((arg_name, _ArgSource.QUERY, query_param))
+        return cls(args)
+
+
+# Convertors that never match a "/" so their params are contained within one path segment
+_SEGMENT_CONVERTORS = frozenset(("str", "int", "float", "uuid"))
+
+
+def _compile_segment(segment: str) -> Optional[Pattern[str]]:
+    """Compile the regex matching a single path segment containing params. Returns None
+    when a param may match across segments."""
+    regex = "^"
+    idx = 0
+    for match in PARAM_REGEX.finditer(segment):
+        convertor_type = match.group(2).lstrip(":") if match.group(2) else "str"
+        if convertor_type not in _SEGMENT_CONVERTORS:
+            return None
+        regex += re.escape(segment[idx : match.start()])
+        regex += f"(?:{CONVERTOR_TYPES[convertor_type].regex})"
+        idx = match.end()
+    return re.compile(regex + re.escape(segment[idx:]) + "$")
+
+
+class _TrieNode:
+    __slots__ = ("static", "dynamic", "routes")
+
+    def __init__(self) -> None:
+        self.static: dict[str, _TrieNode] = {}
+        self.dynamic: dict[str, tuple[Pattern[str], _TrieNode]] = {}
+        self.routes: list[int] = []
+
+
+class _RouteTrie:
+    """Trie of route path segments used to find the routes that may match a path without
+    running the regex of every route.
+
+    The trie only narrows down the candidate routes, which are still matched in their
+    original order with `route.matches()` so matching works exactly like Starlette's Router.
+    Routes that can't be split into segments, like mounts, host routes or paths using the
+    `path` convertor, are candidates for every path.
+    """
+
+    __slots__ = ("routes", "root", "unindexed")
+
+    def __init__(self, routes: list[BaseRoute]) -> None:
+        self.routes = routes
+        self.root = _TrieNode()
+        self.unindexed: list[int] = []
+        for index, route in enumerate(routes):
+            if not self._insert(index, route):
+                self.unindexed.append(index)
+
+    def _insert(self, index: int, route: BaseRoute) -> bool:
+        if not isinstance(route, (Route, WebSocketRoute)):
+            return False
+        nodes: list[tuple[bool, str, Optional[Pattern[str]]]] = []
+        for segment in route.path[1:].split("/"):
+            if "{" not in segment:
+                nodes.append((True, segment, None))
+                continue
+            regex = _compile_segment(segment)
+            if regex is None:
+                return False
+            nodes.append((False, segment, regex))
+        node = self.root
+        for is_static, segment, regex in nodes:
+            if is_static:
+                node = node.static.setdefault(segment, _TrieNode())
+            else:
+                if segment not in node.dynamic:
+                    node.dynamic[segment] = (regex, _TrieNode())  # type: ignore [assignment]
+                node = node.dynamic[segment][1]
+        node.routes.append(index)
+        return True
+
+    def _collect(
+        self, node: _TrieNode, segments: list[str], depth: int, found: list[int]
+    ) -> None:
+        if depth == len(segments):
+            found.extend(node.routes)
+            return
+        segment = segments[depth]
+        child = node.static.get(segment)
+        if child is not None:
+            self._collect(child, segments, depth + 1, found)
+        for regex, child in node.dynamic.values():
+            if regex.match(segment):
+                self._collect(child, segments, depth + 1, found)
+
+    def candidates(self, route_path: str) -> list[BaseRoute]:
+        """The routes that may match the path, in the order they were added."""
+        found = list(self.unindexed)
+        self._collect(self.root, route_path[1:].split("/"), 0, found)
+        if len(found) > 1:
+            found.sort()
+        return [self.routes[i] for i in found]
+
+
+def _is_static_route(route: BaseRoute) -> bool:
+    return isinstance(route, Route) and not route.param_convertors
+
+
+class _RouteTable:
+    """Lookup tables built from the routes of a router.
+
+    Routes without path params are stored in a dict keyed by (path, method) so most
+    requests are dispatched without running any regex. A static route is only added to
+    the dict when no earlier route matches the same request, so the first matching route
+    still wins like in Starlette's Router.
+
+    Args:
+        routes (list[BaseRoute]): The routes of the router.
+        compile_routes (bool): Find the candidate dynamic routes with a _RouteTrie.
+    """
+
+    __slots__ = ("routes", "size", "static", "static_paths", "dynamic", "trie")
+
+    def __init__(self, routes: list[BaseRoute], compile_routes: bool) -> None:
+        self.routes = routes
+        self.size = len(routes)
+        self.static: dict[tuple[str, str], Route] = {}
+        self.static_paths: set[str] = set()
+        self.dynamic: list[BaseRoute] = []
+        # Paths of static routes matching every method, e.g. HTTPEndpoint classes
+        any_method_paths: set[str] = set()
+        for route in routes:
+            if not _is_static_route(route):
+                self.dynamic.append(route)
+                continue
+            assert isinstance(route, Route)
+            self.static_paths.add(route.path)
+            if route.methods is None:
+                # Matches every method so it's found by scanning all the routes. Later
+                # routes on the same path must be matched in order behind it.
+                any_method_paths.add(route.path)
+                continue
+            if route.path in any_method_paths:
+                continue
+            for method in route.methods:
+                key = (route.path, method)
+                if key not in self.static and not self._shadowed(route.path, method):
+                    self.static[key] = route
+        self.trie = _RouteTrie(self.dynamic) if compile_routes else None
+
+    def _shadowed(self, path: str, method: str) -> bool:
+        """Whether a dynamic route added so far fully matches the request."""
+        for route in self.dynamic:
+            if isinstance(route, Route):
+                if route.path_regex.match(path) and (
+                    route.methods is None or method in route.methods
+                ):
+                    return True
+            elif isinstance(route, WebSocketRoute):
+                continue
+            elif isinstance(route, Mount):
+                if route.path_regex.match(path):
+                    return True
+            else:
+                return True
+        return False
+
+    def candidates(self, route_path: str) -> list[BaseRoute]:
+        """The routes that may match the path, in the order they were added."""
+        if route_path in self.static_paths:
+            return self.routes
+        if self.trie is not None:
+            return self.trie.candidates(route_path)
+        return self.dynamic
+
+
+class _SharedMiddleware:
+    """The middleware stack of a router, built once and shared by all of its routes.
+
+    The matched route stores its app in the scope before calling the stack so the
+    innermost app knows which route to call.
+    """
+
+    __slots__ = ("middleware", "_app")
+
+    def __init__(self, middleware: list[Middleware]) -> None:
+        self.middleware = middleware
+        self._app: Optional[ASGIApp] = None
+
+    def reset(self) -> None:
+        """Rebuild the stack on the next request after the middleware changed."""
+        self._app = None
+
+    def _build(self) -> ASGIApp:
+        return _wrap_middleware(_call_route_app, self.middleware)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        app = self._app
+        if app is None:
+            app = self._app = self._build()
+        await app(scope, receive, send)
+
+
+async def _call_route_app(scope: Scope, receive: Receive, send: Send) -> None:
+    await scope["mojito.route_app"](scope, receive, send)
+
+
+class _SharedMiddlewareRouteApp:
+    """Replaces the app of a route to call it through the shared router middleware."""
+
+    __slots__ = ("app", "middleware")
+
+    def __init__(self, app: ASGIApp, middleware: _SharedMiddleware) -> None:
+        self.app = app
+        self.middleware = middleware
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        scope["mojito.route_app"] = self.app
+        await self.middleware(scope, receive, send)
+
+
+class _RouteDefinition(NamedTuple):
+    """Arguments of AppRouter.add_route(). The Route is built when the routes are compiled
+    as the final path depends on the routers it's included in."""
+
+    path: str
+    endpoint: RouteFunctionType
+    methods: Optional[list[str]]
+    name: Optional[str]
+    include_in_schema: bool
+
+
+class _IncludedRouter(NamedTuple):
+    """A router included with AppRouter.include_router()."""
+
+    prefix: str
+    router: "AppRouter"
+    middleware: Optional[_SharedMiddleware]
+
+
+def _wrap_middleware(app: ASGIApp, middleware: Sequence[Middleware]) -> ASGIApp:
+    for cls, args, kwargs in reversed(middleware):
+        app = cls(app, *args, **kwargs)
+    return app
+
+
 class AppRouter(Router):
+    """Router to group routes under a shared prefix and middleware.
+
+    Routes and included routers are recorded as they're added and the final list of routes
+    is compiled once, when the app starts or the routes are first used. Routes without path
+    params are matched with a dict lookup on the path and method.
+
+    Args:
+        compile_routes (bool): Match requests using a trie of the route paths so matching
+            takes the same time regardless of the number of routes. Defaults to False.
+        share_middleware (bool): Build the router middleware once and share it between
+            all the routes of the router instead of wrapping each route with its own
+            middleware stack. Defaults to False.
+    """
+
     def __init__(
         self,
         prefix: Optional[str] = None,
         name: Optional[str] = None,
         middleware: Optional[Sequence[Middleware]] = None,
-        routes: Optional[list[BaseRoute]] = None,
+        routes: Optional[Sequence[BaseRoute]] = None,
         lifespan: Optional[Lifespan[AppType]] = None,
+        compile_routes: bool = False,
+        share_middleware: bool = False,
     ) -> None:
+        self._entries: list[Union[_RouteDefinition, _IncludedRouter, BaseRoute]] = []
+        self._routes: Optional[list[BaseRoute]] = None
+        # The routes as built and the entry each was built from, to detect direct changes
+        self._built_routes: list[BaseRoute] = []
+        self._route_origins: dict[
+            int, Union[_RouteDefinition, _IncludedRouter, BaseRoute]
+        ] = {}
+        self._parents: list[AppRouter] = []
         super().__init__(routes=routes, lifespan=lifespan)
         self.middleware = [] if middleware is None else list(middleware)
+        self.share_middleware = share_middleware
+        self._shared_middleware = _SharedMiddleware(self.middleware)
         self.prefix = prefix or ""
-        self.routes: list[BaseRoute] = []
         self.name = name if name else ""
+        self.compile_routes = compile_routes
+        self._route_table: Optional[_RouteTable] = None
+
+    @property
+    def routes(self) -> list[BaseRoute]:
+        """All the routes of the router and the routers included in it."""
+        routes = self._routes
+        if routes is None:
+            origins: dict[int, Union[_RouteDefinition, _IncludedRouter, BaseRoute]] = {}
+            routes = self._routes = self._build_routes("", [], origins)
+            self._route_origins = origins
+            self._built_routes = list(routes)
+        return routes
+
+    @routes.setter
+    def routes(self, routes: list[BaseRoute]) -> None:
+        self._routes = None
+        self._entries = list(routes)
+        self._invalidate()
+
+    def _sync_routes(self) -> None:
+        """Keep the changes made directly to the routes list, like
+        `router.routes.append(route)`, by folding them back into the entries the routes
+        are built from."""
+        routes = self._routes
+        built = self._built_routes
+        if routes is None or (
+            len(routes) == len(built) and all(a is b for a, b in zip(routes, built))
+        ):
+            return
+        origins = self._route_origins
+        entries: list[Union[_RouteDefinition, _IncludedRouter, BaseRoute]] = []
+        seen: set[int] = set()
+        for route in routes:
+            entry = origins.get(id(route), route)
+            if id(entry) not in seen:
+                seen.add(id(entry))
+                entries.append(entry)
+        # Entries that didn't build any routes, like empty included routers, are kept
+        built_entries = {id(entry) for entry in origins.values()}
+        for index, entry in enumerate(self._entries):
+            if id(entry) not in built_entries and id(entry) not in seen:
+                entries.insert(min(index, len(entries)), entry)
+        self._entries = entries
+        self._routes = None
+
+    def _invalidate(self) -> None:
+        """Compile the routes again the next time they're used after a change."""
+        self._sync_routes()
+        self._routes = None
+        for parent in self._parents:
+            parent._invalidate()
+
+    def _add_entry(
+        self, entry: Union[_RouteDefinition, _IncludedRouter, BaseRoute]
+    ) -> None:
+        self._sync_routes()
+        self._entries.append(entry)
+        self._invalidate()
+
+    def _build_routes(
+        self,
+        prefix: str,
+        middleware: list[_SharedMiddleware],
+        origins: Optional[
+            dict[int, Union[_RouteDefinition, _IncludedRouter, BaseRoute]]
+        ] = None,
+    ) -> list[BaseRoute]:
+        """Build the routes of the router in the order they were added.
+
+        Args:
+            prefix (str): Prefix of the routers the router is included in.
+            middleware (list[_SharedMiddleware]): Middleware given when including the
+                router, outermost first.
+            origins (Optional[dict]): Filled with the entry each route was built from,
+                keyed by the id of the route. Defaults to None.
+        """
+        self._sync_routes()
+        prefix += self.prefix
+        routes: list[BaseRoute] = []
+        for entry in self._entries:
+            start = len(routes)
+            if isinstance(entry, _RouteDefinition):
+                routes.append(self._build_route(prefix, entry, middleware))
+            elif isinstance(entry, _IncludedRouter):
+                included_middleware = middleware
+                if entry.middleware is not None:
+                    included_middleware = [*middleware, entry.middleware]
+                routes.extend(
+                    entry.router._build_routes(
+                        prefix + entry.prefix, included_middleware
+                    )
+                )
+            else:
+                routes.append(entry)
+            if origins is not None:
+                for route in routes[start:]:
+                    origins[id(route)] = entry
+        return routes
+
+    def _build_route(
+        self,
+        prefix: str,
+        definition: _RouteDefinition,
+        middleware: list[_SharedMiddleware],
+    ) -> Route:
+        route = Route(
+            path=prefix + definition.path,
+            endpoint=definition.endpoint,
+            methods=definition.methods,
+            name=definition.name,
+            include_in_schema=definition.include_in_schema,
+        )
+        if self.share_middleware:
+            route.app = _SharedMiddlewareRouteApp(route.app, self._shared_middleware)
+        else:
+            route.app = _wrap_middleware(route.app, self.middleware)
+        for shared_middleware in reversed(middleware):
+            route.app = _SharedMiddlewareRouteApp(route.app, shared_middleware)
+        return route
+
+    def include_router(
+        self,
+        router: "AppRouter",
+        prefix: Optional[str] = None,
+        middleware: Optional[Sequence[Middleware]] = None,
+    ) -> None:
+        """Include the routes of another router under the prefix of this router.
+
+        Routes added to the included router later on are also included. The middleware of
+        this router isn't applied to the included routes.
+
+        Args:
+            router (AppRouter): The router to include.
+            prefix (Optional[str]): Added between the prefix of this router and the prefix
+                of the included router. Defaults to None.
+            middleware (Optional[Sequence[Middleware]]): Middleware applied only to the
+                routes of the included router. Defaults to None.
+        """
+        shared_middleware = _SharedMiddleware(list(middleware)) if middleware else None
+        router._parents.append(self)
+        self._add_entry(_IncludedRouter(prefix or "", router, shared_middleware))
+
+    def mount(self, path: str, app: ASGIApp, name: Optional[str] = None) -> None:
+        self._add_entry(Mount(path, app=app, name=name))
+
+    def host(self, host: str, app: ASGIApp, name: Optional[str] = None) -> None:
+        self._add_entry(Host(host, app=app, name=name))
+
+    def add_websocket_route(
+        self,
+        path: str,
+        endpoint: Callable[[WebSocket], Awaitable[None]],
+        name: Optional[str] = None,
+    ) -> None:
+        self._add_entry(WebSocketRoute(path, endpoint=endpoint, name=name))
+
+    def _get_route_table(self) -> _RouteTable:
+        table = self._route_table
+        routes = self.routes
+        if table is None or table.routes is not routes or table.size != len(routes):
+            # Rebuild after the routes changed
+            table = self._route_table = _RouteTable(routes, self.compile_routes)
+        return table
+
+    async def app(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Same as Router.app() but looks up static routes in a dict and only matches the
+        # candidate routes for the path
+        assert scope["type"] in ("http", "websocket", "lifespan")
+
+        if "router" not in scope:
+            scope["router"] = self
+
+        if scope["type"] == "lifespan":
+            self._get_route_table()  # Compile the routes on startup
+            await self.lifespan(scope, receive, send)
+            return
+
+        table = self._get_route_table()
+        route_path = get_route_path(scope)
+
+        if scope["type"] == "http":
+            static_route = table.static.get((route_path, scope["method"]))
+            if static_route is not None:
+                path_params = dict(scope.get("path_params", {}))
+                scope.update(
+                    {"endpoint": static_route.endpoint, "path_params": path_params}
+                )
+                await static_route.handle(scope, receive, send)
+                return
+
+        partial = None
+        for route in table.candidates(route_path):
+            # Determine if any route matches the incoming scope,
+            # and hand over to the matching route if found.
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope.update(child_scope)
+                await route.handle(scope, receive, send)
+                return
+            elif match == Match.PARTIAL and partial is None:
+                partial = route
+                partial_scope = child_scope
+
+        if partial is not None:
+            # Handle partial matches. These are cases where an endpoint is
+            # able to handle the request, but is not a preferred option.
+            # We use this in particular to deal with "405 Method Not Allowed".
+            scope.update(partial_scope)
+            await partial.handle(scope, receive, send)
+            return
 
-    def include_router(self, router: "AppRouter") -> None:
-        for route in router.routes:
-            self.routes.append(route)
+        if scope["type"] == "http" and self.redirect_slashes and route_path != "/":
+            redirect_scope = dict(scope)
+            if route_path.endswith("/"):
+                redirect_scope["path"] = redirect_scope["path"].rstrip("/")
+            else:
+                redirect_scope["path"] = redirect_scope["path"] + "/"
+
+            for route in table.candidates(get_route_path(redirect_scope)):
+                match, child_scope = route.matches(redirect_scope)
+                if match != Match.NONE:
+                    redirect_url = URL(scope=redirect_scope)
+                    response = RedirectResponse(url=str(redirect_url))
+                    await response(scope, receive, send)
+                    return
+
+        await self.default(scope, receive, send)
 
     def add_middleware(
         self,
@@ -52,6 +785,8 @@ class AppRouter(Router):
             middleware_class (type[_MiddlewareClass[P]]): ASGI compatible middleware
         """
         self.middleware.insert(0, Middleware(middleware_class, *args, **kwargs))
+        self._shared_middleware.reset()
+        self._invalidate()
 
     def add_route(
         self,
@@ -61,55 +796,46 @@ class AppRouter(Router):
         name: Optional[str] = None,
         include_in_schema: bool = True,
     ) -> None:
-        path = self.prefix + path
-        self.routes.append(
-            Route(
-                path=path,
-                endpoint=endpoint,
-                methods=methods,
-                name=name,
-                include_in_schema=include_in_schema,
-                middleware=self.middleware,  # Added to the route if not mounting
-            )
+        self._add_entry(
+            _RouteDefinition(path, endpoint, methods, name, include_in_schema)
         )
 
     def _process_endpoint_args(
-        self, request: Request, path: str, endpoint_function: Callable[..., Any]
+        self, request: Request, endpoint_args: "_EndpointArgs"
     ) -> dict[str, Any]:
-        """Inspect the endpoint function arguments and inject their values as **kwargs when
-        the function is called from the endpoint.
+        """Build the **kwargs the endpoint function is called with from a compiled
+        argument plan.
 
         Args:
             request (Request): starlette.Request
-            path (str): route path
-            endpoint_function (Callable[..., Any]): The endpoint function
+            endpoint_args (_EndpointArgs): The plan compiled for the endpoint function when
+                the route was registered.
 
         Returns:
             dict[str, Any]: kwargs to call the endpoint function with
+
+        Raises:
+            HTTPException: 422 error when a required query param is missing or can't be
+                converted to its annotated type
         """
-        path_params_tuple = PARAM_REGEX.findall(
-            path
-        )  # Pull the path params from the path with converter split if it exists
-        arg_specs = inspect.getfullargspec(endpoint_function)
-        path_params = [p[0] for p in path_params_tuple]  # Extract just param name
+        path_params = request.path_params
+        query_params = request.query_params
         kwargs: dict[str, Any] = {}
-        for arg_name, arg_type in arg_specs.annotations.items():
-            arg_value: Optional[Any] = None
-            if arg_name in path_params:
-                # Arguments in path params
-                arg_value = request.path_params.get(arg_name)
-            elif arg_name == "return":
-                # Handle 'return' type if one is included.
-                # https://docs.python.org/3/library/inspect.html#inspect.getfullargspec
-                # Skip processing 'return' type annotation
-                continue
-            elif arg_type == Request:
-                # Add request to this argument
-                arg_value = request
+        errors: list[str] = []
+        for arg_name, arg_source, query_param in endpoint_args.args:
+            if arg_source is _ArgSource.PATH:
+                kwargs[arg_name] = path_params.get(arg_name)
+            elif arg_source is _ArgSource.REQUEST:
+                kwargs[arg_name] = request
             else:
-                # Remaining arguments are treated as query params
-                arg_value = request.query_params.get(arg_name)
-            kwargs[arg_name] = arg_value
+                try:
+                    kwargs[arg_name] = query_param.get(query_params)  # type: ignore [union-attr]
+                except KeyError:
+                    errors.append(f"Missing required query parameter '{arg_name}'")
+                except ValueError:
+                    errors.append(f"Invalid value for query parameter '{arg_name}'")
+        if errors:
+            raise HTTPException(status_code=422, detail="\n".join(errors))
         return kwargs
 
     def route(
@@ -122,9 +848,11 @@ class AppRouter(Router):
         def decorator(
             func: Callable[..., Union[Awaitable[Any], Any]],
         ) -> RouteFunctionType:
+            endpoint_args = _EndpointArgs.compile(path, func)
+
             async def endpoint_function(request: Request) -> Response:
                 """Creates a function that inputs the correct arguments to the func at runtime."""
-                kwargs = self._process_endpoint_args(request, path, func)
+                kwargs = self._process_endpoint_args(request, endpoint_args)
                 g.request = request
 
                 # Ensures the function has a Response return type.
@@ -135,14 +863,6 @@ class AppRouter(Router):
                     # Wrap response in default HTMLResponse
                     original_response = HTMLResponse(str(original_response))
                 response: Response = original_response
-                # PROCESS MESSAGE FLASHING FOR NEXT REQUEST
-                if g.next_flash_messages:
-                    response.set_cookie(
-                        Config.MESSAGE_FLASH_COOKIE,
-                        helpers.encode_message_cookie(g.next_flash_message).decode(
-                            "utf-8"
-                        ),
-                    )
                 return response
 
             self.add_route(
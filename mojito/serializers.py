@@ -0,0 +1,295 @@
+"""JSON encoding used for the session and message flash cookies, session stores and
+JSONResponse.
+
+The codec is chosen with `Config.JSON_CODEC`. By default orjson or msgspec are used when
+installed, falling back to the standard library json module."""
+
+from __future__ import annotations
+
+import binascii
+import json
+import typing
+import zlib
+from base64 import b64decode, b64encode, urlsafe_b64decode, urlsafe_b64encode
+
+from . import config
+from .requests import LazyProxy
+
+
+class JSONCodec(typing.Protocol):
+    """Base class that all JSON codecs should implement."""
+
+    name: str
+    "Name used to select the codec with Config.JSON_CODEC."
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        """Encode an object to compact UTF-8 JSON.
+
+        Args:
+            obj (Any): The object to encode.
+
+        Raises:
+            TypeError: The object can't be encoded.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        raise NotImplementedError()
+
+    def loads(self, data: bytes | str) -> typing.Any:
+        """Decode a JSON document.
+
+        Args:
+            data (bytes | str): The JSON document.
+
+        Raises:
+            ValueError: The data isn't valid JSON.
+
+        Returns:
+            Any: The decoded object.
+        """
+        raise NotImplementedError()
+
+
+def _encode_default(obj: typing.Any) -> typing.Any:
+    # Encode the loaded value of lazy request data, like an unread Request.user
+    if isinstance(obj, LazyProxy):
+        return obj._resolve()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class StdlibJSONCodec(JSONCodec):
+    """Codec using the json module of the standard library."""
+
+    name = "json"
+
+    def __init__(self) -> None:
+        self._encoder = json.JSONEncoder(
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+            default=_encode_default,
+        )
+        self._decoder = json.JSONDecoder()
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        try:
+            return self._encoder.encode(obj).encode("utf-8")
+        except ValueError as exc:  # Out of range floats
+            raise TypeError(str(exc)) from exc
+
+    def loads(self, data: bytes | str) -> typing.Any:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return self._decoder.decode(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """Codec using [orjson](https://github.com/ijl/orjson)."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+        # Like the json module, encode int and other non str dict keys as strings
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        # JSONEncodeError is a TypeError
+        return self._dumps(obj, default=_encode_default, option=self._option)
+
+    def loads(self, data: bytes | str) -> typing.Any:
+        return self._loads(data)  # JSONDecodeError is a ValueError
+
+
+class MsgspecCodec(JSONCodec):
+    """Codec using [msgspec](https://jcristharif.com/msgspec/)."""
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec  # type: ignore [import-not-found, unused-ignore]
+
+        self._encoder = msgspec.json.Encoder(enc_hook=_encode_default)
+        self._decoder = msgspec.json.Decoder()
+        self._encode_error = msgspec.EncodeError
+        self._decode_error = msgspec.DecodeError
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        try:
+            return self._encoder.encode(obj)  # type: ignore [no-any-return, unused-ignore]
+        except self._encode_error as exc:
+            raise TypeError(str(exc)) from exc
+
+    def loads(self, data: bytes | str) -> typing.Any:
+        try:
+            return self._decoder.decode(data)
+        except self._decode_error as exc:
+            raise ValueError(str(exc)) from exc
+
+
+_CODECS: dict[str, type[JSONCodec]] = {
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "json": StdlibJSONCodec,
+}
+_codec: JSONCodec | None = None
+_codec_setting: str | None = None
+
+
+def _create_codec(setting: str) -> JSONCodec:
+    if setting == "auto":
+        for codec_class in _CODECS.values():
+            try:
+                return codec_class()
+            except ImportError:
+                continue
+    try:
+        codec_class = _CODECS[setting]
+    except KeyError:
+        raise ValueError(
+            f"unknown JSON codec {setting!r}, expected one of auto, {', '.join(_CODECS)}"
+        ) from None
+    return codec_class()
+
+
+def get_json_codec() -> JSONCodec:
+    """Returns the JSON codec selected by Config.JSON_CODEC.
+
+    Raises:
+        ValueError: Config.JSON_CODEC isn't a known codec.
+        ImportError: The package of the selected codec isn't installed.
+    """
+    global _codec, _codec_setting
+    setting = config.Config.JSON_CODEC
+    if _codec is None or setting != _codec_setting:
+        _codec = _create_codec(setting)
+        _codec_setting = setting
+    return _codec
+
+
+def json_dumps(obj: typing.Any) -> bytes:
+    """Encode an object to compact UTF-8 JSON with the configured codec.
+
+    Args:
+        obj (Any): The object to encode.
+
+    Raises:
+        TypeError: The object can't be encoded.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    return get_json_codec().dumps(obj)
+
+
+def json_loads(data: bytes | str) -> typing.Any:
+    """Decode a JSON document with the configured codec.
+
+    Args:
+        data (bytes | str): The JSON document.
+
+    Raises:
+        ValueError: The data isn't valid JSON.
+
+    Returns:
+        Any: The decoded object.
+    """
+    return get_json_codec().loads(data)
+
+
+# Compact cookie payloads start with a version that can't appear in base64 and a flag
+# telling if the JSON is deflated
+_COMPACT_PREFIX = b"~1"
+_RAW = b"j"
+_DEFLATED = b"z"
+# Preset deflate dictionary with the keys and values common in session and flash cookies,
+# most likely last. Even small payloads compress well with it. It's part of the format,
+# changing it requires a new version prefix.
+_DEFLATE_DICTIONARY = (
+    b'[{"message":"","category":"info"},{"message":"","category":"warning"},'
+    b'{"message":"","category":"error"},{"message":"","category":"success"},'
+    b'{"message":"","category":null}]'
+    b'{"persist_session":true,"auth_handler":null,"auth_handler":"PasswordAuth",'
+    b'"data":{"name":"","email":"","id":""},"permissions":["admin"],"permissions":[],'
+    b'"is_authenticated":false,"is_authenticated":true,"user_id":"","user_id":1'
+)
+# Raw deflate with a 4KB window, as large as a cookie can be. A small window and memory
+# level make creating the compressor cheaper.
+_DEFLATE_WBITS = -12
+
+
+def encode_cookie_payload(
+    obj: typing.Any,
+    compact: bool | None = None,
+    compress_threshold: int | None = None,
+) -> bytes:
+    """Encode the data stored in a cookie before it's signed.
+
+    The legacy format is the base64 encoded JSON. The compact format is the JSON,
+    deflated with a preset dictionary of common session keys when that makes it smaller,
+    encoded with unpadded URL-safe base64 behind a version prefix. It only uses characters
+    allowed in a cookie value so it's never quoted.
+
+    Args:
+        obj (Any): The data to encode.
+        compact (bool | None): Use the compact format. Defaults to Config.COMPACT_COOKIES.
+        compress_threshold (int | None): Minimum size of the JSON in bytes before it's
+            compressed in the compact format. Defaults to Config.COOKIE_COMPRESS_THRESHOLD.
+
+    Returns:
+        bytes: The cookie payload.
+    """
+    data = json_dumps(obj)
+    if compact is None:
+        compact = config.Config.COMPACT_COOKIES
+    if not compact:
+        return b64encode(data)
+    if compress_threshold is None:
+        compress_threshold = config.Config.COOKIE_COMPRESS_THRESHOLD
+    flag = _RAW
+    if 0 < compress_threshold <= len(data):
+        compressor = zlib.compressobj(
+            wbits=_DEFLATE_WBITS, memLevel=4, zdict=_DEFLATE_DICTIONARY
+        )
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            data = compressed
+            flag = _DEFLATED
+    return _COMPACT_PREFIX + flag + urlsafe_b64encode(data).rstrip(b"=")
+
+
+def decode_cookie_payload(data: bytes) -> typing.Any:
+    """Decode a cookie payload created by `encode_cookie_payload` in either format.
+
+    Args:
+        data (bytes): The cookie payload, after its signature was checked.
+
+    Raises:
+        ValueError: The payload is malformed or uses an unknown format version.
+
+    Returns:
+        Any: The decoded data.
+    """
+    if not data.startswith(b"~"):
+        return json_loads(b64decode(data))
+    prefix_length = len(_COMPACT_PREFIX)
+    if not data.startswith(_COMPACT_PREFIX):
+        raise ValueError("unknown cookie payload version")
+    flag = data[prefix_length : prefix_length + 1]
+    body = data[prefix_length + 1 :]
+    try:
+        decoded = urlsafe_b64decode(body + b"=" * (-len(body) % 4))
+        if flag == _DEFLATED:
+            decompressor = zlib.decompressobj(
+                wbits=_DEFLATE_WBITS, zdict=_DEFLATE_DICTIONARY
+            )
+            decoded = decompressor.decompress(decoded) + decompressor.flush()
+        elif flag != _RAW:
+            raise ValueError("unknown cookie payload flag")
+    except (binascii.Error, zlib.error) as exc:
+        raise ValueError(str(exc)) from exc
+    return json_loads(decoded)
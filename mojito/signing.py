@@ -0,0 +1,72 @@
+"""Signers for the session and message flash cookies."""
+
+from __future__ import annotations
+
+import functools
+import hmac
+import typing
+from collections.abc import Sequence
+
+import itsdangerous
+from itsdangerous.encoding import base64_decode, base64_encode, want_bytes
+from starlette.datastructures import Secret
+
+
+class _PrecomputedKeySigner(itsdangerous.TimestampSigner):
+    """TimestampSigner that derives its keys once instead of for every signature.
+
+    Each derived key is kept as an HMAC object with the key already applied. Signing copies
+    it instead of deriving the key and preparing a new HMAC. Values are signed with the
+    newest key and verified against all of them.
+    """
+
+    def __init__(self, secret_keys: list[str]) -> None:
+        super().__init__(secret_keys)
+        algorithm = typing.cast(itsdangerous.signer.HMACAlgorithm, self.algorithm)
+        self._macs = [
+            hmac.new(self.derive_key(key), digestmod=algorithm.digest_method)
+            for key in reversed(self.secret_keys)
+        ]
+
+    def get_signature(self, value: str | bytes) -> bytes:
+        mac = self._macs[0].copy()
+        mac.update(want_bytes(value))
+        return base64_encode(mac.digest())
+
+    def verify_signature(self, value: str | bytes, sig: str | bytes) -> bool:
+        try:
+            sig = base64_decode(sig)
+        except Exception:
+            return False
+        value = want_bytes(value)
+        for mac in self._macs:
+            mac = mac.copy()
+            mac.update(value)
+            if hmac.compare_digest(sig, mac.digest()):
+                return True
+        return False
+
+
+@functools.cache
+def _get_signer(secret_keys: tuple[str, ...]) -> itsdangerous.TimestampSigner:
+    return _PrecomputedKeySigner(list(secret_keys))
+
+
+def get_signer(
+    secret_key: str | Secret, fallback_secret_keys: Sequence[str | Secret] = ()
+) -> itsdangerous.TimestampSigner:
+    """Returns the timestamp signer for the secret key, shared by everything signing with
+    the same keys.
+
+    Args:
+        secret_key (str | Secret): Key new signatures are created with.
+        fallback_secret_keys (Sequence[str | Secret]): Previous keys that signatures are
+            still accepted from, so the secret key can be rotated without invalidating
+            existing cookies. Defaults to no fallback keys.
+
+    Returns:
+        itsdangerous.TimestampSigner: The signer.
+    """
+    # itsdangerous signs with the last key
+    secret_keys = [str(key) for key in reversed(fallback_secret_keys)]
+    return _get_signer((*secret_keys, str(secret_key)))
@@ -1 +1,294 @@
-from starlette.staticfiles import StaticFiles as StaticFiles  # noqa
+import os
+import stat
+from email.utils import formatdate, parsedate
+from mimetypes import guess_type
+from typing import Optional, Union
+
+import anyio
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike
+from starlette.staticfiles import StaticFiles as StarletteStaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Content-Encoding and file extension of the precompressed files, most preferred first
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class _IndexedFile:
+    """A file in the StaticFiles index with its response headers computed up front."""
+
+    __slots__ = (
+        "full_path",
+        "size",
+        "mtime",
+        "mtime_ns",
+        "etag",
+        "last_modified",
+        "raw_headers",
+    )
+
+    def __init__(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        content_type: str,
+        encoding: Optional[str] = None,
+        vary: bool = False,
+    ) -> None:
+        self.full_path = full_path
+        self.size = stat_result.st_size
+        self.mtime = stat_result.st_mtime
+        self.mtime_ns = stat_result.st_mtime_ns
+        etag = f"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+        self.etag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+        self.last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        raw_headers = [
+            (b"content-type", content_type.encode("latin-1")),
+            (b"content-length", str(self.size).encode("latin-1")),
+            (b"last-modified", self.last_modified.encode("latin-1")),
+            (b"etag", self.etag.encode("latin-1")),
+            (b"accept-ranges", b"bytes"),
+        ]
+        if encoding:
+            raw_headers.append((b"content-encoding", encoding.encode("latin-1")))
+        if vary:
+            raw_headers.append((b"vary", b"Accept-Encoding"))
+        self.raw_headers = raw_headers
+
+    def matches(self, stat_result: os.stat_result) -> bool:
+        """Whether the file on disk is still the one that was indexed."""
+        return (
+            stat_result.st_size == self.size
+            and stat_result.st_mtime_ns == self.mtime_ns
+        )
+
+    def stale_response(self, stat_result: os.stat_result) -> FileResponse:
+        """Response for a file that changed since it was indexed, with its current size."""
+        headers = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in self.raw_headers
+            if name in (b"content-type", b"content-encoding", b"vary")
+        }
+        return FileResponse(self.full_path, headers=headers, stat_result=stat_result)
+
+
+class _IndexEntry:
+    """A file and its precompressed variants keyed by content encoding."""
+
+    __slots__ = ("file", "variants")
+
+    def __init__(self, file: _IndexedFile, variants: dict[str, _IndexedFile]) -> None:
+        self.file = file
+        self.variants = variants
+
+
+class _IndexedFileResponse(Response):
+    chunk_size = 64 * 1024
+
+    def __init__(self, file: _IndexedFile, status_code: int = 200) -> None:
+        self.file = file
+        self.status_code = status_code
+        self.background = None
+        self.raw_headers = list(file.raw_headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            file = await anyio.open_file(self.file.full_path, mode="rb")
+        except FileNotFoundError:
+            raise HTTPException(status_code=404)
+        async with file:
+            # The file may have changed since it was indexed. Never declare a length
+            # that doesn't match what is sent.
+            stat_result = os.fstat(file.wrapped.fileno())
+            if not self.file.matches(stat_result):
+                response = self.file.stale_response(stat_result)
+                await response(scope, receive, send)
+                return
+            if scope["method"].upper() == "HEAD":
+                await self._send_start(send)
+                await send(
+                    {"type": "http.response.body", "body": b"", "more_body": False}
+                )
+                return
+            if "http.response.pathsend" in scope.get("extensions", {}):
+                # The server sends the file itself, without reading it into Python
+                await self._send_start(send)
+                await send(
+                    {"type": "http.response.pathsend", "path": self.file.full_path}
+                )
+                return
+            await self._send_start(send)
+            remaining = self.file.size
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining = remaining - len(chunk) if chunk else 0
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    }
+                )
+            if not self.file.size:
+                await send(
+                    {"type": "http.response.body", "body": b"", "more_body": False}
+                )
+
+    async def _send_start(self, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    encodings: set[str] = set()
+    for item in accept_encoding.split(","):
+        encoding, _, params = item.partition(";")
+        q = params.strip().lower()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        encodings.add(encoding.strip().lower())
+    return encodings
+
+
+class StaticFiles(StarletteStaticFiles):
+    """Starlette's StaticFiles, optionally served from an in-memory index of the files.
+
+    With `index=True` the directories are indexed once, on the first request, with the
+    size, modification time, ETag and content type of every file. Conditional requests for
+    indexed files are answered from the index without checking the disk. When the client
+    accepts it, a precompressed `.br` or `.gz` sibling of the file is served instead. Files
+    are sent with the ASGI pathsend extension when the server supports it.
+
+    The index is a snapshot meant for directories that don't change while the app is
+    running, like built assets. Files added after it was built are served by Starlette's
+    StaticFiles. A file changed since it was indexed is sent with its current size, but
+    conditional requests are answered with the indexed ETag until `refresh_index()` is
+    called.
+
+    Args:
+        directory (Optional[PathLike]): Directory to serve the files from.
+        packages (Optional[list[str | tuple[str, str]]]): Packages with static files to serve.
+        html (bool): Run in HTML mode, serving index.html for directories. Defaults to False.
+        check_dir (bool): Ensure the directory exists on instantiation. Defaults to True.
+        follow_symlink (bool): Serve symlinks pointing outside the directory. Defaults
+            to False.
+        index (bool): Serve the files from the in-memory index. Defaults to False.
+        precompressed (bool): Serve `.br` and `.gz` siblings of indexed files to clients
+            that accept them. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: Optional[PathLike] = None,
+        packages: Optional[list[Union[str, tuple[str, str]]]] = None,
+        html: bool = False,
+        check_dir: bool = True,
+        follow_symlink: bool = False,
+        index: bool = False,
+        precompressed: bool = True,
+    ) -> None:
+        super().__init__(
+            directory=directory,
+            packages=packages,
+            html=html,
+            check_dir=check_dir,
+            follow_symlink=follow_symlink,
+        )
+        self.index = index
+        self.precompressed = precompressed
+        self._index: dict[str, _IndexEntry] = {}
+
+    async def check_config(self) -> None:
+        await super().check_config()
+        if self.index:
+            await self.refresh_index()
+
+    async def refresh_index(self) -> None:
+        """Index the files of the directories again."""
+        self._index = await anyio.to_thread.run_sync(self._build_index)
+
+    def _build_index(self) -> dict[str, _IndexEntry]:
+        stats: dict[str, tuple[str, os.stat_result]] = {}
+        for directory in self.all_directories:
+            real_directory = os.path.realpath(directory)
+            for root, _, filenames in os.walk(
+                directory, followlinks=self.follow_symlink
+            ):
+                for filename in filenames:
+                    joined_path = os.path.join(root, filename)
+                    if self.follow_symlink:
+                        full_path = os.path.abspath(joined_path)
+                    else:
+                        full_path = os.path.realpath(joined_path)
+                        if (
+                            os.path.commonpath([full_path, real_directory])
+                            != real_directory
+                        ):
+                            continue  # Symlink out of the directory
+                    try:
+                        stat_result = os.stat(full_path)
+                    except OSError:
+                        continue
+                    if not stat.S_ISREG(stat_result.st_mode):
+                        continue
+                    # Same key format as get_path(). The first directory has priority.
+                    key = os.path.normpath(os.path.relpath(joined_path, directory))
+                    stats.setdefault(key, (full_path, stat_result))
+
+        index: dict[str, _IndexEntry] = {}
+        for key, (full_path, stat_result) in stats.items():
+            content_type = guess_type(key)[0] or "text/plain"
+            if content_type.startswith("text/"):
+                content_type += "; charset=utf-8"
+            variants: dict[str, _IndexedFile] = {}
+            if self.precompressed:
+                for encoding, extension in _ENCODINGS:
+                    variant = stats.get(key + extension)
+                    if variant is not None:
+                        variants[encoding] = _IndexedFile(
+                            variant[0], variant[1], content_type, encoding, vary=True
+                        )
+            file = _IndexedFile(
+                full_path, stat_result, content_type, vary=bool(variants)
+            )
+            index[key] = _IndexEntry(file, variants)
+        return index
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        entry = self._index.get(path)
+        if entry is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        request_headers = Headers(scope=scope)
+        if "range" in request_headers:
+            return await super().get_response(path, scope)
+
+        file = entry.file
+        if entry.variants:
+            accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, variant in entry.variants.items():
+                if encoding in accepted:
+                    file = variant
+                    break
+
+        if self._is_not_modified(file, request_headers):
+            return NotModifiedResponse(Headers(raw=file.raw_headers))
+        return _IndexedFileResponse(file)
+
+    def _is_not_modified(self, file: _IndexedFile, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return file.etag in [tag.strip(" W/") for tag in if_none_match.split(",")]
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is not None:
+            parsed = parsedate(if_modified_since)
+            return parsed is not None and parsed >= parsedate(file.last_modified)  # type: ignore [operator]
+        return False
@@ -1 +1,234 @@
-from starlette.templating import Jinja2Templates as Jinja2Templates  # noqa
+import os
+import typing
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping, Sequence
+from os import PathLike
+from typing import Any, Callable, Optional, Union
+
+import jinja2
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+from starlette.templating import Jinja2Templates as StarletteJinja2Templates
+from starlette.types import Receive, Scope, Send
+
+from .config import Config
+from .requests import Request
+
+
+def _coalesce(
+    pieces: Iterable[str], chunk_size: int, first_chunk_size: int
+) -> Iterator[str]:
+    # Join the small strings generated by a template into chunks of at least chunk_size
+    buffer: list[str] = []
+    size = 0
+    threshold = first_chunk_size
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= threshold and size:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+            threshold = chunk_size
+    if buffer:
+        yield "".join(buffer)
+
+
+async def _coalesce_async(
+    pieces: AsyncIterator[str], chunk_size: int, first_chunk_size: int
+) -> AsyncIterator[str]:
+    buffer: list[str] = []
+    size = 0
+    threshold = first_chunk_size
+    async for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= threshold and size:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+            threshold = chunk_size
+    if buffer:
+        yield "".join(buffer)
+
+
+class _StreamingTemplateResponse(StreamingResponse):
+    def __init__(
+        self,
+        template: jinja2.Template,
+        context: dict[str, Any],
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        chunk_size: int = 4096,
+        first_chunk_size: int = 0,
+    ) -> None:
+        self.template = template
+        self.context = context
+        content: Union[Iterator[str], AsyncIterator[str]]
+        if template.environment.is_async:
+            content = _coalesce_async(
+                template.generate_async(context), chunk_size, first_chunk_size
+            )
+        else:
+            # Rendered in the threadpool one chunk at a time by StreamingResponse
+            content = _coalesce(
+                template.generate(context), chunk_size, first_chunk_size
+            )
+        super().__init__(
+            content, status_code, headers, media_type or "text/html", background
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = self.context.get("request", {})
+        extensions = request.get("extensions", {})
+        if "http.response.debug" in extensions:
+            await send(
+                {
+                    "type": "http.response.debug",
+                    "info": {"template": self.template, "context": self.context},
+                }
+            )
+        await super().__call__(scope, receive, send)
+
+
+class Jinja2Templates(StarletteJinja2Templates):
+    """Starlette's Jinja2Templates with a bytecode cache, template preloading, a switch
+    for the template reload checks and streaming template responses.
+
+    ```py
+    templates = Jinja2Templates("templates", bytecode_cache_dir="/tmp/jinja", auto_reload=False)
+    templates.preload()
+    ```
+
+    Args:
+        directory (str | PathLike[str] | Sequence[str | PathLike[str]]): Template directories.
+        context_processors (Optional[list[Callable[[Request], dict[str, Any]]]]): Functions
+            returning extra context for every template rendered with TemplateResponse.
+        env (Optional[jinja2.Environment]): Preconfigured environment to use instead of
+            creating one for the directory.
+        bytecode_cache_dir (Optional[str]): Directory to cache the compiled templates in.
+            An empty string disables the cache. Defaults to
+            Config.TEMPLATES_BYTECODE_CACHE_DIR.
+        auto_reload (Optional[bool]): Check if a template changed on disk each time it's
+            used. Defaults to Config.TEMPLATES_AUTO_RELOAD, or the setting of env.
+    """
+
+    @typing.overload
+    def __init__(
+        self,
+        directory: Union[str, PathLike[str], Sequence[Union[str, PathLike[str]]]],
+        *,
+        context_processors: Optional[list[Callable[[Request], dict[str, Any]]]] = None,
+        bytecode_cache_dir: Optional[str] = None,
+        auto_reload: Optional[bool] = None,
+    ) -> None: ...
+
+    @typing.overload
+    def __init__(
+        self,
+        *,
+        env: jinja2.Environment,
+        context_processors: Optional[list[Callable[[Request], dict[str, Any]]]] = None,
+        bytecode_cache_dir: Optional[str] = None,
+        auto_reload: Optional[bool] = None,
+    ) -> None: ...
+
+    def __init__(
+        self,
+        directory: Optional[
+            Union[str, PathLike[str], Sequence[Union[str, PathLike[str]]]]
+        ] = None,
+        *,
+        context_processors: Optional[list[Callable[[Request], dict[str, Any]]]] = None,
+        env: Optional[jinja2.Environment] = None,
+        bytecode_cache_dir: Optional[str] = None,
+        auto_reload: Optional[bool] = None,
+    ) -> None:
+        if env is None:
+            super().__init__(directory, context_processors=context_processors)  # type: ignore [arg-type]
+            if auto_reload is None:
+                auto_reload = Config.TEMPLATES_AUTO_RELOAD
+        else:
+            super().__init__(env=env, context_processors=context_processors)
+        if auto_reload is not None:
+            self.env.auto_reload = auto_reload
+        if bytecode_cache_dir is None:
+            bytecode_cache_dir = Config.TEMPLATES_BYTECODE_CACHE_DIR
+        if bytecode_cache_dir:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            # Bytecode of a template that changed on disk is discarded by its checksum
+            self.env.bytecode_cache = jinja2.FileSystemBytecodeCache(bytecode_cache_dir)
+
+    def StreamingTemplateResponse(
+        self,
+        request: Request,
+        name: str,
+        context: Optional[dict[str, Any]] = None,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        chunk_size: int = 4096,
+        first_chunk_size: int = 0,
+    ) -> StreamingResponse:
+        """Like TemplateResponse but the template is rendered while it's sent instead of
+        being rendered into a string first. The browser receives the start of the page
+        before the rest is rendered and large pages are never held in memory.
+
+        The status and headers are sent before rendering, so an error while rendering
+        ends the response instead of returning an error page.
+
+        Args:
+            request (Request): The request.
+            name (str): The template name.
+            context (Optional[dict[str, Any]]): Template context. Defaults to None.
+            status_code (int): Defaults to 200.
+            headers (Optional[Mapping[str, str]]): Defaults to None.
+            media_type (Optional[str]): Defaults to text/html.
+            background (Optional[BackgroundTask]): Defaults to None.
+            chunk_size (int): Minimum number of characters sent at a time. Small pieces
+                rendered by the template are joined up to this size. Defaults to 4096.
+            first_chunk_size (int): Minimum size of the first chunk. Defaults to 0 to send
+                the start of the page as soon as it's rendered.
+
+        Returns:
+            StreamingResponse: The response streaming the rendered template.
+        """
+        context = {} if context is None else context
+        context.setdefault("request", request)
+        for context_processor in self.context_processors:
+            context.update(context_processor(request))
+        return _StreamingTemplateResponse(
+            self.get_template(name),
+            context,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            background=background,
+            chunk_size=chunk_size,
+            first_chunk_size=first_chunk_size,
+        )
+
+    def preload(
+        self,
+        extensions: Optional[Sequence[str]] = None,
+        filter_func: Optional[Callable[[str], bool]] = None,
+    ) -> list[str]:
+        """Compile all the templates so the first requests don't have to. Call it on startup.
+
+        Only as many templates as the environment's cache_size (400 by default) are kept.
+
+        Args:
+            extensions (Optional[Sequence[str]]): Only load templates with these file
+                extensions, like `["html", "jinja"]`. Defaults to None.
+            filter_func (Optional[Callable[[str], bool]]): Only load the templates whose
+                name it returns True for. Defaults to None.
+
+        Returns:
+            list[str]: The names of the loaded templates.
+        """
+        names = self.env.list_templates(extensions=extensions, filter_func=filter_func)
+        for name in names:
+            self.env.get_template(name)
+        return names
@@ -1,5 +1,5 @@
 #!/usr/bin/env bash
 # set -x
 
-ruff check mojito tests scripts --fix
-ruff format mojito tests scripts
\ No newline at end of file
+ruff check mojito tests scripts benchmarks --fix
+ruff format mojito tests scripts benchmarks
\ No newline at end of file
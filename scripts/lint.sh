@@ -4,5 +4,5 @@ set -e
 # set -x
 
 mypy mojito
-ruff check mojito tests scripts
-ruff format mojito tests --check
\ No newline at end of file
+ruff check mojito tests scripts benchmarks
+ruff format mojito tests benchmarks --check
\ No newline at end of file
@@ -1,4 +1,7 @@
-from typing import Any
+import enum
+from datetime import date
+from decimal import Decimal
+from typing import Any, Optional
 
 from mojito import (
     AppRouter,
@@ -33,6 +36,33 @@ async def id_route_with_query_params(id: int, query_param_1: str, request: Reque
     return JSONResponse({"id": id, "query_param_1": query_param_1})
 
 
+class Level(enum.IntEnum):
+    LOW = 1
+    HIGH = 2
+
+
+@main_router.route("/typed_query")
+async def typed_query_params(
+    page: int,
+    active: bool = False,
+    tags: list[str] = [],
+    since: Optional[date] = None,
+    amount: Optional[Decimal] = None,
+    level: Optional[Level] = None,
+):
+    tags.append("seen")  # Mutating the default doesn't leak into other requests
+    return JSONResponse(
+        {
+            "page": page,
+            "active": active,
+            "tags": tags[:-1],
+            "since": since.isoformat() if since else None,
+            "amount": str(amount) if amount is not None else None,
+            "level": level.name if level is not None else None,
+        }
+    )
+
+
 # TEST PROTECTED ROUTES
 class PasswordAuth(auth.BaseAuth):
     "Authenticate with username and password"
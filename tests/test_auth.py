@@ -1,3 +1,7 @@
+import asyncio
+
+import pytest
+
 from mojito import AppRouter, Mojito, Request, auth, config
 from mojito.testclient import TestClient
 
@@ -6,7 +10,9 @@ from .db import get_db
 config.Config.SUPERUSER_PERMISSION_NAME = "superuser"
 app = Mojito()
 protected_router = AppRouter()
-protected_router.add_middleware(auth.AuthMiddleware)
+protected_router.add_middleware(
+    auth.AuthMiddleware, ignore_routes=["/login-token", "/public/*"]
+)
 
 client = TestClient(app)
 
@@ -140,6 +146,21 @@ def protected_route():
     return "accessed"
 
 
+protected_route_calls = 0
+
+
+@protected_router.route("/protected-counted")
+def protected_counted_route():
+    global protected_route_calls
+    protected_route_calls += 1
+    return "accessed"
+
+
+@protected_router.route("/public/page")
+def public_page():
+    return "public"
+
+
 @protected_router.route("/login-token", methods=["GET", "POST"])
 async def login_token(request: Request):
     # Login using token authentication method
@@ -165,6 +186,14 @@ def test_route_protection():
     assert result.text == "accessed"
 
 
+def test_unauthorized_route_not_called():
+    client.cookies.clear()
+    result = client.get("/protected-counted")
+    assert result.text == "login page"
+    assert protected_route_calls == 0
+    assert client.get("/public/page").text == "public"
+
+
 def test_secondary_auth_method():
     print("testing secondary auth method")
     client.cookies.clear()
@@ -282,6 +311,43 @@ def test_decorator_protected_missing_scope():
     assert result.text == "login page"
 
 
+@app.route("/decorator_protected_any_of")
+@auth.requires(auth.any_of("nope", "admin"))
+def decorator_protected_any_of(request: Request):
+    return "decorator protected any of"
+
+
+def test_decorator_protected_any_of():
+    client.cookies.clear()
+    result = client.get("/decorator_protected_any_of")
+    assert result.text == "login page"
+    result = client.post("/login")
+    assert result.status_code == 200
+    result = client.get("/decorator_protected_any_of")
+    assert result.text == "decorator protected any of"
+
+
+@pytest.mark.parametrize(
+    "requirement,permissions,satisfied",
+    [
+        (auth.all_of(), set(), True),
+        (auth.any_of(), set(), True),
+        (auth.all_of("a", "b"), {"a", "b", "c"}, True),
+        (auth.all_of("a", "b"), {"a"}, False),
+        (auth.any_of("a", "b"), {"b"}, True),
+        (auth.any_of("a", "b"), {"c"}, False),
+        (auth.any_of("admin", auth.all_of("editor", "publisher")), {"editor"}, False),
+        (
+            auth.any_of("admin", auth.all_of("editor", "publisher")),
+            {"editor", "publisher"},
+            True,
+        ),
+    ],
+)
+def test_requirement(requirement: auth.Requirement, permissions: set, satisfied: bool):
+    assert requirement.is_satisfied(frozenset(permissions)) is satisfied
+
+
 @app.route("/logout", methods=["POST"])
 def logout(request: Request):
     auth.logout(request)
@@ -348,3 +414,129 @@ def test_auth_required_middleware_scopes():
     result = client.get("/scope_invalid_protected_route")
     assert result.status_code == 200
     assert result.text == "login page"  # Redirected to login page
+
+
+class CountingAuth(auth.BaseAuth):
+    calls = 0
+
+    async def get_user(self, user_id: int) -> auth.AuthSessionData:
+        CountingAuth.calls += 1
+        await asyncio.sleep(0.01)
+        return auth.AuthSessionData(
+            is_authenticated=True,
+            auth_handler="CountingAuth",
+            user_id=user_id,
+            data={},
+            permissions=["admin"],
+        )
+
+
+auth.include_auth_handler(CountingAuth)
+
+
+def test_revalidation_coalesced():
+    CountingAuth.calls = 0
+
+    async def revalidate():
+        return await asyncio.gather(
+            *[auth._user_cache.get_user("CountingAuth", 1) for _ in range(10)]
+        )
+
+    results = asyncio.run(revalidate())
+    assert CountingAuth.calls == 1
+    assert all(result["user_id"] == 1 for result in results)
+    asyncio.run(auth._user_cache.get_user("CountingAuth", 1))
+    assert CountingAuth.calls == 2  # Not cached by default
+
+
+def test_revalidation_leader_cancelled():
+    CountingAuth.calls = 0
+
+    async def revalidate():
+        leader = asyncio.create_task(auth._user_cache.get_user("CountingAuth", 3))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(auth._user_cache.get_user("CountingAuth", 3))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(revalidate())["user_id"] == 3
+    assert CountingAuth.calls == 2  # The waiter looked the user up itself
+
+
+class FailingAuth(auth.BaseAuth):
+    async def get_user(self, user_id: int) -> auth.AuthSessionData:
+        await asyncio.sleep(0.01)
+        raise LookupError(user_id)
+
+
+auth.include_auth_handler(FailingAuth)
+
+
+def test_revalidation_error_shared():
+    async def revalidate():
+        return await asyncio.gather(
+            *[auth._user_cache.get_user("FailingAuth", 1) for _ in range(3)],
+            return_exceptions=True,
+        )
+
+    errors = asyncio.run(revalidate())
+    assert all(isinstance(error, LookupError) for error in errors)
+    assert len({id(error) for error in errors}) == 3
+    assert errors[1].__cause__ is errors[0]
+
+
+def test_revalidation_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(config.Config, "USER_REVALIDATION_CACHE_TTL", 60)
+    CountingAuth.calls = 0
+    for _ in range(3):
+        asyncio.run(auth._user_cache.get_user("CountingAuth", 2))
+    assert CountingAuth.calls == 1
+    auth.invalidate_user(2, CountingAuth)
+    asyncio.run(auth._user_cache.get_user("CountingAuth", 2))
+    assert CountingAuth.calls == 2
+    auth.clear_user_cache()
+
+
+@pytest.mark.parametrize("algorithm", ["scrypt", "pbkdf2_sha256"])
+def test_password_hashing(monkeypatch: pytest.MonkeyPatch, algorithm: str):
+    monkeypatch.setattr(config.Config, "PASSWORD_HASH_ALGORITHM", algorithm)
+    monkeypatch.setattr(config.Config, "PASSWORD_SCRYPT_N", 2**10)
+    monkeypatch.setattr(config.Config, "PASSWORD_PBKDF2_ITERATIONS", 1_000)
+
+    async def check():
+        password_hash = await auth.hash_password_async("password")
+        assert password_hash.startswith(algorithm + "$")
+        assert not auth.password_needs_rehash(password_hash)
+        assert await auth.verify_password("password", password_hash)
+        assert not await auth.verify_password("wrong", password_hash)
+
+    asyncio.run(check())
+
+
+@pytest.mark.parametrize(
+    "password_hash",
+    ["foo$1$AA==$AA==", "scrypt$1$AA==$AA==", "pbkdf2_sha256$0$AA==$AA==", "hásh"],
+)
+def test_verify_malformed_password_hash(password_hash: str):
+    assert not asyncio.run(auth.verify_password("password", password_hash))
+
+
+def test_password_rehash(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(config.Config, "PASSWORD_SCRYPT_N", 2**10)
+    rehashed: list[str] = []
+
+    async def save_hash(password_hash: str):
+        rehashed.append(password_hash)
+
+    async def check():
+        legacy_hash = auth.hash_password("password")
+        assert auth.password_needs_rehash(legacy_hash)
+        assert not await auth.verify_password("wrong", legacy_hash, save_hash)
+        assert rehashed == []
+        assert await auth.verify_password("password", legacy_hash, save_hash)
+        assert len(rehashed) == 1
+        assert await auth.verify_password("password", rehashed[0], save_hash)
+        assert len(rehashed) == 1  # Already up to date
+
+    asyncio.run(check())
@@ -0,0 +1,83 @@
+import pytest
+
+from mojito import (
+    AppRouter,
+    JSONResponse,
+    Mojito,
+    Request,
+    config,
+    flash_message,
+    g,
+    get_flashed_messages,
+)
+from mojito.middleware.session_stores import MemorySessionStore
+from mojito.testclient import TestClient
+
+router = AppRouter()
+
+
+@router.route("/login")
+def login(request: Request):
+    request.user.update({"user_id": 1})
+    flash_message("Welcome back!", "success")
+    return "logged in"
+
+
+@router.route("/user")
+def user(request: Request):
+    return JSONResponse(
+        {"user": request.user, "messages": get_flashed_messages() or []}
+    )
+
+
+@router.route("/hello")
+def hello():
+    g.name = "World"
+    return f"Hello {g.name}"
+
+
+apps = {
+    (fuse_middleware, name): Mojito(fuse_middleware=fuse_middleware, **kwargs)
+    for fuse_middleware in (False, True)
+    for name, kwargs in (
+        ("cookie", {}),
+        ("store", {"session_store": MemorySessionStore()}),
+        ("no flashes", {"flash_messages": False}),
+        ("disabled", {"sessions": False, "flash_messages": False}),
+    )
+}
+for app in apps.values():
+    app.include_router(router)
+
+
+@pytest.mark.parametrize("fuse_middleware", [False, True])
+@pytest.mark.parametrize("store", ["cookie", "store"])
+def test_sessions_and_flash_messages(fuse_middleware: bool, store: str):
+    client = TestClient(apps[fuse_middleware, store])
+    result = client.get("/login")
+    cookies = result.headers.get_list("set-cookie")
+    assert cookies[0].startswith(config.Config.MESSAGE_FLASH_COOKIE + "=")
+    assert cookies[1].startswith(config.Config.USER_SESSION_COOKIE + "=")
+    data = client.get("/user").json()
+    assert data["user"]["user_id"] == 1
+    assert data["messages"][0]["message"] == "Welcome back!"
+    result = client.get("/hello")
+    assert result.text == "Hello World"
+    assert "set-cookie" not in result.headers
+
+
+@pytest.mark.parametrize("fuse_middleware", [False, True])
+def test_disabled_features(fuse_middleware: bool):
+    client = TestClient(apps[fuse_middleware, "no flashes"])
+    result = client.get("/login")
+    assert result.headers.get_list("set-cookie")[0].startswith(
+        config.Config.USER_SESSION_COOKIE + "="
+    )
+    data = client.get("/user").json()
+    assert data["user"]["user_id"] == 1
+    assert data["messages"] == []
+
+    client = TestClient(apps[fuse_middleware, "disabled"])
+    assert client.get("/hello").text == "Hello World"
+    with pytest.raises(AssertionError):
+        client.get("/user")  # request.user is unavailable without sessions
@@ -1,10 +1,27 @@
+import asyncio
+import hashlib
+import io
 import os
+from typing import Annotated, Optional
 
 import pytest
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from starlette.datastructures import FormData
 
 from mojito import JSONResponse, Mojito, Request, Response
-from mojito.forms import Form, FormManager, UploadFile
+from mojito.forms import (
+    CallbackSink,
+    DiskSink,
+    FileConstraints,
+    Form,
+    FormManager,
+    HashSink,
+    StreamedFile,
+    StreamingForm,
+    UploadFile,
+    _form_plan,
+    _process_form,
+)
 from mojito.testclient import TestClient
 
 app = Mojito()
@@ -129,3 +146,231 @@ def test_form_combine_inputs(form_data: dict[str, str], status: int):
         data=form_data,
     )
     assert result.status_code == status
+
+
+class StreamingFormTest(BaseModel):
+    title: str
+    count: int = 0
+    document: StreamedFile
+    checksum: Optional[StreamedFile] = None
+
+
+@app.route("/upload_streaming", methods=["POST"])
+async def upload_streaming(
+    request: Request,
+    directory: str,
+    max_fields: int = 1000,
+    max_field_size: int = 1024 * 1024,
+    max_file_size: Optional[int] = None,
+    max_body_size: Optional[int] = None,
+):
+    try:
+        form = await StreamingForm(
+            request,
+            StreamingFormTest,
+            files={
+                "document": lambda file: DiskSink(
+                    os.path.join(directory, file.filename)
+                ),
+                "checksum": lambda file: HashSink("md5"),
+            },
+            max_fields=max_fields,
+            max_field_size=max_field_size,
+            max_file_size=max_file_size,
+            max_body_size=max_body_size,
+        )
+    except ValidationError as e:
+        return JSONResponse([error["loc"] for error in e.errors()], status_code=422)
+    return JSONResponse(
+        {
+            "title": form.title,
+            "count": form.count,
+            "path": str(form.document.result),
+            "size": form.document.size,
+            "md5": form.checksum.result if form.checksum else None,
+        }
+    )
+
+
+def test_streaming_form(tmp_path):
+    content = b"x" * 200_000
+    result = client.post(
+        f"/upload_streaming?directory={tmp_path}",
+        data={"title": "report", "count": "3", "ignored": "value"},
+        files={"document": ("doc.txt", content), "checksum": ("doc.txt", content)},
+    )
+    assert result.status_code == 200
+    body = result.json()
+    assert body["title"] == "report"
+    assert body["count"] == 3
+    assert body["size"] == len(content)
+    assert body["md5"] == hashlib.md5(content).hexdigest()
+    with open(body["path"], "rb") as f:
+        assert f.read() == content
+
+
+@pytest.mark.parametrize(
+    ("data", "limits", "status"),
+    [
+        ({"title": "report", "count": "nope"}, {}, 422),  # Invalid field
+        ({"title": "report"}, {"max_file_size": 100}, 413),
+        ({"title": "x" * 200}, {"max_field_size": 100}, 413),
+        ({"title": "report"}, {"max_body_size": 100}, 413),
+        ({"title": "report", "a": "1", "b": "2"}, {"max_fields": 2}, 413),
+    ],
+)
+def test_streaming_form_rejected(
+    tmp_path, data: dict[str, str], limits: dict[str, int], status: int
+):
+    result = client.post(
+        "/upload_streaming",
+        params={"directory": str(tmp_path), **limits},
+        data=data,
+        files={"document": ("doc.txt", b"x" * 1000)},
+    )
+    assert result.status_code == status
+    if status == 422:
+        assert result.json() == [["count"]]
+    # Files written before the form was rejected are deleted
+    assert os.listdir(tmp_path) == []
+
+
+class ConstrainedStreamingForm(BaseModel):
+    document: Annotated[StreamedFile, FileConstraints(max_size=100)]
+
+
+constrained_chunks: list[bytes] = []
+
+
+async def receive_constrained(data: bytes) -> None:
+    constrained_chunks.append(data)
+
+
+@app.route("/upload_constrained", methods=["POST"])
+async def upload_constrained(request: Request):
+    form = await StreamingForm(
+        request,
+        ConstrainedStreamingForm,
+        files={"document": lambda file: CallbackSink(receive_constrained)},
+    )
+    return JSONResponse({"size": form.document.size})
+
+
+def test_streaming_form_file_constraints():
+    result = client.post(
+        "/upload_constrained", files={"document": ("doc.txt", b"x" * 100)}
+    )
+    assert result.json() == {"size": 100}
+    constrained_chunks.clear()
+    result = client.post(
+        "/upload_constrained", files={"document": ("doc.txt", b"x" * 100_000)}
+    )
+    assert result.status_code == 413
+    assert sum(len(data) for data in constrained_chunks) <= 100
+
+
+class _NoReadinto(io.BytesIO):
+    # Like SpooledTemporaryFile before Python 3.11
+    readinto = None  # type: ignore [assignment]
+
+
+def test_upload_file_readinto_fallback():
+    document = UploadFile(_NoReadinto(b"0123456789"))
+    buffer = bytearray(4)
+    assert asyncio.run(document.readinto(buffer)) == 4
+    assert buffer == b"0123"
+    assert asyncio.run(document.readinto(memoryview(buffer)[:2])) == 2
+    assert buffer == b"4523"
+
+
+def test_streaming_form_urlencoded(tmp_path):
+    result = client.post(
+        f"/upload_streaming?directory={tmp_path}", data={"title": "report"}
+    )
+    assert result.status_code == 422
+    assert result.json() == [["document"]]
+
+
+class AliasedForm(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    user_name: str = Field(alias="userName")
+    tags: list[str] = Field(default=[], alias="tag")
+
+
+def test_form_plan():
+    plan = _form_plan(AliasedForm)
+    assert plan is _form_plan(AliasedForm)
+    assert not plan.drop_unknown
+    form = FormData([("userName", "sam"), ("tag", "a"), ("extra", "x"), ("tag", "")])
+    assert _process_form(form, AliasedForm) == {
+        "userName": "sam",
+        "tag": ["a"],
+        "extra": "x",
+    }
+    with pytest.raises(ValidationError):
+        AliasedForm.model_validate(_process_form(form, AliasedForm))
+
+    plan = _form_plan(FormWithMultipleInputs)
+    assert plan.drop_unknown
+    form = FormData([("roles", "a"), ("ignored", "x"), ("other_input", "b")])
+    assert _process_form(form, FormWithMultipleInputs) == {
+        "roles": ["a"],
+        "other_input": "b",
+    }
+
+
+class ConstrainedUploadForm(BaseModel):
+    document: Annotated[
+        UploadFile, FileConstraints(max_size=2_000_000, content_types=["text/*"])
+    ]
+
+
+@app.route("/upload_large", methods=["POST"])
+async def process_large_upload(request: Request):
+    destination = request.query_params["destination"]
+    try:
+        async with FormManager(request, ConstrainedUploadForm) as form:
+            document = form.document
+            first = bytearray(10)
+            read = await document.readinto(first)
+            sizes = [len(chunk) async for chunk in document.iter_chunks(500_000)]
+            await document.save(destination)
+            return JSONResponse(
+                {"first": first[:read].decode(), "sizes": sizes, "size": document.size}
+            )
+    except ValidationError as e:
+        return JSONResponse([error["type"] for error in e.errors()], status_code=422)
+
+
+@pytest.mark.parametrize("size", [100, 1_500_000])  # In memory and rolled to disk
+def test_upload_file_streaming(tmp_path, size: int):
+    content = b"0123456789" * (size // 10)
+    destination = tmp_path / "saved.txt"
+    result = client.post(
+        f"/upload_large?destination={destination}",
+        files={"document": ("doc.txt", content, "text/plain")},
+    )
+    assert result.status_code == 200
+    body = result.json()
+    assert body["first"] == "0123456789"
+    assert sum(body["sizes"]) == size - 10
+    assert max(body["sizes"]) <= 500_000
+    assert body["size"] == size
+    assert destination.read_bytes() == content
+
+
+@pytest.mark.parametrize(
+    ("size", "content_type", "error"),
+    [
+        (2_000_001, "text/plain", "file_too_large"),
+        (100, "image/png", "file_content_type"),
+    ],
+)
+def test_upload_file_constraints(tmp_path, size: int, content_type: str, error: str):
+    result = client.post(
+        f"/upload_large?destination={tmp_path / 'saved'}",
+        files={"document": ("doc", b"x" * size, content_type)},
+    )
+    assert result.status_code == 422
+    assert result.json() == [error]
@@ -2,11 +2,45 @@ import asyncio
 
 import httpx
 
-from mojito import Mojito, Request, g
+from mojito import JSONResponse, Mojito, Request, StreamingResponse, g
+from mojito.testclient import TestClient
 
 app = Mojito()
 
 
+@app.route("/leak")
+async def set_leaked_g():
+    g.leaked = "leaked"
+    return "set"
+
+
+g.set_default("default_list", list)
+
+
+@app.route("/namespace")
+async def namespace_only():
+    g.namespace_only = "set"
+    g.default_list.append("item")
+    return JSONResponse({"namespace_only": g.namespace_only, "list": g.default_list})
+
+
+@app.route("/stream")
+async def stream():
+    async def content():
+        for i in range(3):
+            yield f"chunk {i};"
+
+    return StreamingResponse(content())
+
+
+g.app_name = "myapp"
+
+
+@app.route("/app-name")
+async def app_name():
+    return g.app_name
+
+
 @app.route("/{g_message}")
 async def get_and_set_g(request: Request, g_message: int):
     g.test_message = g_message
@@ -14,10 +48,14 @@ async def get_and_set_g(request: Request, g_message: int):
     assert g.test_message == g_message
 
 
-async def get_g(i: int):
+async def get_path(path: str):
     transport = httpx.ASGITransport(app=app)
     async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
-        await client.get(f"/{i}")
+        return await client.get(path)
+
+
+async def get_g(i: int):
+    await get_path(f"/{i}")
 
 
 async def main():
@@ -29,5 +67,34 @@ def test_g_isolation():
     assert True
 
 
+def test_g_isolated_from_caller_context():
+    async def call_app():
+        # ASGITransport runs the app in the current task
+        await get_path("/leak")
+        assert g.leaked is None
+
+    asyncio.run(call_app())
+
+
+def test_g_namespace_storage():
+    client = TestClient(app)
+    for _ in range(2):
+        response = client.get("/namespace")
+        # Callable defaults are created per request
+        assert response.json() == {"namespace_only": "set", "list": ["item"]}
+    assert "namespace_only" not in g._vars
+
+
+def test_streaming_response():
+    response = TestClient(app).get("/stream")
+    assert response.status_code == 200
+    assert response.text == "chunk 0;chunk 1;chunk 2;"
+
+
+def test_g_set_outside_request():
+    client = TestClient(app)
+    assert client.get("/app-name").text == "myapp"
+
+
 if __name__ == "__main__":
     asyncio.run(main())
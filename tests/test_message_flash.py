@@ -30,3 +30,12 @@ def test_message_flash():
     assert "flash_set" == messages[0].get("message")
     assert "flash message 2" == messages[1].get("message")
     assert "warn" == messages[1].get("category")
+
+
+def test_message_flash_cookie():
+    response = client.get("/set-flash")
+    cookie = response.headers["set-cookie"]
+    assert cookie.startswith("mo_flash_messages=")
+    assert cookie.endswith("; path=/; httponly; samesite=lax")
+    response = client.get("/get-flash")
+    assert len(response.json()) == 2
@@ -0,0 +1,40 @@
+import copy
+
+from mojito.requests import LazyProxy, request_cookies, resolve_lazy
+
+
+def test_request_cookies():
+    scope = {
+        "type": "http",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"cookie", b"session=abc; theme=dark"),
+            (b"cookie", b"lang=en"),
+        ],
+    }
+    cookies = request_cookies(scope)
+    assert cookies == {"session": "abc", "theme": "dark", "lang": "en"}
+    assert request_cookies(scope) is cookies
+    assert request_cookies({"type": "http", "headers": []}) == {}
+
+
+def test_lazy_proxy():
+    loads: list[dict[str, int]] = []
+
+    def load() -> dict[str, int]:
+        loads.append({"a": 1})
+        return loads[-1]
+
+    proxy = LazyProxy(load)
+    assert loads == []
+    assert proxy["a"] == 1
+    assert "a" in proxy and list(proxy) == ["a"] and len(proxy) == 1
+    proxy["b"] = 2
+    assert proxy.get("b") == 2
+    assert proxy == {"a": 1, "b": 2}
+    assert dict(proxy) == {"a": 1, "b": 2}
+    assert copy.deepcopy(proxy) == {"a": 1, "b": 2}
+    assert resolve_lazy(proxy) is loads[0]
+    assert len(loads) == 1
+    assert resolve_lazy("value") == "value"
+    assert not LazyProxy(list)
@@ -1,5 +1,15 @@
+from typing import Any
+
 import pytest
+from starlette.datastructures import MutableHeaders
+from starlette.endpoints import HTTPEndpoint
+from starlette.middleware import Middleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from mojito import AppRouter, Mojito, Request
+from mojito.routing import _ArgSource, _EndpointArgs
 from mojito.testclient import TestClient
 
 from .main import app
@@ -31,7 +41,294 @@ def test_params(path_param: int, query_param_1: str, status: int):
         assert response.json() == {"id": path_param, "query_param_1": query_param_1}
 
 
+@pytest.mark.parametrize(
+    "query,status,expected_response",
+    [
+        (
+            "page=2&active=true&tags=a&tags=b&since=2024-01-31",
+            200,
+            {
+                "page": 2,
+                "active": True,
+                "tags": ["a", "b"],
+                "since": "2024-01-31",
+                "amount": None,
+                "level": None,
+            },
+        ),
+        (
+            "page=1",
+            200,
+            {
+                "page": 1,
+                "active": False,
+                "tags": [],
+                "since": None,
+                "amount": None,
+                "level": None,
+            },
+        ),
+        (
+            "page=1&since=&amount=1.50&level=2",
+            200,
+            {
+                "page": 1,
+                "active": False,
+                "tags": [],
+                "since": None,
+                "amount": "1.50",
+                "level": "HIGH",
+            },
+        ),
+        ("page=nope", 422, None),
+        ("active=true", 422, None),  # Missing required page
+        ("page=1&active=maybe", 422, None),
+        ("page=1&since=yesterday", 422, None),
+        ("page=1&amount=abc", 422, None),
+        ("page=1&level=3", 422, None),
+        ("page=1&level=HIGH", 422, None),
+    ],
+)
+def test_typed_query_params(query: str, status: int, expected_response: Any):
+    for _ in range(2):
+        response = client.get(f"/typed_query?{query}")
+        assert response.status_code == status
+        if status == 200:
+            assert response.json() == expected_response
+
+
 def test_application_route():
     response = client.get("/app-route")
     assert response.status_code == 200
     assert response.text == "app-route"
+
+
+def test_endpoint_args_compiled_once():
+    def endpoint(id: int, request: Request, query_param_1: str) -> str:
+        return ""
+
+    endpoint_args = _EndpointArgs.compile("/{id:int}", endpoint)
+    assert [(name, source) for name, source, _ in endpoint_args.args] == [
+        ("id", _ArgSource.PATH),
+        ("request", _ArgSource.REQUEST),
+        ("query_param_1", _ArgSource.QUERY),
+    ]
+
+
+matching_router = AppRouter()
+
+
+@matching_router.route("/items/new")
+def new_item() -> str:
+    return "new"
+
+
+@matching_router.route("/items/{item_id:int}")
+def get_item(item_id: int) -> str:
+    return f"item {item_id}"
+
+
+@matching_router.route("/items/{name}")
+def get_item_by_name(name: str) -> str:
+    return f"name {name}"
+
+
+@matching_router.route("/items/{item_id:int}/edit", methods=["POST"])
+def edit_item(item_id: int) -> str:
+    return f"edit {item_id}"
+
+
+@matching_router.route("/files/{file_path:path}")
+def get_file(file_path: str) -> str:
+    return f"file {file_path}"
+
+
+@matching_router.route("/slash/")
+def slash() -> str:
+    return "slash"
+
+
+@matching_router.route("/shadowed/{name}")
+def shadowing(name: str) -> str:
+    return f"shadowing {name}"
+
+
+@matching_router.route("/shadowed/static")
+def shadowed() -> str:
+    return "shadowed"
+
+
+class Endpoint(HTTPEndpoint):
+    async def get(self, request: Request) -> PlainTextResponse:
+        return PlainTextResponse("endpoint")
+
+
+matching_router.add_route("/endpoint", Endpoint)
+
+
+@matching_router.route("/endpoint")
+def shadowed_by_endpoint() -> str:
+    return "function"
+
+
+matching_clients = {}
+for compile_routes in (False, True):
+    matching_app = Mojito(compile_routes=compile_routes)
+    matching_app.include_router(matching_router)
+    matching_clients[compile_routes] = TestClient(matching_app)
+
+
+@pytest.mark.parametrize(
+    "path,method,status,expected_response",
+    [
+        ("/items/new", "GET", 200, "new"),
+        ("/items/5", "GET", 200, "item 5"),
+        ("/items/abc", "GET", 200, "name abc"),
+        ("/items/5/edit", "POST", 200, "edit 5"),
+        ("/items/5/edit", "GET", 405, "Method Not Allowed"),
+        ("/files/a/b/c.txt", "GET", 200, "file a/b/c.txt"),
+        ("/slash", "GET", 200, "slash"),
+        ("/items/5/nope", "GET", 404, "Not Found"),
+        ("/items/new", "POST", 405, "Method Not Allowed"),
+        ("/items/new", "HEAD", 200, ""),
+        ("/shadowed/static", "GET", 200, "shadowing static"),
+        ("/endpoint", "GET", 200, "endpoint"),
+    ],
+)
+@pytest.mark.parametrize("compile_routes", [False, True])
+def test_route_matching(
+    path: str, method: str, status: int, expected_response: str, compile_routes: bool
+):
+    response = matching_clients[compile_routes].request(method, path)
+    assert response.status_code == status
+    assert response.text == expected_response
+
+
+@pytest.mark.parametrize("compile_routes", [False, True])
+def test_route_matching_updated_after_adding_route(compile_routes: bool):
+    # Adds a route, so it uses a new app rather than the shared one
+    compiled_app = Mojito(compile_routes=compile_routes)
+    compiled_app.include_router(matching_router)
+    compiled_client = TestClient(compiled_app)
+    assert compiled_client.get("/late").status_code == 404
+
+    @compiled_app.route("/late")
+    def late() -> str:
+        return "late"
+
+    assert compiled_client.get("/late").text == "late"
+    assert compiled_app.url_path_for("get_item", item_id=3) == "/items/3"
+
+
+def test_routes_added_to_routes_list():
+    direct_app = Mojito()
+
+    @direct_app.route("/first")
+    def first() -> str:
+        return "first"
+
+    async def direct(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("direct")
+
+    direct_app.router.routes.append(Route("/direct", direct))
+    direct_app.routes.insert(0, Route("/first", direct, name="shadowing"))
+    direct_client = TestClient(direct_app)
+    assert direct_client.get("/direct").text == "direct"
+
+    @direct_app.route("/later")
+    def later() -> str:
+        return "later"
+
+    # Routes added to the list directly are kept when the routes are built again
+    assert direct_client.get("/later").text == "later"
+    assert direct_client.get("/direct").text == "direct"
+    assert direct_client.get("/first").text == "direct"
+    assert [route.path for route in direct_app.routes] == [
+        "/first",
+        "/first",
+        "/direct",
+        "/later",
+    ]
+
+
+class HeaderMiddleware:
+    "Adds its name to the x-middleware response header and counts instances"
+
+    instances: list["HeaderMiddleware"] = []
+
+    def __init__(self, app: ASGIApp, name: str) -> None:
+        self.app = app
+        self.name = name
+        HeaderMiddleware.instances.append(self)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("x-middleware", self.name)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def test_shared_router_middleware():
+    HeaderMiddleware.instances.clear()
+    shared_app = Mojito()
+    parent = AppRouter(prefix="/parent", share_middleware=True)
+    parent.add_middleware(HeaderMiddleware, name="parent")
+    child = AppRouter(prefix="/child", share_middleware=True)
+    child.add_middleware(HeaderMiddleware, name="child")
+
+    for i in range(10):
+        parent.add_route(f"/{i}", lambda request: PlainTextResponse("parent"))
+        child.add_route(f"/{i}", lambda request: PlainTextResponse("child"))
+    parent.include_router(child)
+    shared_app.include_router(parent)
+    # Added after the routes and still applied to them
+    parent.add_middleware(HeaderMiddleware, name="parent-late")
+
+    shared_client = TestClient(shared_app)
+    response = shared_client.get("/parent/3")
+    assert response.text == "parent"
+    assert response.headers.get_list("x-middleware") == ["parent", "parent-late"]
+    # Sub-routers don't inherit the middleware of the router they're included in
+    response = shared_client.get("/parent/child/3")
+    assert response.text == "child"
+    assert response.headers.get_list("x-middleware") == ["child"]
+    response = shared_client.post("/parent/child/3")
+    assert response.status_code == 405
+
+    shared_client.get("/parent/5")
+    shared_client.get("/parent/child/5")
+    # One stack per router no matter how many routes or requests
+    assert len(HeaderMiddleware.instances) == 3
+
+
+@pytest.mark.parametrize("share_middleware", [False, True])
+def test_include_router_composes_prefixes(share_middleware: bool):
+    HeaderMiddleware.instances.clear()
+    include_app = Mojito()
+    api = AppRouter(prefix="/api", share_middleware=share_middleware)
+    users = AppRouter(prefix="/users", share_middleware=share_middleware)
+    users.add_middleware(HeaderMiddleware, name="users")
+    # Included before its routes are defined
+    include_app.include_router(api)
+    api.include_router(
+        users, prefix="/v1", middleware=[Middleware(HeaderMiddleware, name="v1")]
+    )
+
+    @api.route("/status")
+    def status() -> str:
+        return "ok"
+
+    @users.route("/{user_id:int}", name="user")
+    def user(user_id: int) -> str:
+        return f"user {user_id}"
+
+    include_client = TestClient(include_app)
+    assert include_client.get("/api/status").text == "ok"
+    response = include_client.get("/api/v1/users/3")
+    assert response.text == "user 3"
+    assert response.headers.get_list("x-middleware") == ["users", "v1"]
+    assert include_app.url_path_for("user", user_id=3) == "/api/v1/users/3"
+    assert [route.path for route in users.routes] == ["/users/{user_id:int}"]
@@ -0,0 +1,76 @@
+import pytest
+
+from mojito import JSONResponse, config
+from mojito.requests import LazyProxy
+from mojito.serializers import (
+    decode_cookie_payload,
+    encode_cookie_payload,
+    get_json_codec,
+    json_dumps,
+    json_loads,
+)
+
+SESSION = {
+    "is_authenticated": True,
+    "user_id": 42,
+    "permissions": ["admin", "editor"],
+    "data": {"name": "Zoë", "ratio": 0.5, "tags": None},
+}
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson", "msgspec", "auto"])
+def test_json_codecs(monkeypatch: pytest.MonkeyPatch, codec: str):
+    if codec != "json":
+        pytest.importorskip("orjson" if codec == "auto" else codec)
+    monkeypatch.setattr(config.Config, "JSON_CODEC", codec)
+    assert get_json_codec().name == ("orjson" if codec == "auto" else codec)
+
+    encoded = json_dumps(SESSION)
+    assert isinstance(encoded, bytes)
+    assert b" " not in encoded
+    assert json_loads(encoded) == SESSION
+    assert json_loads(encoded.decode()) == SESSION
+    # Non str keys are encoded as strings by every codec
+    assert json_loads(json_dumps({1: "a"})) == {"1": "a"}
+    # Lazy values are loaded when they're encoded
+    assert json_loads(json_dumps({"user": LazyProxy(lambda: SESSION)})) == {
+        "user": SESSION
+    }
+
+    with pytest.raises(TypeError):
+        json_dumps({"value": object()})
+    with pytest.raises(ValueError):
+        json_loads(b"{not json")
+
+    response = JSONResponse(SESSION)
+    assert response.media_type == "application/json"
+    assert json_loads(response.body) == SESSION
+
+
+def test_unknown_json_codec(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(config.Config, "JSON_CODEC", "simplejson")
+    with pytest.raises(ValueError):
+        get_json_codec()
+
+
+def test_cookie_payloads():
+    legacy = encode_cookie_payload(SESSION, compact=False)
+    raw = encode_cookie_payload(SESSION, compact=True, compress_threshold=0)
+    assert raw.startswith(b"~1j")
+    compact = encode_cookie_payload(SESSION, compact=True, compress_threshold=32)
+    assert compact.startswith(b"~1z")
+    assert len(compact) < len(legacy) * 0.7
+    for payload in (legacy, raw, compact):
+        assert decode_cookie_payload(payload) == SESSION
+
+    large = {"messages": ["Your changes were saved."] * 20}
+    compressed = encode_cookie_payload(large, compact=True, compress_threshold=256)
+    assert compressed.startswith(b"~1z")
+    assert len(compressed) < len(json_dumps(large)) / 4
+    assert decode_cookie_payload(compressed) == large
+    # Only characters that don't need quoting in a cookie
+    assert compressed.decode().replace("-", "").replace("_", "")[1:].isalnum()
+
+    for payload in (b"~2jW10", b"~1xW10", b"~1z!!!!", b"not base64!"):
+        with pytest.raises(ValueError):
+            decode_cookie_payload(payload)
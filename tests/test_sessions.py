@@ -0,0 +1,218 @@
+import asyncio
+
+import pytest
+
+from mojito import AppRouter, JSONResponse, Mojito, Request, config
+from mojito.middleware import user_sessions
+from mojito.middleware.session_stores import (
+    CachedSessionStore,
+    MemorySessionStore,
+    SessionStore,
+    SQLiteSessionStore,
+)
+from mojito.testclient import TestClient
+
+router = AppRouter()
+
+
+@router.route("/login", methods=["POST"])
+def login(request: Request):
+    request.user.update({"user_id": 1, "data": {"name": "Test User"}})
+    return "logged in"
+
+
+@router.route("/authenticate", methods=["POST"])
+def authenticate(request: Request):
+    request.user["is_authenticated"] = True
+    return "authenticated"
+
+
+@router.route("/user")
+def user(request: Request):
+    return JSONResponse(request.user)
+
+
+@router.route("/rename", methods=["POST"])
+def rename(request: Request, name: str):
+    request.user["data"]["name"] = name
+    request.user.modified = True
+    return "renamed"
+
+
+@router.route("/rename-untracked", methods=["POST"])
+def rename_untracked(request: Request):
+    request.user["data"]["name"] = "Untracked"  # Without flagging it as modified
+    return "renamed"
+
+
+@router.route("/logout", methods=["POST"])
+def logout(request: Request):
+    request.user.clear()
+    return "logged out"
+
+
+@router.route("/ping")
+def ping():
+    return "pong"
+
+
+app = Mojito()
+app.include_router(router)
+
+stores: dict[str, SessionStore] = {
+    "memory": MemorySessionStore(),
+    "sqlite": SQLiteSessionStore(":memory:"),
+    "cached": CachedSessionStore(SQLiteSessionStore(":memory:")),
+}
+clients = {"cookie": TestClient(app)}
+for name, session_store in stores.items():
+    store_app = Mojito(session_store=session_store)
+    store_app.include_router(router)
+    clients[name] = TestClient(store_app)
+
+
+@pytest.fixture(autouse=True)
+def clear_cookies():
+    for client in clients.values():
+        client.cookies.clear()
+
+
+def session_id(client: TestClient) -> str:
+    return client.cookies[config.Config.USER_SESSION_COOKIE].rsplit(".", 2)[0]
+
+
+@pytest.mark.parametrize("store", ["memory", "sqlite", "cached"])
+def test_session_store(store: str):
+    client = clients[store]
+    client.post("/login")
+    assert "Test User" not in client.cookies[config.Config.USER_SESSION_COOKIE]
+    user = client.get("/user").json()
+    assert user["user_id"] == 1
+    assert user["data"] == {"name": "Test User"}
+    stored_id = session_id(client)
+    assert asyncio.run(stores[store].load(stored_id)) is not None
+
+    client.post("/logout")
+    assert asyncio.run(stores[store].load(stored_id)) is None
+    assert client.get("/user").json() == {}
+
+
+@pytest.mark.parametrize("store", ["cookie", "memory"])
+def test_unchanged_session_not_resent(store: str):
+    client = clients[store]
+    result = client.post("/login")
+    assert "set-cookie" in result.headers
+    result = client.get("/user")
+    assert "set-cookie" not in result.headers
+    result = client.post("/login")  # Same data set again
+    assert "set-cookie" not in result.headers
+    result = client.post("/rename", params={"name": "New Name"})
+    assert "set-cookie" in result.headers
+    assert client.get("/user").json()["data"] == {"name": "New Name"}
+
+
+def test_memory_session_store_copies_sessions():
+    client = clients["memory"]
+    client.post("/login")
+    result = client.post("/rename-untracked")
+    assert "set-cookie" not in result.headers
+    assert client.get("/user").json()["data"] == {"name": "Test User"}
+
+
+def test_missing_stored_session_expires_cookie():
+    client = clients["memory"]
+    client.post("/login")
+    asyncio.run(stores["memory"].delete(session_id(client)))
+    result = client.get("/user")
+    assert result.json() == {}
+    assert "1970" in result.headers["set-cookie"]
+    assert config.Config.USER_SESSION_COOKIE not in client.cookies
+
+
+def test_session_id_changes_on_login(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(config.Config, "USER_SESSION_REVALIDATE_AFTER", 60)
+    client = clients["memory"]
+    client.post("/login")  # Anonymous session with data
+    planted_id = session_id(client)
+    client.post("/authenticate")
+    authenticated_id = session_id(client)
+    assert authenticated_id != planted_id
+    assert asyncio.run(stores["memory"].load(planted_id)) is None
+    assert client.get("/user").json()["is_authenticated"] is True
+
+    client.post("/rename", params={"name": "New Name"})
+    assert session_id(client) == authenticated_id
+
+
+def test_memory_session_store_eviction():
+    store = MemorySessionStore(max_size=2)
+
+    async def fill():
+        for session_id in ("a", "b"):
+            await store.save(session_id, {"id": session_id}, 60)
+        await store.load("a")  # "b" is now least recently used
+        await store.save("c", {"id": "c"}, 60)
+        await store.save("expired", {"id": "expired"}, -1)
+        return [await store.load(i) for i in ("a", "b", "c", "expired")]
+
+    assert asyncio.run(fill()) == [None, None, {"id": "c"}, None]
+
+
+def test_compact_session_cookie(monkeypatch: pytest.MonkeyPatch):
+    client = clients["cookie"]
+    client.post("/login")
+    legacy_cookie = client.cookies[config.Config.USER_SESSION_COOKIE]
+
+    # Cookies in the previous format are still read
+    monkeypatch.setattr(config.Config, "COMPACT_COOKIES", True)
+    assert client.get("/user").json()["user_id"] == 1
+    client.post("/rename", params={"name": "Test User " * 50})
+    cookie = client.cookies[config.Config.USER_SESSION_COOKIE]
+    assert cookie.startswith("~1z")
+    assert len(cookie) < len(legacy_cookie) + 100
+    assert client.get("/user").json()["data"] == {"name": "Test User " * 50}
+
+
+def test_secret_key_rotation(monkeypatch: pytest.MonkeyPatch):
+    # The signing keys are read when the middleware is created, so each step needs a
+    # new app
+    monkeypatch.setattr(config.Config, "SECRET_KEY", "old key")
+    old_app = Mojito()
+    old_app.include_router(router)
+    old_client = TestClient(old_app)
+    old_client.post("/login")
+
+    monkeypatch.setattr(config.Config, "SECRET_KEY", "new key")
+    new_app = Mojito()
+    new_app.include_router(router)
+    client = TestClient(new_app, cookies=old_client.cookies)
+    assert client.get("/user").json() == {}  # Signed with an unknown key
+
+    monkeypatch.setattr(config.Config, "SECRET_KEY_FALLBACKS", ["old key"])
+    rotated_app = Mojito()
+    rotated_app.include_router(router)
+    client = TestClient(rotated_app, cookies=old_client.cookies)
+    assert client.get("/user").json()["user_id"] == 1
+    result = client.post("/rename", params={"name": "New Name"})
+    assert result.headers["set-cookie"].endswith("; path=/; httponly; samesite=strict")
+    # New cookies are signed with the new key
+    client = TestClient(new_app, cookies=result.cookies)
+    assert client.get("/user").json()["data"] == {"name": "New Name"}
+
+
+def test_lazy_session(monkeypatch: pytest.MonkeyPatch):
+    decoded: list[bytes] = []
+    decode_cookie_payload = user_sessions.decode_cookie_payload
+
+    def counting_decode(data: bytes):
+        decoded.append(data)
+        return decode_cookie_payload(data)
+
+    monkeypatch.setattr(user_sessions, "decode_cookie_payload", counting_decode)
+    client = clients["cookie"]
+    client.post("/login")
+    result = client.get("/ping")
+    assert "set-cookie" not in result.headers
+    assert decoded == []  # The session was never used
+    assert client.get("/user").json()["user_id"] == 1
+    assert len(decoded) == 1
@@ -0,0 +1,116 @@
+import gzip
+import tempfile
+from pathlib import Path
+
+import anyio
+from starlette.testclient import TestClient
+from starlette.types import Message
+
+from mojito import Mojito, StaticFiles
+
+static_dir = tempfile.TemporaryDirectory()
+static_path = Path(static_dir.name)
+(static_path / "app.js").write_text("console.log('hello')\n" * 100)
+(static_path / "app.js.gz").write_bytes(gzip.compress(b"console.log('hello')\n" * 100))
+(static_path / "app.js.br").write_bytes(b"brotli")
+(static_path / "css").mkdir()
+(static_path / "css" / "style.css").write_text("body {}")
+(static_path / "css" / "changed.css").write_text("body {}")
+(static_path / "index.html").write_text("<h1>Hello</h1>")
+
+static_files = StaticFiles(directory=static_path, index=True)
+app = Mojito()
+app.mount("/static", static_files, name="static")
+client = TestClient(app)
+
+
+def test_static_files_index():
+    response = client.get("/static/css/style.css", headers={"accept-encoding": ""})
+    assert response.status_code == 200
+    assert response.text == "body {}"
+    assert response.headers["content-type"] == "text/css; charset=utf-8"
+    assert response.headers["content-length"] == "7"
+    assert "vary" not in response.headers
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    response = client.get("/static/css/style.css", headers={"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    response = client.get(
+        "/static/css/style.css", headers={"if-modified-since": last_modified}
+    )
+    assert response.status_code == 304
+
+    response = client.head("/static/css/style.css")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == "7"
+
+    assert client.get("/static/missing.css").status_code == 404
+    assert client.post("/static/css/style.css").status_code == 405
+
+    # A file created after the index was built is served from disk
+    (static_path / "new.txt").write_text("new")
+    assert client.get("/static/new.txt").text == "new"
+
+    # A file changed after the index was built is sent with its current size
+    (static_path / "css" / "changed.css").write_text("body { color: red; margin: 0; }")
+    response = client.get("/static/css/changed.css", headers={"accept-encoding": ""})
+    assert response.text == "body { color: red; margin: 0; }"
+    assert response.headers["content-length"] == str(len(response.content))
+    assert response.headers["content-type"] == "text/css; charset=utf-8"
+
+
+def test_static_files_precompressed():
+    response = client.get("/static/app.js", headers={"accept-encoding": "identity"})
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in response.headers
+    identity_etag = response.headers["etag"]
+
+    response = client.get("/static/app.js", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "console.log('hello')\n" * 100
+    assert response.headers["etag"] != identity_etag
+    assert response.headers["content-type"].startswith("text/javascript")
+
+    response = client.get("/static/app.js", headers={"accept-encoding": "gzip, br;q=0"})
+    assert response.headers["content-encoding"] == "gzip"
+
+    response = client.get(
+        "/static/app.js.br", headers={"accept-encoding": "br"}, follow_redirects=False
+    )
+    assert response.content == b"brotli"
+    assert "content-encoding" not in response.headers
+
+    # Ranges are served from the uncompressed file
+    response = client.get(
+        "/static/app.js", headers={"accept-encoding": "gzip", "range": "bytes=0-6"}
+    )
+    assert response.status_code == 206
+    assert response.content == b"console"
+
+
+def test_static_files_pathsend():
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/index.html",
+        "root_path": "",
+        "headers": [],
+        "extensions": {"http.response.pathsend": {}},
+    }
+    messages: list[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    anyio.run(static_files, scope, receive, send)
+    assert messages[0]["status"] == 200
+    assert messages[1] == {
+        "type": "http.response.pathsend",
+        "path": str(static_path / "index.html"),
+    }
@@ -0,0 +1,86 @@
+import os
+
+import anyio
+import jinja2
+import pytest
+from starlette.types import Message
+
+from mojito import Jinja2Templates, Request, config
+
+
+def test_bytecode_cache_and_preload(tmp_path):
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / "index.html").write_text("<h1>{{ title }}</h1>")
+    (template_dir / "other.txt").write_text("other")
+    cache_dir = tmp_path / "cache"
+
+    templates = Jinja2Templates(
+        str(template_dir), bytecode_cache_dir=str(cache_dir), auto_reload=False
+    )
+    assert templates.env.auto_reload is False
+    assert isinstance(templates.env.bytecode_cache, jinja2.FileSystemBytecodeCache)
+    assert templates.preload(extensions=["html"]) == ["index.html"]
+    assert len(os.listdir(cache_dir)) == 1
+
+    # A new environment loads the compiled template from the cache
+    templates = Jinja2Templates(str(template_dir), bytecode_cache_dir=str(cache_dir))
+    assert templates.get_template("index.html").render(title="Hi") == "<h1>Hi</h1>"
+    assert len(os.listdir(cache_dir)) == 1
+
+    # A changed template is compiled again and replaces the cached bytecode
+    (template_dir / "index.html").write_text("<h2>{{ title }}</h2>")
+    templates = Jinja2Templates(str(template_dir), bytecode_cache_dir=str(cache_dir))
+    assert templates.get_template("index.html").render(title="Hi") == "<h2>Hi</h2>"
+    assert len(os.listdir(cache_dir)) == 1
+    templates = Jinja2Templates(str(template_dir), bytecode_cache_dir=str(cache_dir))
+    assert templates.get_template("index.html").render(title="Hi") == "<h2>Hi</h2>"
+
+
+def test_bytecode_cache_disabled(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        config.Config, "TEMPLATES_BYTECODE_CACHE_DIR", str(tmp_path / "cache")
+    )
+    templates = Jinja2Templates(str(tmp_path))
+    assert templates.env.bytecode_cache is not None
+    templates = Jinja2Templates(str(tmp_path), bytecode_cache_dir="")
+    assert templates.env.bytecode_cache is None
+
+
+@pytest.mark.parametrize("enable_async", [False, True])
+def test_streaming_template_response(enable_async: bool):
+    env = jinja2.Environment(
+        loader=jinja2.DictLoader(
+            {
+                "report.html": "<h1>{{ title }}</h1>{% for row in rows %}<p>{{ row }}</p>{% endfor %}"
+            }
+        ),
+        enable_async=enable_async,
+        autoescape=True,
+    )
+    templates = Jinja2Templates(env=env)
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+    response = templates.StreamingTemplateResponse(
+        Request(scope),
+        "report.html",
+        {"title": "<Report>", "rows": range(1000)},
+        chunk_size=1000,
+    )
+    messages: list[Message] = []
+
+    async def receive() -> Message:
+        await anyio.sleep_forever()
+        return {}  # pragma: no cover
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    anyio.run(response, scope, receive, send)
+    assert dict(messages[0]["headers"])[b"content-type"] == b"text/html; charset=utf-8"
+    chunks = [message["body"] for message in messages[1:] if message["body"]]
+    body = b"".join(chunks).decode()
+    assert body.startswith("<h1>&lt;Report&gt;</h1><p>0</p>")
+    assert body.endswith("<p>999</p>")
+    # The first chunk is sent right away and the rest is joined into larger chunks
+    assert chunks[0] == b"<h1>"
+    assert all(len(chunk) >= 1000 for chunk in chunks[1:-1])